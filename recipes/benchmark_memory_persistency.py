@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" Memory persistency benchmark
+
+Compares memory footprint (max RSS) & build / get throughput of MemoryPersistency & CompactMemoryPersistency.
+Each run is made in its own process, so max RSS is not shared between persistency.
+
+Usage: python recipes/benchmark_memory_persistency.py [nb_entries ...] (default 1000000 10000000)
+"""
+
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.persistency.base import BasePersistency
+from tonga.stores.persistency.compact_memory import CompactMemoryPersistency
+from tonga.stores.persistency.memory import MemoryPersistency
+
+PERSISTENCIES = {
+    'memory': MemoryPersistency,
+    'compact_memory': CompactMemoryPersistency,
+}
+
+
+async def bench(persistency: BasePersistency, nb_entries: int) -> None:
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.monotonic()
+    for i in range(nb_entries):
+        await persistency.__getattribute__('_build_operations').__call__(f'bill:{i}:coffee', i.to_bytes(16, 'big'),
+                                                                         StoreRecordType.SET)
+    persistency.__getattribute__('_set_initialize').__call__()
+    build_time = time.monotonic() - start
+
+    start = time.monotonic()
+    for i in range(nb_entries):
+        await persistency.get(f'bill:{i}:coffee')
+    get_time = time.monotonic() - start
+
+    rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+    print(f'    {type(persistency).__name__:<26} rss {rss / 2 ** 20:9.1f} MB ({rss / nb_entries:6.1f} B/entry)'
+          f' build {nb_entries / build_time:10.0f} ops/s get {nb_entries / get_time:10.0f} ops/s')
+    if isinstance(persistency, CompactMemoryPersistency):
+        print(f'    {"":<26} {persistency.get_memory_usage()}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] in PERSISTENCIES:
+        asyncio.get_event_loop().run_until_complete(bench(PERSISTENCIES[sys.argv[1]](), int(sys.argv[2])))
+    else:
+        for entries in (sys.argv[1:] or ['1000000', '10000000']):
+            print(f'{entries} entries')
+            for name in PERSISTENCIES:
+                subprocess.run([sys.executable, __file__, name, entries], check=True)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" Persistency benchmark
+
+Compares build (rebuild from changelog), set, get & write batch throughput of all persistency.
+
+Usage: python recipes/benchmark_persistency.py [nb_entries]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.persistency.append_log import AppendLogPersistency
+from tonga.stores.persistency.base import BasePersistency
+from tonga.stores.persistency.memory import MemoryPersistency
+from tonga.stores.persistency.shelve import ShelvePersistency
+from tonga.stores.persistency.sqlite import SQLitePersistency
+
+try:
+    from tonga.stores.persistency.rocksdb import RocksDBPersistency
+except ImportError:
+    RocksDBPersistency = None
+
+
+async def timed(name: str, nb_ops: int, func: Callable) -> None:
+    start = time.monotonic()
+    await func()
+    elapsed = time.monotonic() - start
+    print(f'    {name:<12} {elapsed:8.3f}s {nb_ops / elapsed:12.0f} ops/s')
+
+
+async def bench(persistency: BasePersistency, keys: List[str], value: bytes) -> None:
+    async def build():
+        for key in keys:
+            await persistency.__getattribute__('_build_operations').__call__(key, value, StoreRecordType.SET)
+        persistency.__getattribute__('_set_initialize').__call__()
+
+    async def set_all():
+        for key in keys:
+            await persistency.set(key, value)
+
+    async def get_all():
+        for key in keys:
+            await persistency.get(key)
+
+    async def get_many():
+        for i in range(0, len(keys), 100):
+            await persistency.get_many(keys[i:i + 100])
+
+    async def write_batch():
+        for i in range(0, len(keys), 100):
+            await persistency.write_batch([(key, value, StoreRecordType.SET) for key in keys[i:i + 100]])
+
+    await timed('build', len(keys), build)
+    await timed('set', len(keys), set_all)
+    await timed('get', len(keys), get_all)
+    await timed('get_many', len(keys), get_many)
+    await timed('write_batch', len(keys), write_batch)
+
+
+async def main(nb_entries: int) -> None:
+    keys = [f'bill:{i}:coffee' for i in range(nb_entries)]
+    value = os.urandom(128)
+    db_dir = tempfile.mkdtemp()
+
+    persistencies = [
+        ('memory', lambda: MemoryPersistency()),
+        ('shelve', lambda: ShelvePersistency(os.path.join(db_dir, 'shelve.db'))),
+        ('sqlite', lambda: SQLitePersistency(os.path.join(db_dir, 'sqlite.db'))),
+        ('append_log', lambda: AppendLogPersistency(os.path.join(db_dir, 'append_log'))),
+    ]
+    if RocksDBPersistency is not None:
+        persistencies.append(('rocksdb', lambda: RocksDBPersistency(os.path.join(db_dir, 'rocksdb'))))
+
+    for name, factory in persistencies:
+        print(f'{name} ({nb_entries} entries)')
+        await bench(factory(), keys, value)
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
@@ -2,7 +2,10 @@
 # coding: utf-8
 # Copyright (c) Qotto, 2019
 
+import asyncio
 import os
+from functools import partial
+from logging import getLogger
 
 import pytest
 import uvloop
@@ -15,7 +18,13 @@ from tonga.models.store.store_record_handler import StoreRecordHandler
 # PersistencyType import
 from tonga.models.structs.persistency_type import PersistencyType
 # Tonga Kafka client
+from tonga.services.coordinator.async_coordinator.keyed_lock import KeyedLock
+from tonga.services.coordinator.async_coordinator.timer_wheel import TimerWheel
 from tonga.services.coordinator.client.kafka_client import KafkaClient
+# Producer
+from tonga.models.structs.positioning import KafkaPositioning
+from tonga.services.producer.base import BaseProducer
+from tonga.services.producer.errors import RecordTooLarge
 # Serializer
 from tonga.services.serializer.avro import AvroSerializer
 from tonga.stores.global_store import GlobalStore
@@ -23,10 +32,13 @@ from tonga.stores.global_store import GlobalStore
 from tonga.stores.local_store import LocalStore
 # KafkaStoreManager import
 from tonga.stores.manager.kafka_store_manager import KafkaStoreManager
+from tonga.stores.manager.write_watermark import WriteWatermark
 # Persistency import
+from tonga.stores.persistency.cache import CachedPersistency
 from tonga.stores.persistency.memory import MemoryPersistency
 from tonga.stores.persistency.rocksdb import RocksDBPersistency
 from tonga.stores.persistency.shelve import ShelvePersistency
+from tonga.stores.persistency.sqlite import SQLitePersistency
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -44,10 +56,23 @@ test_rocksdb_persistency = RocksDBPersistency(os.path.join(os.path.dirname(os.pa
                                                            'local_store'))
 test_rocksdb_persistency.__getattribute__('_set_initialize').__call__()
 
+# SQLite persistency test (not initialized, build is tested first)
+test_sqlite_persistency = SQLitePersistency(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         'sqlite_store.db'), build_batch_size=2)
+
+# Read cache (24 bytes) in front of shelve persistency test
+test_cached_persistency = CachedPersistency(ShelvePersistency(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                           'cached_store.db')), 24)
+test_cached_persistency.__getattribute__('_set_initialize').__call__()
+
 # Local Store & global store with memory persistency test
 test_local_store_memory_persistency = LocalStore(db_type=PersistencyType.MEMORY, loop=t_loop)
 test_global_store_memory_persistency = GlobalStore(db_type=PersistencyType.MEMORY)
 
+# Local Store with write behind test
+test_local_store_write_behind = LocalStore(db_type=PersistencyType.MEMORY, loop=t_loop, write_behind=True,
+                                           write_behind_max_entries=2, write_behind_max_age=60)
+
 # Avro Serializer test
 test_serializer = AvroSerializer(BASE_DIR + '/misc/schemas')
 test_serializer_local_store_memory_persistency = LocalStore(db_type=PersistencyType.MEMORY, loop=t_loop)
@@ -68,6 +93,105 @@ store_record_handler = StoreRecordHandler(test_store_manager)
 store_builder_serializer.register_event_handler_store_record(StoreRecord, store_record_handler)
 
 
+class FakeProducer(BaseProducer):
+    """ Producer without broker, serialized records are acknowledged at once (offset = number of sent records)
+
+    Attributes:
+        sent (List[Tuple[str, Optional[bytes], bytes]]): Acknowledged records as (topic, key, value)
+        fail (bool): If true records fail with TimeoutError
+        too_large (Set[bytes]): Keys of records failing with RecordTooLarge
+        nb_stop (int): Number of stop_producer calls
+        records (List[Tuple[str, BaseRecord]]): Acknowledged records sent by send_and_wait / send_tracked as
+                                                (topic, record), offset = position in list
+        errors (Dict[str, BaseException]): Error of records sent by send_and_wait / send_tracked by record key
+    """
+
+    def __init__(self, loop) -> None:
+        self.loop = loop
+        self.running = True
+        self.sent = list()
+        self.fail = False
+        self.too_large = set()
+        self.nb_stop = 0
+        self.records = list()
+        self.errors = dict()
+
+    async def start_producer(self) -> None:
+        self.running = True
+
+    async def stop_producer(self) -> None:
+        self.running = False
+        self.nb_stop += 1
+
+    def is_running(self) -> bool:
+        return self.running
+
+    async def send_and_wait(self, msg, topic):
+        if msg.key in self.errors:
+            raise self.errors[msg.key]
+        return await (await self.send_tracked(msg, topic))
+
+    async def send_tracked(self, msg, topic):
+        future = self.loop.create_future()
+        if msg.key in self.errors:
+            future.set_exception(self.errors[msg.key])
+        else:
+            self.records.append((topic, msg))
+            future.set_result(KafkaPositioning(topic, 0, len(self.records) - 1))
+        return future
+
+    async def send(self, msg, topic):
+        raise NotImplementedError
+
+    async def send_batched_serialized(self, key, value, topic):
+        future = self.loop.create_future()
+        if self.fail:
+            future.set_exception(TimeoutError())
+        elif key in self.too_large:
+            future.set_exception(RecordTooLarge())
+        else:
+            self.sent.append((topic, key, value))
+            future.set_result(KafkaPositioning(topic, 0, len(self.sent)))
+        return future
+
+    async def flush(self) -> None:
+        pass
+
+    async def flush_records(self, futures) -> None:
+        pass
+
+    async def partitions_by_topic(self, topic):
+        raise NotImplementedError
+
+    def init_transaction(self):
+        raise NotImplementedError
+
+    async def end_transaction(self, committed_offsets, group_id) -> None:
+        raise NotImplementedError
+
+
+def new_kafka_store_manager(loop, store_producer) -> KafkaStoreManager:
+    """ KafkaStoreManager without client & store consumer, local store is initialized & commits are recorded
+
+    Store records are sent by store_producer (FakeProducer)
+    """
+    store_manager = KafkaStoreManager.__new__(KafkaStoreManager)
+    local_store = LocalStore(PersistencyType.MEMORY, loop)
+    local_store.get_persistency().__getattribute__('_set_initialize').__call__()
+    store_manager.commits = list()
+
+    async def commit_store_positioning(positioning):
+        store_manager.commits.append(positioning.get_current_offset())
+
+    for name, value in [('_logger', getLogger('tonga')), ('_topic_store', 'test-store'), ('_loop', loop),
+                        ('_local_store', local_store), ('_expiry', TimerWheel(tick=1.0)), ('_expiry_loaded', True),
+                        ('_write_watermark', WriteWatermark()), ('_apply_lock', asyncio.Lock(loop=loop)),
+                        ('_write_lock', KeyedLock(loop=loop)), ('_store_producer', store_producer),
+                        ('_commit_store_positioning', commit_store_positioning)]:
+        store_manager.__setattr__(name, value)
+    return store_manager
+
+
 @pytest.yield_fixture()
 def event_loop():
     loop = t_loop
@@ -84,6 +208,26 @@ def get_global_memory_store_connection():
     return test_global_store_memory_persistency
 
 
+@pytest.fixture
+def get_local_write_behind_store_connection():
+    return test_local_store_write_behind
+
+
+@pytest.fixture
+def get_shelve_persistency():
+    return test_shelve_persistency
+
+
+@pytest.fixture
+def get_sqlite_persistency():
+    return test_sqlite_persistency
+
+
+@pytest.fixture
+def get_cached_persistency():
+    return test_cached_persistency
+
+
 @pytest.fixture
 def get_avro_serializer():
     return test_serializer
@@ -107,3 +251,13 @@ def get_assignor_cluster_metadata():
 @pytest.fixture
 def get_store_manager():
     return test_store_manager
+
+
+@pytest.fixture
+def get_fake_producer_factory():
+    return partial(FakeProducer, t_loop)
+
+
+@pytest.fixture
+def get_kafka_store_manager_factory():
+    return partial(new_kafka_store_manager, t_loop)
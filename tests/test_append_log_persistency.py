@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import os
+
+import pytest
+
+from tonga.errors import StoreKeyNotFound
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.persistency.append_log import AppendLogPersistency
+
+
+def new_append_log_persistency(db_path: str, **kwargs) -> AppendLogPersistency:
+    persistency = AppendLogPersistency(db_path, **kwargs)
+    persistency.__getattribute__('_set_initialize').__call__()
+    return persistency
+
+
+@pytest.mark.asyncio
+async def test_append_log_persistency_set_get_delete(tmp_path):
+    persistency = new_append_log_persistency(str(tmp_path))
+
+    await persistency.set('test1', b'value1')
+    await persistency.set('test1', b'value2')
+    assert await persistency.get('test1') == b'value2'
+    assert bytes(await persistency.get_view('test1')) == b'value2'
+
+    await persistency.delete('test1')
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.get('test1')
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.delete('test1')
+
+
+@pytest.mark.asyncio
+async def test_append_log_persistency_reload(tmp_path):
+    persistency = new_append_log_persistency(str(tmp_path), max_segment_size=64, compaction_min_segments=100)
+    for i in range(10):
+        await persistency.set(f'test{i}', f'value{i}'.encode())
+    await persistency.write_batch([('test0', b'', StoreRecordType.DEL), ('test1', b'new1', StoreRecordType.SET)],
+                                  metadata={'positioning': b'11'})
+    del persistency
+
+    # Sealed segments are loaded from hint files, last segment is scanned
+    persistency = new_append_log_persistency(str(tmp_path))
+    assert await persistency.get_many(['test0', 'test1', 'test9']) == {'test1': b'new1', 'test9': b'value9'}
+    assert persistency.get_stats()['keys'] == 9
+    assert await persistency.get_metadata('positioning') == b'11'
+
+
+@pytest.mark.asyncio
+async def test_append_log_persistency_torn_tail(tmp_path):
+    persistency = new_append_log_persistency(str(tmp_path))
+    await persistency.set('test1', b'value1')
+    await persistency.set('test2', b'value2')
+    del persistency
+
+    segment_path = os.path.join(str(tmp_path), '0000000001.log')
+    os.truncate(segment_path, os.path.getsize(segment_path) - 1)
+
+    persistency = new_append_log_persistency(str(tmp_path))
+    assert await persistency.get_many(['test1', 'test2']) == {'test1': b'value1'}
+
+
+@pytest.mark.asyncio
+async def test_append_log_persistency_compact(tmp_path):
+    persistency = new_append_log_persistency(str(tmp_path), max_segment_size=64, compaction_min_segments=100)
+    for i in range(20):
+        await persistency.set('test1', f'value{i}'.encode())
+    await persistency.write_batch([('test2', b'value2', StoreRecordType.SET)], metadata={'positioning': b'21'})
+    assert persistency.get_stats()['segments'] > 2
+
+    await persistency.compact()
+    stats = persistency.get_stats()
+    assert stats['segments'] == 2
+    assert await persistency.get_many(['test1', 'test2']) == {'test1': b'value19', 'test2': b'value2'}
+    del persistency
+
+    persistency = new_append_log_persistency(str(tmp_path))
+    assert await persistency.scan('test') == [('test1', b'value19'), ('test2', b'value2')]
+    assert sorted(await persistency.all_keys()) == ['test1', 'test2']
+    # Metadata is kept by compaction
+    assert await persistency.get_metadata('positioning') == b'21'
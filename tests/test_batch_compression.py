@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import os
+
+import pytest
+
+from tonga.services.producer.compression import (BatchProfile, CompressionSelector, available_codecs,
+                                                 codec_attribute)
+from tonga.services.producer.errors import BadCompressionCodec
+
+
+def test_batch_profile_codec():
+    assert 'none' in available_codecs()
+    assert 'gzip' in available_codecs()
+    assert codec_attribute(None) == 0
+    assert codec_attribute('gzip') != 0
+
+    assert BatchProfile('gzip', linger=0.1).compression == 'gzip'
+    assert BatchProfile('adaptive').compression == 'adaptive'
+    with pytest.raises(BadCompressionCodec):
+        BatchProfile('test')
+
+
+def test_compression_selector_select_cheapest_codec():
+    selector = CompressionSelector(codecs=['none', 'gzip'], resample_batches=2)
+    assert selector.next_batch() == ('none', True)
+    assert selector.next_batch() == ('none', False)
+
+    # Compressible payload
+    assert selector.sample([b'test' * 1000] * 10) == 'gzip'
+    assert selector.get_codec() == 'gzip'
+    assert selector.next_batch() == ('gzip', True)
+    report = selector.get_report()
+    assert report['gzip']['ratio'] < 0.1
+    assert report['none']['ratio'] == 1.0
+
+    # Random payload, gzip only costs compression time
+    assert selector.sample([os.urandom(10000)]) == 'none'
+
+    selector.record_latency('none', 0.5)
+    selector.record_latency('none', 1.5)
+    assert selector.get_report()['none']['latency'] == 1.0
+    assert selector.get_report()['none']['batches'] == 2
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import pytest
+
+from tonga.errors import StoreKeyNotFound
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.persistency.bloom import BloomFilter, BloomFilterPersistency
+from tonga.stores.persistency.cache import CachedPersistency
+from tonga.stores.persistency.memory import MemoryPersistency
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom_filter = BloomFilter(expected_entries=1000, false_positive_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f'test{i}')
+
+    assert all(f'test{i}' in bloom_filter for i in range(1000))
+    false_positives = sum(f'missing{i}' in bloom_filter for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_bloom_filter_persistency_negative_lookup():
+    bloom_persistency = BloomFilterPersistency(MemoryPersistency(), expected_entries=100)
+    await bloom_persistency.__getattribute__('_build_batch_operations').__call__(
+        [('test1', b'value1', StoreRecordType.SET), ('test2', b'value2', StoreRecordType.SET)])
+    bloom_persistency.__getattribute__('_set_initialize').__call__()
+
+    assert await bloom_persistency.get('test1') == b'value1'
+    with pytest.raises(StoreKeyNotFound):
+        await bloom_persistency.get('test3')
+    assert await bloom_persistency.get_or_none('test3') is None
+    assert await bloom_persistency.get_many(['test2', 'test4']) == {'test2': b'value2'}
+
+    await bloom_persistency.set('test3', b'value3')
+    await bloom_persistency.delete('test1')
+    assert await bloom_persistency.exists('test3')
+    assert not await bloom_persistency.exists('test1')
+
+    stats = bloom_persistency.get_stats()
+    assert stats['negatives'] == 3
+    # Deleted key stays in filter
+    assert stats['false_positives'] == 1
+
+
+@pytest.mark.asyncio
+async def test_bloom_filter_persistency_load_existing_keys():
+    persistency = MemoryPersistency()
+    persistency.__getattribute__('_set_initialize').__call__()
+    await persistency.set_many({f'test{i}': b'value' for i in range(2500)})
+
+    async def range_entries(start, end, reverse, limit):
+        raise AssertionError('range read on filter load')
+
+    # Keys are loaded in one keys only scan, without ordered range reads
+    persistency.__setattr__('_range', range_entries)
+    bloom_persistency = BloomFilterPersistency(CachedPersistency(persistency, 100), expected_entries=5000)
+    assert all([await bloom_persistency.exists(f'test{i}') for i in range(2500)])
+    assert not await bloom_persistency.exists('test2500')
+    assert bloom_persistency.get_stats()['negatives'] == 1
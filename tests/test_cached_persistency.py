@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import pytest
+
+from tonga.errors import StoreKeyNotFound, UninitializedStore
+from tonga.stores.persistency.cache import CachedPersistency
+from tonga.stores.persistency.memory import MemoryPersistency
+
+
+@pytest.mark.asyncio
+async def test_cached_persistency_hit_miss(get_cached_persistency):
+    cached_persistency = get_cached_persistency
+    cached_persistency.reset_stats()
+
+    await cached_persistency.set('test1', b'value1')
+    assert await cached_persistency.get('test1') == b'value1'
+    assert await cached_persistency.get('test1') == b'value1'
+
+    stats = cached_persistency.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['bytes'] == len('test1') + len(b'value1')
+
+
+@pytest.mark.asyncio
+async def test_cached_persistency_invalidate(get_cached_persistency):
+    cached_persistency = get_cached_persistency
+
+    await cached_persistency.set('test1', b'value2')
+    assert await cached_persistency.get('test1') == b'value2'
+
+    await cached_persistency.delete('test1')
+    with pytest.raises(StoreKeyNotFound):
+        await cached_persistency.get('test1')
+    assert cached_persistency.get_stats()['entries'] == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_persistency_bounded_by_bytes(get_cached_persistency):
+    cached_persistency = get_cached_persistency
+    cached_persistency.reset_stats()
+
+    await cached_persistency.set_many({'test2': b'value2', 'test3': b'value3', 'test4': b'value4'})
+    # Each entry is 11 bytes, only two entries fit in cache
+    assert await cached_persistency.get_many(['test2', 'test3', 'test4']) == {'test2': b'value2',
+                                                                              'test3': b'value3',
+                                                                              'test4': b'value4'}
+    stats = cached_persistency.get_stats()
+    assert stats['entries'] == 2
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 24
+
+    assert await cached_persistency.get('test4') == b'value4'
+    assert cached_persistency.get_stats()['hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_persistency_initialize_follows_wrapped(event_loop):
+    memory_persistency = MemoryPersistency()
+    cached_persistency = CachedPersistency(memory_persistency, 100)
+
+    with pytest.raises(UninitializedStore):
+        await cached_persistency.set_many({'test1': b'value1'})
+    with pytest.raises(UninitializedStore):
+        await cached_persistency.range()
+    await cached_persistency.set_metadata('position', b'1')
+
+    memory_persistency.__getattribute__('_set_initialize').__call__()
+    assert cached_persistency.is_initialize()
+    await cached_persistency.set_many({'test1': b'value1'})
+    assert await cached_persistency.range() == [('test1', b'value1')]
+    assert await cached_persistency.get_metadata('position') == b'1'
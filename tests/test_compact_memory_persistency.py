@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import pytest
+
+from tonga.errors import StoreKeyNotFound
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.manager.errors import UninitializedStore
+from tonga.stores.persistency.compact_memory import CompactMemoryPersistency
+
+
+def new_compact_memory_persistency(**kwargs) -> CompactMemoryPersistency:
+    persistency = CompactMemoryPersistency(**kwargs)
+    persistency.__getattribute__('_set_initialize').__call__()
+    return persistency
+
+
+@pytest.mark.asyncio
+async def test_compact_memory_persistency_build():
+    persistency = CompactMemoryPersistency()
+    with pytest.raises(UninitializedStore):
+        await persistency.get('test1')
+
+    await persistency.__getattribute__('_build_operations').__call__('test1', b'value1', StoreRecordType.SET)
+    await persistency.__getattribute__('_build_operations').__call__('test2', b'value2', StoreRecordType.SET)
+    await persistency.__getattribute__('_build_operations').__call__('test1', b'', StoreRecordType.DEL)
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.__getattribute__('_build_operations').__call__('test1', b'', StoreRecordType.DEL)
+    persistency.__getattribute__('_set_initialize').__call__()
+
+    assert await persistency.get('test2') == b'value2'
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.get('test1')
+
+
+@pytest.mark.asyncio
+async def test_compact_memory_persistency_set_get_delete():
+    persistency = new_compact_memory_persistency()
+
+    await persistency.set('test1', b'value1')
+    await persistency.set('test1', b'value2')
+    await persistency.set('test2', b'')
+    assert await persistency.get('test1') == b'value2'
+    assert await persistency.get('test2') == b''
+    assert bytes(await persistency.get_view('test1')) == b'value2'
+
+    await persistency.delete('test1')
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.get('test1')
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.delete('test1')
+
+    await persistency.set('test1', b'value3')
+    assert await persistency.get('test1') == b'value3'
+    assert persistency.get_memory_usage()['entries'] == 2
+
+
+@pytest.mark.asyncio
+async def test_compact_memory_persistency_resize_compact():
+    persistency = new_compact_memory_persistency(chunk_size=64, initial_capacity=8)
+
+    for i in range(1000):
+        await persistency.set(f'test{i}', f'value{i}'.encode())
+    for i in range(0, 1000, 2):
+        await persistency.delete(f'test{i}')
+    for i in range(1, 1000, 2):
+        await persistency.set(f'test{i}', f'new_value{i}'.encode())
+    # Bigger than a chunk
+    await persistency.set('big', b'x' * 100)
+
+    usage = persistency.get_memory_usage()
+    assert usage['entries'] == 501
+    assert usage['arena_garbage'] < usage['arena_live'] + 64
+    assert await persistency.get('test999') == b'new_value999'
+    assert await persistency.get('big') == b'x' * 100
+    assert await persistency.get_many(['test0', 'test1', 'big']) == {'test1': b'new_value1', 'big': b'x' * 100}
+
+
+@pytest.mark.asyncio
+async def test_compact_memory_persistency_batch_range():
+    persistency = new_compact_memory_persistency()
+
+    await persistency.write_batch([('b', b'2', StoreRecordType.SET), ('a', b'1', StoreRecordType.SET),
+                                   ('c', b'3', StoreRecordType.SET), ('d', b'', StoreRecordType.DEL)])
+    assert await persistency.range() == [('a', b'1'), ('b', b'2'), ('c', b'3')]
+    assert await persistency.range('b', reverse=True) == [('c', b'3'), ('b', b'2')]
+
+    await persistency.set('ab', b'4')
+    assert await persistency.scan('a') == [('a', b'1'), ('ab', b'4')]
+    assert await persistency.range('a', 'c', limit=2) == [('a', b'1'), ('ab', b'4')]
@@ -5,7 +5,10 @@
 import pytest
 
 from tonga.errors import StoreKeyNotFound, UninitializedStore
+from tonga.models.structs.persistency_type import PersistencyType
+from tonga.models.structs.store_record_type import StoreRecordType
 from tonga.stores.errors import BadEntryType
+from tonga.stores.global_store import GlobalStore
 
 
 # Test raise UninitializedStore
@@ -95,3 +98,22 @@ async def test_global_memory_store_global_delete(get_global_memory_store_connect
     await global_memory_store.__getattribute__('_build_delete').__call__('test4')
     with pytest.raises(StoreKeyNotFound):
         await global_memory_store.get('test4')
+
+
+@pytest.mark.asyncio
+async def test_global_memory_store_filter_projection():
+    global_memory_store = GlobalStore(db_type=PersistencyType.MEMORY, key_prefix='coffee:',
+                                      entry_filter=lambda key, value: not value.startswith(b'cold'),
+                                      projection=lambda key, value: value.upper())
+    build_batch = global_memory_store.__getattribute__('_build_batch')
+
+    await build_batch([('coffee:1', b'hot1', StoreRecordType.SET), ('bill:1', b'b1', StoreRecordType.SET),
+                       ('coffee:2', b'hot2', StoreRecordType.SET)], {'positioning': b'1'})
+    # Rejected value deletes entry accepted before
+    await build_batch([('coffee:2', b'cold2', StoreRecordType.SET), ('bill:1', b'', StoreRecordType.DEL)],
+                      {'positioning': b'2'})
+    await global_memory_store.__getattribute__('_build_set').__call__('coffee:3', b'hot3')
+    global_memory_store.get_persistency().__getattribute__('_set_initialize').__call__()
+
+    assert await global_memory_store.scan() == [('coffee:1', b'HOT1'), ('coffee:3', b'HOT3')]
+    assert await global_memory_store.get_persistency().get_metadata('positioning') == b'2'
@@ -44,3 +44,23 @@ def test_key_partitioner_missing_key():
     key_partitioner = KeyPartitioner()
     r = key_partitioner(None, [0, 1, 2, 3], [0, 1, 2, 3])
     assert r in range(0, 4)
+
+
+def test_key_partitioner_cache():
+    key_partitioner = KeyPartitioner(cache_size=2)
+    keys = [uuid.uuid4().hex for _ in range(0, 3)]
+    for key in keys + keys:
+        assert key_partitioner(key, [0, 1, 2, 3], [0, 1, 2, 3]) == get_good_partition(key, [0, 1, 2, 3])
+        # Cached hash stays valid when partition count changes
+        assert key_partitioner(key, [0, 1, 2], [0, 1, 2]) == get_good_partition(key, [0, 1, 2])
+    assert len(key_partitioner.__getattribute__('_cache')) == 2
+
+
+def test_key_partitioner_partition_many():
+    key_partitioner = KeyPartitioner()
+    keys = [uuid.uuid4().hex for _ in range(0, 100)]
+    assert key_partitioner.partition_many(keys, [0, 1, 2, 3], [0, 1, 2, 3]) == \
+        [get_good_partition(key, [0, 1, 2, 3]) for key in keys]
+    assert key_partitioner.partition_many([None], [0, 1, 2, 3], [0, 1, 2, 3])[0] in range(0, 4)
+    with pytest.raises(BadKeyType):
+        key_partitioner.partition_many(['test', 10], [0, 1, 2, 3], [0, 1, 2, 3])
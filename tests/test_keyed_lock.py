@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+
+import pytest
+
+from tonga.services.coordinator.async_coordinator.keyed_lock import KeyedLock
+
+
+@pytest.mark.asyncio
+async def test_keyed_lock_acquire_release(event_loop):
+    keyed_lock = KeyedLock(loop=event_loop)
+
+    await keyed_lock.acquire('test1')
+    assert keyed_lock.locked('test1')
+    assert not keyed_lock.locked('test2')
+
+    keyed_lock.release('test1')
+    assert not keyed_lock.locked('test1')
+    # Idle keys are evicted
+    assert len(keyed_lock) == 0
+
+
+@pytest.mark.asyncio
+async def test_keyed_lock_release_unlocked(event_loop):
+    keyed_lock = KeyedLock(loop=event_loop)
+    with pytest.raises(RuntimeError):
+        keyed_lock.release('test1')
+
+
+@pytest.mark.asyncio
+async def test_keyed_lock_wake_up_all_waiters(event_loop):
+    keyed_lock = KeyedLock(loop=event_loop)
+    await keyed_lock.acquire('test1')
+
+    waiters = [asyncio.ensure_future(keyed_lock.wait('test1'), loop=event_loop) for _ in range(0, 3)]
+    await asyncio.sleep(0)
+    assert not any(waiter.done() for waiter in waiters)
+
+    keyed_lock.release('test1')
+    await asyncio.wait_for(asyncio.gather(*waiters, loop=event_loop), timeout=1, loop=event_loop)
+    assert len(keyed_lock) == 0
+
+
+@pytest.mark.asyncio
+async def test_keyed_lock_serialize_owners(event_loop):
+    keyed_lock = KeyedLock(loop=event_loop)
+    order = list()
+
+    async def owner(name):
+        await keyed_lock.acquire('test1')
+        order.append(name + '-in')
+        await asyncio.sleep(0)
+        order.append(name + '-out')
+        keyed_lock.release('test1')
+
+    await asyncio.gather(owner('a'), owner('b'), loop=event_loop)
+    assert order == ['a-in', 'a-out', 'b-in', 'b-out']
+    assert len(keyed_lock) == 0
@@ -6,6 +6,7 @@ import pytest
 
 from tonga.errors import StoreKeyNotFound, UninitializedStore
 from tonga.stores.errors import BadEntryType
+from tonga.models.structs.store_record_type import StoreRecordType
 
 
 # Test raise UninitializedStore
@@ -105,3 +106,61 @@ async def test_local_memory_store_delete(get_local_memory_store_connection):
 
     with pytest.raises(StoreKeyNotFound):
         await local_memory_store.get('test10')
+
+
+@pytest.mark.asyncio
+async def test_local_memory_store_set_get_many(get_local_memory_store_connection):
+    local_memory_store = get_local_memory_store_connection
+
+    await local_memory_store.set_many({'test11': b'value11', 'test12': b'value12'})
+
+    assert await local_memory_store.get_many(['test11', 'test12', 'toto']) == {'test11': b'value11',
+                                                                               'test12': b'value12'}
+
+
+@pytest.mark.asyncio
+async def test_local_memory_store_write_batch(get_local_memory_store_connection):
+    local_memory_store = get_local_memory_store_connection
+
+    await local_memory_store.write_batch([('test13', b'value13', StoreRecordType.SET),
+                                          ('test11', b'', StoreRecordType.DEL),
+                                          ('toto', b'', StoreRecordType.DEL)])
+
+    assert await local_memory_store.get_many(['test11', 'test13']) == {'test13': b'value13'}
+
+    await local_memory_store.delete_many(['test12', 'test13'])
+    assert await local_memory_store.get_many(['test12', 'test13']) == {}
+
+
+@pytest.mark.asyncio
+async def test_local_memory_store_scan_range(get_local_memory_store_connection):
+    local_memory_store = get_local_memory_store_connection
+
+    await local_memory_store.set_many({'bill:2:coffee:1': b'c1', 'bill:1:coffee:2': b'c2',
+                                       'bill:1:coffee:1': b'c3', 'bill:10:coffee:1': b'c4'})
+
+    assert await local_memory_store.scan('bill:1:') == [('bill:1:coffee:1', b'c3'), ('bill:1:coffee:2', b'c2')]
+    assert await local_memory_store.scan('bill:1:', reverse=True, limit=1) == [('bill:1:coffee:2', b'c2')]
+    # Keys are ordered by code point, '0' < ':'
+    assert await local_memory_store.range('bill:10', 'bill:1;') == [('bill:10:coffee:1', b'c4'),
+                                                                   ('bill:1:coffee:1', b'c3'),
+                                                                   ('bill:1:coffee:2', b'c2')]
+    assert await local_memory_store.range('bill:1', 'bill:3', reverse=True, limit=2) == [('bill:2:coffee:1', b'c1'),
+                                                                                      ('bill:1:coffee:2', b'c2')]
+
+    await local_memory_store.delete_many(['bill:1:coffee:1', 'bill:1:coffee:2', 'bill:10:coffee:1',
+                                          'bill:2:coffee:1'])
+    assert await local_memory_store.scan('bill:') == []
+
+
+@pytest.mark.asyncio
+async def test_local_memory_store_scan_skip_reserved_keys(get_local_memory_store_connection):
+    local_memory_store = get_local_memory_store_connection
+
+    await local_memory_store.set_many({'\x00expiry:test20': b'e1', 'test20': b'v1'})
+
+    assert await local_memory_store.range(None, 'test21') == [('test1', b'value1'), ('test20', b'v1')]
+    assert await local_memory_store.range(None, '\x01') == []
+    assert await local_memory_store.get('\x00expiry:test20') == b'e1'
+
+    await local_memory_store.delete_many(['\x00expiry:test20', 'test20'])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import pytest
+
+from tonga.errors import StoreKeyNotFound
+from tonga.models.structs.store_record_type import StoreRecordType
+
+
+@pytest.mark.asyncio
+async def test_local_write_behind_store_coalesce(get_local_write_behind_store_connection):
+    local_store = get_local_write_behind_store_connection
+    local_store.get_persistency().__getattribute__('_set_initialize').__call__()
+    persistency = local_store.get_persistency()
+
+    await local_store.set('test1', b'value1')
+    await local_store.set('test1', b'value2')
+
+    assert await local_store.get('test1') == b'value2'
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.get('test1')
+
+    await local_store.flush()
+    assert await persistency.get('test1') == b'value2'
+
+
+@pytest.mark.asyncio
+async def test_local_write_behind_store_bounded(get_local_write_behind_store_connection):
+    local_store = get_local_write_behind_store_connection
+    persistency = local_store.get_persistency()
+
+    await local_store.set('test2', b'value2')
+    await local_store.set('test3', b'value3')
+    # Max entries reached, dirty entries are flushed before write
+    await local_store.set('test4', b'value4')
+
+    assert await persistency.get('test2') == b'value2'
+    assert await persistency.get('test3') == b'value3'
+    assert await local_store.get('test4') == b'value4'
+
+
+@pytest.mark.asyncio
+async def test_local_write_behind_store_delete(get_local_write_behind_store_connection):
+    local_store = get_local_write_behind_store_connection
+    persistency = local_store.get_persistency()
+
+    await local_store.delete('test2')
+    with pytest.raises(StoreKeyNotFound):
+        await local_store.get('test2')
+    assert await persistency.get('test2') == b'value2'
+
+    with pytest.raises(StoreKeyNotFound):
+        await local_store.delete('test2')
+
+    await local_store.flush()
+    with pytest.raises(StoreKeyNotFound):
+        await persistency.get('test2')
+
+
+@pytest.mark.asyncio
+async def test_local_write_behind_store_flush_marker(get_local_write_behind_store_connection):
+    local_store = get_local_write_behind_store_connection
+    markers = list()
+
+    async def on_flush(marker):
+        markers.append(marker)
+
+    local_store.set_flush_callback(on_flush)
+    await local_store.set('test5', b'value5')
+    local_store.set_flush_marker(5)
+    await local_store.flush()
+
+    assert markers == [5]
+
+
+@pytest.mark.asyncio
+async def test_local_write_behind_store_scan(get_local_write_behind_store_connection):
+    local_store = get_local_write_behind_store_connection
+    await local_store.flush()
+
+    await local_store.set('scan:1', b'value1')
+    await local_store.set('scan:2', b'value2')
+    await local_store.flush()
+    await local_store.set('scan:3', b'value3')
+    await local_store.delete('scan:1')
+
+    # Buffered entries (scan:3 & scan:1 tombstone) are merged over persistency
+    assert await local_store.scan('scan:') == [('scan:2', b'value2'), ('scan:3', b'value3')]
+    assert await local_store.scan('scan:', limit=1) == [('scan:2', b'value2')]
+    await local_store.flush()
+
+
+@pytest.mark.asyncio
+async def test_local_write_behind_store_metadata(get_local_write_behind_store_connection):
+    local_store = get_local_write_behind_store_connection
+    persistency = local_store.get_persistency()
+
+    await local_store.write_batch([('test6', b'value6', StoreRecordType.SET)], {'positioning': b'6'})
+    # Metadata is written with buffered entries
+    assert await persistency.get_metadata('positioning') is None
+    await local_store.flush()
+    assert await persistency.get_metadata('positioning') == b'6'
+    assert await persistency.get('test6') == b'value6'
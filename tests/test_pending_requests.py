@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from tonga.models.records.result.result import BaseResult
+from tonga.services.coordinator.client.errors import RequestAlreadyPending, RequestTimeoutError
+from tonga.services.coordinator.client import pending_requests as pending_requests_module
+from tonga.services.coordinator.client.pending_requests import PendingRequests
+
+
+class PendingTestResult(BaseResult):
+    @classmethod
+    def event_name(cls) -> str:
+        return 'tonga.test.result'
+
+
+@pytest.mark.asyncio
+async def test_pending_requests_resolve_by_correlation_id(event_loop):
+    pending_requests = PendingRequests()
+    future = pending_requests.register('request-1', 10, event_loop)
+    with pytest.raises(RequestAlreadyPending):
+        pending_requests.register('request-1', 10, event_loop)
+
+    assert not pending_requests.resolve(PendingTestResult(correlation_id='other'))
+    result = PendingTestResult(correlation_id='request-1')
+    assert pending_requests.resolve(result)
+    assert await future is result
+    await asyncio.sleep(0)
+    assert 'request-1' not in pending_requests
+    assert not pending_requests.resolve(result)
+
+
+@pytest.mark.asyncio
+async def test_pending_requests_timeout(event_loop):
+    pending_requests = PendingRequests(tick=0.01)
+    short_future = pending_requests.register('short', 0.02, event_loop)
+    long_future = pending_requests.register('long', 10, event_loop)
+
+    with pytest.raises(RequestTimeoutError):
+        await asyncio.wait_for(short_future, timeout=1)
+    assert not long_future.done()
+
+    long_future.cancel()
+    await asyncio.sleep(0.05)
+    assert len(pending_requests) == 0
+
+
+
+@pytest.mark.asyncio
+async def test_pending_requests_timeout_between_ticks(event_loop, monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(pending_requests_module, 'time', SimpleNamespace(time=lambda: clock[0]))
+    pending_requests = PendingRequests(tick=0.01)
+    first_future = pending_requests.register('first', 0.1, event_loop)
+    # Registered after first timeout, before expiry tick
+    clock[0] += 0.3
+    second_future = pending_requests.register('second', 10, event_loop)
+
+    with pytest.raises(RequestTimeoutError):
+        await asyncio.wait_for(first_future, timeout=1)
+    assert not second_future.done()
+    second_future.cancel()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+from tonga.services.producer.entry import decode_entry, encode_entry
+
+
+def test_producer_entry_with_key():
+    assert decode_entry(encode_entry('test-topic', b'key', b'value')) == ('test-topic', b'key', b'value')
+    assert decode_entry(encode_entry('test-topic', b'', b'value')) == ('test-topic', b'', b'value')
+
+
+def test_producer_entry_without_key():
+    assert decode_entry(encode_entry('test-topic', None, b'value')) == ('test-topic', None, b'value')
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+import os
+
+import pytest
+
+from tonga.models.store.store_record import StoreRecord
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.services.producer.errors import UnknownEventBase
+from tonga.services.producer.outbox import ProducerOutbox
+
+
+@pytest.mark.asyncio
+async def test_producer_outbox_send_in_order(event_loop, get_avro_serializer, get_fake_producer_factory, tmpdir):
+    producer = get_fake_producer_factory()
+    outbox = ProducerOutbox(producer, get_avro_serializer, str(tmpdir), event_loop, batch_size=2,
+                            max_segment_size=200)
+    outbox.start()
+
+    await asyncio.gather(*[outbox.append(StoreRecord(f'key{i}', StoreRecordType.SET, b'value'), 'test-outbox')
+                           for i in range(5)])
+    for _ in range(20):
+        if not len(outbox):
+            break
+        await asyncio.sleep(0.01)
+    await outbox.stop()
+
+    assert [key for _, key, _ in producer.sent] == [f'key{i}'.encode('utf-8') for i in range(5)]
+    assert all(topic == 'test-outbox' for topic, _, _ in producer.sent)
+
+    with pytest.raises(UnknownEventBase):
+        await outbox.append('test', 'test-outbox')
+
+
+@pytest.mark.asyncio
+async def test_producer_outbox_replay_not_acknowledged(event_loop, get_avro_serializer, get_fake_producer_factory,
+                                                      tmpdir):
+    producer = get_fake_producer_factory()
+    producer.fail = True
+    outbox = ProducerOutbox(producer, get_avro_serializer, str(tmpdir), event_loop, retry_backoff=60)
+    outbox.start()
+    await outbox.append(StoreRecord('key1', StoreRecordType.SET, b'value1'), 'test-outbox')
+    await outbox.append(StoreRecord('key2', StoreRecordType.SET, b'value2'), 'test-outbox')
+    await asyncio.sleep(0.01)
+    await outbox.stop()
+    assert producer.sent == list()
+
+    # Torn write is dropped on load
+    with open(os.path.join(str(tmpdir), '1.log'), 'ab') as segment_file:
+        segment_file.write(b'\x00\x00\x01')
+
+    producer.fail = False
+    outbox = ProducerOutbox(producer, get_avro_serializer, str(tmpdir), event_loop)
+    assert len(outbox) == 2
+    outbox.start()
+    for _ in range(20):
+        if not len(outbox):
+            break
+        await asyncio.sleep(0.01)
+    await outbox.stop()
+    assert [key for _, key, _ in producer.sent] == [b'key1', b'key2']
+
+    # Acknowledged entries are not sent again
+    outbox = ProducerOutbox(producer, get_avro_serializer, str(tmpdir), event_loop)
+    assert len(outbox) == 0
+
+
+@pytest.mark.asyncio
+async def test_producer_outbox_dead_letters(event_loop, get_avro_serializer, get_fake_producer_factory, tmpdir):
+    producer = get_fake_producer_factory()
+    producer.too_large.add(b'key1')
+    outbox = ProducerOutbox(producer, get_avro_serializer, str(tmpdir), event_loop, retry_backoff=60)
+    outbox.start()
+    await asyncio.gather(*[outbox.append(StoreRecord(f'key{i}', StoreRecordType.SET, b'value'), 'test-outbox')
+                           for i in range(3)])
+    for _ in range(20):
+        if not len(outbox):
+            break
+        await asyncio.sleep(0.01)
+    await outbox.stop()
+
+    # Not retriable entry doesn't block next entries
+    assert [key for _, key, _ in producer.sent] == [b'key0', b'key2']
+    assert len(outbox) == 0
+    assert os.path.getsize(os.path.join(str(tmpdir), 'dead_letters')) > 0
+    assert len(ProducerOutbox(producer, get_avro_serializer, str(tmpdir), event_loop)) == 0
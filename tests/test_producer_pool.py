@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+from types import SimpleNamespace
+
+import pytest
+
+from tonga.services.coordinator.client.producer_pool import ProducerPool
+from tonga.services.coordinator.partitioner.key_partitioner import KeyPartitioner
+from tonga.services.producer.kafka_producer import KafkaProducer
+
+
+@pytest.mark.asyncio
+async def test_producer_pool_share_by_key(get_fake_producer_factory):
+    producer_pool = ProducerPool()
+
+    producer = producer_pool.acquire(('all', None), get_fake_producer_factory)
+    assert producer_pool.acquire(('all', None), get_fake_producer_factory) is producer
+    assert producer_pool.acquire((1, None), get_fake_producer_factory) is not producer
+    assert len(producer_pool) == 2
+    assert producer_pool.get_ref_count(producer) == 2
+
+
+@pytest.mark.asyncio
+async def test_producer_pool_stop_on_last_release(get_fake_producer_factory):
+    producer_pool = ProducerPool()
+
+    producer = producer_pool.acquire(('all', None), get_fake_producer_factory)
+    producer_pool.acquire(('all', None), get_fake_producer_factory)
+
+    assert not await producer_pool.release(producer)
+    assert producer.is_running()
+    assert await producer_pool.release(producer)
+    assert not producer.is_running()
+    assert producer.nb_stop == 1
+    assert len(producer_pool) == 0
+    assert producer_pool.get_ref_count(producer) == 0
+
+    # Released key gets a new producer
+    assert producer_pool.acquire(('all', None), get_fake_producer_factory) is not producer
+
+
+@pytest.mark.asyncio
+async def test_producer_pool_release_unknown_producer(get_fake_producer_factory):
+    producer_pool = ProducerPool()
+    with pytest.raises(KeyError):
+        await producer_pool.release(get_fake_producer_factory())
+
+
+@pytest.mark.asyncio
+async def test_producer_pool_stop_shared_producer(event_loop, get_avro_serializer):
+    producer_pool = ProducerPool()
+    client = SimpleNamespace(client_id='test', cur_instance=0, bootstrap_servers='localhost:9092',
+                             get_producer_pool=lambda: producer_pool, get_topic_metadata=lambda: None)
+    producer = KafkaProducer.shared(client=client, serializer=get_avro_serializer, loop=event_loop,
+                                    partitioner=KeyPartitioner())
+    assert KafkaProducer.shared(client=client, serializer=get_avro_serializer, loop=event_loop,
+                                partitioner=KeyPartitioner()) is producer
+
+    # Shared producer stop goes through pool, last stop removes it from pool
+    await producer.stop_producer()
+    assert producer_pool.get_ref_count(producer) == 1
+    await producer.stop_producer()
+    assert len(producer_pool) == 0
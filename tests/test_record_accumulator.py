@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiokafka.errors import KafkaTimeoutError, MessageSizeTooLargeError
+from aiokafka.producer.message_accumulator import BatchBuilder
+
+from tonga.models.store.store_record import StoreRecord
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.services.coordinator.partitioner.base import BasePartitioner
+from tonga.services.producer.accumulator import RecordAccumulator
+from tonga.services.producer.errors import FailToSendRecords
+from tonga.services.producer.kafka_producer import KafkaProducer
+
+
+class AccumulatorTestKafkaProducer:
+    """ AIOKafkaProducer without broker, sent batches are resolved by test """
+
+    def __init__(self, loop, partitions=(0,), batch_size=16384) -> None:
+        self.loop = loop
+        self.partitions = list(partitions)
+        self.batch_size = batch_size
+        self.client = SimpleNamespace(api_version=(2, 0),
+                                      cluster=SimpleNamespace(available_partitions_for_topic=self.available))
+        self._txn_manager = None
+        # Sent batches as (topic, partition, number of records, batch future)
+        self.batches = list()
+
+    def available(self, topic):
+        return set(self.partitions)
+
+    async def partitions_for(self, topic):
+        return set(self.partitions)
+
+    def create_batch(self):
+        return BatchBuilder(2, self.batch_size, 0, is_transactional=False)
+
+    async def send_batch(self, batch, topic, partition):
+        future = self.loop.create_future()
+        self.batches.append((topic, partition, batch.record_count(), future))
+        return future
+
+    def ack(self, index, base_offset):
+        self.batches[index][3].set_result(SimpleNamespace(offset=base_offset))
+
+    def fail(self, index, exception):
+        self.batches[index][3].set_exception(exception)
+
+
+class AccumulatorTestPartitioner(BasePartitioner):
+    """ Keys starting with 'a' go in partition 0, other keys in partition 1 """
+
+    def __call__(self, key, all_partitions, available_partitions):
+        return 0 if key.startswith(b'a') else 1
+
+
+def get_store_record(key, size=8):
+    return StoreRecord(key=key, value=b'x' * size, operation_type=StoreRecordType.SET)
+
+
+def get_accumulator(kafka_producer, serializer, loop, **kwargs):
+    return RecordAccumulator(kafka_producer, serializer, AccumulatorTestPartitioner(), loop, **kwargs)
+
+
+async def wait_batches(kafka_producer, nb_batches):
+    for _ in range(100):
+        if len(kafka_producer.batches) >= nb_batches:
+            return
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_record_accumulator_offsets(event_loop, get_avro_serializer):
+    kafka_producer = AccumulatorTestKafkaProducer(event_loop, partitions=[0, 1])
+    accumulator = get_accumulator(kafka_producer, get_avro_serializer, event_loop, linger=60, max_records=3)
+
+    futures = [await accumulator.append(get_store_record(key), 'test-topic') for key in ['a1', 'a2', 'b1', 'a3']]
+    # Partition 0 batch is full (max_records), partition 1 batch waits linger
+    assert [(topic, partition, nb_records) for topic, partition, nb_records, _ in kafka_producer.batches] == \
+        [('test-topic', 0, 3)]
+
+    kafka_producer.ack(0, 100)
+    flush_task = asyncio.ensure_future(accumulator.flush(), loop=event_loop)
+    await wait_batches(kafka_producer, 2)
+    assert [partition for _, partition, _, _ in kafka_producer.batches] == [0, 1]
+    kafka_producer.ack(1, 7)
+    await asyncio.wait_for(flush_task, timeout=1, loop=event_loop)
+
+    # Record offset is batch base offset + record relative offset
+    assert [(future.result().get_partition(), future.result().get_current_offset()) for future in futures] == \
+        [(0, 100), (0, 101), (1, 7), (0, 102)]
+
+
+@pytest.mark.asyncio
+async def test_record_accumulator_send_on_linger_and_bytes(event_loop, get_avro_serializer):
+    kafka_producer = AccumulatorTestKafkaProducer(event_loop, batch_size=2500)
+    accumulator = get_accumulator(kafka_producer, get_avro_serializer, event_loop, linger=0.01, max_bytes=2500)
+
+    # Record waits in open batch until linger
+    await accumulator.append(get_store_record('a1'), 'test-topic')
+    assert kafka_producer.batches == []
+    await wait_batches(kafka_producer, 1)
+    assert [nb_records for _, _, nb_records, _ in kafka_producer.batches] == [1]
+
+    # Full batch is sent & record is appended in a new batch
+    for key in ['a2', 'a3', 'a4']:
+        await accumulator.append(get_store_record(key, size=60), 'test-topic')
+    assert [nb_records for _, _, nb_records, _ in kafka_producer.batches] == [1, 2]
+    await wait_batches(kafka_producer, 3)
+    assert [nb_records for _, _, nb_records, _ in kafka_producer.batches] == [1, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_record_accumulator_oversized_record(event_loop, get_avro_serializer):
+    kafka_producer = AccumulatorTestKafkaProducer(event_loop, batch_size=2500)
+    accumulator = get_accumulator(kafka_producer, get_avro_serializer, event_loop, linger=60, max_bytes=2500)
+
+    small = await accumulator.append(get_store_record('a1'), 'test-topic')
+    oversized = await accumulator.append(get_store_record('a2', size=3000), 'test-topic')
+
+    # Open batch is sent first, oversized record is sent alone at once
+    assert [nb_records for _, _, nb_records, _ in kafka_producer.batches] == [1, 1]
+    kafka_producer.ack(0, 10)
+    kafka_producer.fail(1, MessageSizeTooLargeError())
+    await asyncio.wait([small, oversized], loop=event_loop)
+    assert small.result().get_current_offset() == 10
+    assert isinstance(oversized.exception(), MessageSizeTooLargeError)
+
+
+@pytest.mark.asyncio
+async def test_record_accumulator_flush_records(event_loop, get_avro_serializer):
+    kafka_producer = AccumulatorTestKafkaProducer(event_loop, partitions=[0, 1])
+    accumulator = get_accumulator(kafka_producer, get_avro_serializer, event_loop, linger=60)
+
+    first = await accumulator.append(get_store_record('a1'), 'test-topic')
+    other = await accumulator.append(get_store_record('b1'), 'test-topic')
+    flush_task = asyncio.ensure_future(accumulator.flush_records([first]), loop=event_loop)
+    await wait_batches(kafka_producer, 1)
+
+    # Only batch of flushed record is sent & awaited
+    assert [partition for _, partition, _, _ in kafka_producer.batches] == [0]
+    kafka_producer.ack(0, 0)
+    await asyncio.wait_for(flush_task, timeout=1, loop=event_loop)
+    assert not other.done()
+
+    flush_task = asyncio.ensure_future(accumulator.flush_records([other]), loop=event_loop)
+    await wait_batches(kafka_producer, 2)
+    kafka_producer.ack(1, 0)
+    await asyncio.wait_for(flush_task, timeout=1, loop=event_loop)
+    assert other.result().get_partition() == 1
+
+
+@pytest.mark.asyncio
+async def test_producer_send_many(event_loop, get_avro_serializer):
+    client = SimpleNamespace(client_id='test', cur_instance=0, bootstrap_servers='localhost:9092',
+                             get_topic_metadata=lambda: None)
+    producer = KafkaProducer(client=client, serializer=get_avro_serializer, loop=event_loop,
+                             partitioner=AccumulatorTestPartitioner(), batch_linger=60)
+    kafka_producer = AccumulatorTestKafkaProducer(event_loop, partitions=[0, 1])
+    producer.__setattr__('_kafka_producer', kafka_producer)
+    producer.__setattr__('_running', True)
+
+    records = [get_store_record(key) for key in ['a1', 'b1', 'a2', 'b2']]
+    send_task = asyncio.ensure_future(producer.send_many(records, 'test-topic'), loop=event_loop)
+    await wait_batches(kafka_producer, 2)
+    kafka_producer.ack(0, 20)
+    kafka_producer.ack(1, 30)
+    positionings = await asyncio.wait_for(send_task, timeout=1, loop=event_loop)
+    # Positionings in input order
+    assert [(positioning.get_partition(), positioning.get_current_offset()) for positioning in positionings] == \
+        [(0, 20), (1, 30), (0, 21), (1, 31)]
+
+    # Partial failure reports positioning or error of each record
+    send_task = asyncio.ensure_future(producer.send_many(records, 'test-topic'), loop=event_loop)
+    await wait_batches(kafka_producer, 4)
+    kafka_producer.ack(2, 22)
+    kafka_producer.fail(3, KafkaTimeoutError())
+    with pytest.raises(FailToSendRecords) as err:
+        await asyncio.wait_for(send_task, timeout=1, loop=event_loop)
+    assert [None if positioning is None else positioning.get_current_offset()
+            for positioning in err.value.positionings] == [22, None, 23, None]
+    assert sorted(err.value.errors) == [1, 3]
+    assert all(isinstance(error, KafkaTimeoutError) for error in err.value.errors.values())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+import time
+
+import pytest
+
+from tonga.models.store.store_record import StoreRecord
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.services.producer.scheduler import RecordScheduler
+
+
+class SchedulerTestSerializer:
+    def encode(self, msg):
+        return msg.value
+
+
+def get_store_record(key):
+    return StoreRecord(key=key, value=key.encode('utf-8'), operation_type=StoreRecordType.SET)
+
+
+@pytest.mark.asyncio
+async def test_record_scheduler_delivers_due_records(event_loop, get_fake_producer_factory,
+                                                     get_kafka_store_manager_factory):
+    store_manager = get_kafka_store_manager_factory(get_fake_producer_factory())
+    producer = get_fake_producer_factory()
+    serializer = SchedulerTestSerializer()
+
+    # Scheduled by a previous run, loaded on start
+    previous = RecordScheduler(producer, store_manager, serializer, event_loop)
+    await previous.schedule(get_store_record('stored'), 'test-topic', time.time() - 1)
+
+    scheduler = RecordScheduler(producer, store_manager, serializer, event_loop, tick=0.01)
+    scheduler.start()
+    await scheduler.schedule(get_store_record('later'), 'test-topic', time.time() + 0.2)
+    await scheduler.schedule(get_store_record('now'), 'test-topic', time.time())
+    await asyncio.sleep(0.1)
+    assert [value for _, _, value in producer.sent] == [b'stored', b'now']
+
+    await asyncio.sleep(0.2)
+    await scheduler.stop()
+    assert [value for _, _, value in producer.sent] == [b'stored', b'now', b'later']
+    # Delivered records are deleted from local store
+    assert await store_manager.get_local_store().__getattribute__('_range_entries').__call__(None, None) == []
+
+
+@pytest.mark.asyncio
+async def test_record_scheduler_cancel_and_retry(event_loop, get_fake_producer_factory,
+                                                 get_kafka_store_manager_factory):
+    store_manager = get_kafka_store_manager_factory(get_fake_producer_factory())
+    producer = get_fake_producer_factory()
+    scheduler = RecordScheduler(producer, store_manager, SchedulerTestSerializer(), event_loop, tick=0.01,
+                                retry_backoff=0.05)
+    scheduler.start()
+
+    cancelled_key = await scheduler.schedule(get_store_record('cancelled'), 'test-topic', time.time() + 0.02)
+    await scheduler.cancel(cancelled_key)
+    producer.fail = True
+    await scheduler.schedule(get_store_record('retried'), 'test-topic', time.time())
+    await asyncio.sleep(0.03)
+    assert producer.sent == []
+
+    producer.fail = False
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+    assert [value for _, _, value in producer.sent] == [b'retried']
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_record_scheduler_batches_schedules(event_loop, get_fake_producer_factory,
+                                                  get_kafka_store_manager_factory):
+    store_producer = get_fake_producer_factory()
+    store_manager = get_kafka_store_manager_factory(store_producer)
+    producer = get_fake_producer_factory()
+    scheduler = RecordScheduler(producer, store_manager, SchedulerTestSerializer(), event_loop, tick=0.01)
+
+    # Schedules of a same loop iteration are written in one store write batch
+    schedule_keys = await asyncio.gather(*[scheduler.schedule(get_store_record(key), 'test-topic', time.time())
+                                           for key in ['a', 'b', 'c']], loop=event_loop)
+    await asyncio.sleep(0)
+    assert len(scheduler) == 3
+    assert sorted(store_record.key for _, store_record in store_producer.records) == sorted(schedule_keys)
+    assert store_manager.commits == [2]
+
+    await scheduler.schedule(get_store_record('d'), 'test-topic', time.time())
+    await asyncio.sleep(0)
+    assert store_manager.commits == [2, 3]
+
+    scheduler.start()
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+    assert sorted(value for _, _, value in producer.sent) == [b'a', b'b', b'c', b'd']
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+
+import pytest
+
+from tonga.services.producer.tracker import SendTracker
+
+
+@pytest.mark.asyncio
+async def test_send_tracker_blocks_on_max_records(event_loop):
+    tracker = SendTracker(event_loop, max_records=2, max_bytes=1024)
+    futures = [event_loop.create_future() for _ in range(3)]
+    done = list()
+
+    for future in futures[:2]:
+        await tracker.acquire(10)
+        tracker.track(future, 10, done.append)
+    assert tracker.get_stats()['in_flight_records'] == 2
+
+    third_acquire = asyncio.ensure_future(tracker.acquire(10), loop=event_loop)
+    await asyncio.sleep(0.01)
+    assert not third_acquire.done()
+
+    futures[0].set_result(None)
+    await asyncio.wait_for(third_acquire, timeout=1)
+    tracker.track(futures[2], 10)
+    assert done == [futures[0]]
+    assert tracker.get_stats() == {'in_flight_records': 2, 'in_flight_bytes': 20, 'sent': 1, 'failed': 0}
+
+
+@pytest.mark.asyncio
+async def test_send_tracker_blocks_on_max_bytes(event_loop):
+    tracker = SendTracker(event_loop, max_records=100, max_bytes=100)
+    first = event_loop.create_future()
+
+    # A record bigger than max_bytes is accepted when nothing is in flight
+    await tracker.acquire(150)
+    tracker.track(first, 150)
+    second_acquire = asyncio.ensure_future(tracker.acquire(10), loop=event_loop)
+    await asyncio.sleep(0.01)
+    assert not second_acquire.done()
+
+    first.set_result(None)
+    await asyncio.wait_for(second_acquire, timeout=1)
+    assert tracker.get_stats()['in_flight_bytes'] == 10
+
+
+@pytest.mark.asyncio
+async def test_send_tracker_collects_errors_and_waits_all(event_loop):
+    tracker = SendTracker(event_loop, max_errors=1)
+    futures = [event_loop.create_future() for _ in range(3)]
+    for future in futures:
+        await tracker.acquire(1)
+        tracker.track(future, 1)
+
+    wait_all = asyncio.ensure_future(tracker.wait_all(), loop=event_loop)
+    futures[0].set_exception(TimeoutError())
+    futures[1].set_exception(ValueError())
+    await asyncio.sleep(0.01)
+    assert not wait_all.done()
+
+    futures[2].set_result(None)
+    await asyncio.wait_for(wait_all, timeout=1)
+    errors = tracker.pop_errors()
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+    assert tracker.pop_errors() == []
+    assert tracker.get_stats() == {'in_flight_records': 0, 'in_flight_bytes': 0, 'sent': 1, 'failed': 2}
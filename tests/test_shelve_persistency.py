@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import pytest
+
+from tonga.errors import StoreKeyNotFound
+from tonga.models.structs.store_record_type import StoreRecordType
+
+
+@pytest.mark.asyncio
+async def test_shelve_persistency_set_get_delete(get_shelve_persistency):
+    shelve_persistency = get_shelve_persistency
+
+    await shelve_persistency.set('test1', b'value1')
+    assert await shelve_persistency.get('test1') == b'value1'
+
+    await shelve_persistency.delete('test1')
+    with pytest.raises(StoreKeyNotFound):
+        await shelve_persistency.get('test1')
+    with pytest.raises(StoreKeyNotFound):
+        await shelve_persistency.delete('test1')
+
+
+@pytest.mark.asyncio
+async def test_shelve_persistency_executor_stats(get_shelve_persistency):
+    shelve_persistency = get_shelve_persistency
+    executor = shelve_persistency.get_executor()
+    executor.reset_stats()
+
+    await shelve_persistency.set('test2', b'value2')
+    assert await shelve_persistency.get('test2') == b'value2'
+
+    stats = executor.get_stats()
+    assert stats['calls'] == 2
+    assert stats['execution_total'] >= stats['execution_max'] >= 0
+    assert stats['queue_wait_total'] >= stats['queue_wait_max'] >= 0
+
+
+@pytest.mark.asyncio
+async def test_shelve_persistency_batch(get_shelve_persistency):
+    shelve_persistency = get_shelve_persistency
+    executor = shelve_persistency.get_executor()
+
+    await shelve_persistency.set_many({'test3': b'value3', 'test4': b'value4'})
+    executor.reset_stats()
+    assert await shelve_persistency.get_many(['test3', 'test4', 'toto']) == {'test3': b'value3',
+                                                                             'test4': b'value4'}
+    assert executor.get_stats()['calls'] == 1
+
+    await shelve_persistency.delete_many(['test3', 'toto'])
+    assert await shelve_persistency.get_many(['test3', 'test4']) == {'test4': b'value4'}
+
+
+@pytest.mark.asyncio
+async def test_shelve_persistency_metadata(get_shelve_persistency):
+    shelve_persistency = get_shelve_persistency
+
+    await shelve_persistency.write_batch([('meta1', b'value1', StoreRecordType.SET)],
+                                         metadata={'positioning': b'1'})
+    await shelve_persistency.set_metadata('other', b'2')
+    assert await shelve_persistency.get_metadata('positioning') == b'1'
+    assert await shelve_persistency.get_metadata('other') == b'2'
+    assert await shelve_persistency.get_metadata('toto') is None
+    # Metadata entry is hidden from range reads
+    assert await shelve_persistency.range(end='meta2') == [('meta1', b'value1')]
+    keys = await shelve_persistency.all_keys()
+    assert 'meta1' in keys
+    assert all(not key.startswith('\x00tonga') for key in keys)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import random
+from itertools import islice
+
+import pytest
+
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.persistency.memory import MemoryPersistency
+from tonga.stores.persistency.sorted_keys import SortedKeys
+
+
+def test_sorted_keys_random_operations():
+    rand = random.Random(42)
+    sorted_keys = SortedKeys(load=4)
+    reference = set()
+    for _ in range(3000):
+        key = f'key:{rand.randrange(200):03d}'
+        if rand.random() < 0.6:
+            sorted_keys.add(key)
+            reference.add(key)
+        else:
+            sorted_keys.discard(key)
+            reference.discard(key)
+        assert len(sorted_keys) == len(reference)
+
+        start = None if rand.random() < 0.2 else f'key:{rand.randrange(210):03d}'
+        end = None if rand.random() < 0.2 else f'key:{rand.randrange(210):03d}'
+        expected = sorted(key for key in reference if (start is None or key >= start) and (end is None or key < end))
+        assert list(sorted_keys.irange(start, end)) == expected
+        assert list(sorted_keys.irange(start, end, reverse=True)) == expected[::-1]
+    assert list(sorted_keys) == sorted(reference)
+
+
+def test_sorted_keys_empty_and_bounds():
+    sorted_keys = SortedKeys(load=2)
+    assert list(sorted_keys.irange('a', 'z')) == []
+    assert list(sorted_keys.irange(reverse=True)) == []
+
+    for key in ['d', 'b', 'f', 'a', 'e', 'c', 'b']:
+        sorted_keys.add(key)
+    assert list(sorted_keys) == ['a', 'b', 'c', 'd', 'e', 'f']
+    assert list(sorted_keys.irange('z')) == []
+    assert list(sorted_keys.irange(None, '0', reverse=True)) == []
+    assert list(islice(sorted_keys.irange('b', reverse=True), 2)) == ['f', 'e']
+
+    sorted_keys.discard('x')
+    for key in ['a', 'b', 'c', 'd', 'e', 'f']:
+        sorted_keys.discard(key)
+    assert len(sorted_keys) == 0
+    assert list(sorted_keys) == []
+
+
+@pytest.mark.asyncio
+async def test_memory_persistency_range_after_writes(event_loop):
+    persistency = MemoryPersistency()
+    persistency.__getattribute__('_set_initialize').__call__()
+    await persistency.set_many({f'bill:{i:03d}': b'v' for i in range(100)})
+    sorted_keys = persistency.__getattribute__('_keys')
+
+    # Sets & deletes between range reads update sorted keys in place, keys are never sorted again
+    for i in range(100, 150):
+        await persistency.set(f'bill:{i:03d}', b'n')
+        await persistency.delete(f'bill:{i - 100:03d}')
+        assert await persistency.scan('bill:', limit=1) == [(f'bill:{i - 99:03d}', b'v')]
+        assert await persistency.scan('bill:', reverse=True, limit=1) == [(f'bill:{i:03d}', b'n')]
+    assert persistency.__getattribute__('_keys') is sorted_keys
+    assert [key for key, _ in await persistency.range('bill:048', 'bill:052')] == ['bill:050', 'bill:051']
+
+    await persistency.write_batch([('bill:120', b'', StoreRecordType.DEL), ('bill:000', b'z', StoreRecordType.SET)])
+    assert (await persistency.scan('bill:', limit=2)) == [('bill:000', b'z'), ('bill:050', b'v')]
+    assert len(await persistency.scan('bill:')) == 100
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import pytest
+
+from tonga.errors import StoreKeyNotFound, UninitializedStore
+from tonga.models.structs.store_record_type import StoreRecordType
+
+
+@pytest.mark.asyncio
+async def test_sqlite_persistency_build(get_sqlite_persistency):
+    sqlite_persistency = get_sqlite_persistency
+    with pytest.raises(UninitializedStore):
+        await sqlite_persistency.get('test1')
+
+    await sqlite_persistency.__getattribute__('_build_operations').__call__('test1', b'value1', StoreRecordType.SET)
+    await sqlite_persistency.__getattribute__('_build_operations').__call__('test2', b'value2', StoreRecordType.SET)
+    await sqlite_persistency.__getattribute__('_build_operations').__call__('test1', b'', StoreRecordType.DEL)
+    # Metadata is written in the same transaction as last build operations
+    await sqlite_persistency.set_metadata('positioning', b'3')
+
+    sqlite_persistency.__getattribute__('_set_initialize').__call__()
+    assert sqlite_persistency.is_initialize()
+
+    with pytest.raises(StoreKeyNotFound):
+        await sqlite_persistency.get('test1')
+    assert await sqlite_persistency.get('test2') == b'value2'
+    assert await sqlite_persistency.get_metadata('positioning') == b'3'
+
+
+@pytest.mark.asyncio
+async def test_sqlite_persistency_set_get_delete(get_sqlite_persistency):
+    sqlite_persistency = get_sqlite_persistency
+
+    await sqlite_persistency.set('test3', b'value3')
+    assert await sqlite_persistency.get('test3') == b'value3'
+
+    await sqlite_persistency.delete('test3')
+    with pytest.raises(StoreKeyNotFound):
+        await sqlite_persistency.get('test3')
+    with pytest.raises(StoreKeyNotFound):
+        await sqlite_persistency.delete('test3')
+
+
+@pytest.mark.asyncio
+async def test_sqlite_persistency_batch_range(get_sqlite_persistency):
+    sqlite_persistency = get_sqlite_persistency
+
+    await sqlite_persistency.write_batch([('test4', b'value4', StoreRecordType.SET),
+                                          ('test5', b'value5', StoreRecordType.SET),
+                                          ('test2', b'', StoreRecordType.DEL)], metadata={'positioning': b'6'})
+
+    assert await sqlite_persistency.get_many(['test2', 'test4', 'test5']) == {'test4': b'value4', 'test5': b'value5'}
+    assert await sqlite_persistency.get_metadata('positioning') == b'6'
+    assert await sqlite_persistency.scan('test', reverse=True, limit=1) == [('test5', b'value5')]
+    keys = await sqlite_persistency.all_keys()
+    assert {'test4', 'test5'} <= set(keys)
+    assert 'test2' not in keys
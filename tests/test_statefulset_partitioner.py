@@ -21,3 +21,8 @@ def test_statefulset_partitioner_bad_instance():
 
     with pytest.raises(OutsideInstanceNumber):
         statefulset_partitioner.__call__(uuid.uuid4().hex, [0, 1, 2, 3], [0, 1, 2, 3])
+
+
+def test_statefulset_partitioner_pool_key():
+    assert StatefulsetPartitioner(instance=1).get_pool_key() == StatefulsetPartitioner(instance=1).get_pool_key()
+    assert StatefulsetPartitioner(instance=1).get_pool_key() != StatefulsetPartitioner(instance=2).get_pool_key()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+import json
+
+import pytest
+
+from tonga.models.structs.persistency_type import PersistencyType
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import BadEntryType, UnknownStoreIndex
+from tonga.stores.global_store import GlobalStore
+from tonga.stores.local_store import LocalStore
+from tonga.stores.persistency.memory import MemoryPersistency
+
+
+def bill_id_extractor(key: str, value: bytes):
+    return [json.loads(value)['bill_id']]
+
+
+def coffee(bill_id: str) -> bytes:
+    return json.dumps({'bill_id': bill_id}).encode()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('write_behind', [False, True])
+async def test_local_store_index(event_loop, write_behind):
+    local_store = LocalStore(db_type=PersistencyType.MEMORY, loop=event_loop, write_behind=write_behind)
+    local_store.add_index('bill', bill_id_extractor)
+
+    # Indexes are built with store
+    await local_store.__getattribute__('_build_set').__call__('coffee:1', coffee('bill:1'))
+    await local_store.__getattribute__('_build_batch').__call__([('coffee:2', coffee('bill:1'), StoreRecordType.SET),
+                                                                 ('coffee:3', coffee('bill:2'), StoreRecordType.SET)])
+    await local_store.__getattribute__('_build_delete').__call__('coffee:2')
+    local_store.get_persistency().__getattribute__('_set_initialize').__call__()
+
+    assert await local_store.get_index_keys('bill', 'bill:1') == ['coffee:1']
+    assert await local_store.get_by_index('bill', 'bill:2') == {'coffee:3': coffee('bill:2')}
+
+    # Changed index key moves entry
+    await local_store.set('coffee:3', coffee('bill:1'))
+    await local_store.set_many({'coffee:4': coffee('bill:1'), 'coffee:5': coffee('bill:3')})
+    await local_store.delete('coffee:1')
+    assert await local_store.get_index_keys('bill', 'bill:1') == ['coffee:3', 'coffee:4']
+    assert await local_store.get_index_keys('bill', 'bill:2') == []
+
+    await local_store.flush()
+    assert await local_store.get_index_keys('bill', 'bill:3') == ['coffee:5']
+    # Index entries are reserved keys
+    assert [key for key, _ in await local_store.scan()] == ['coffee:3', 'coffee:4', 'coffee:5']
+
+
+@pytest.mark.asyncio
+async def test_global_store_index():
+    global_store = GlobalStore(db_type=PersistencyType.MEMORY, projection=lambda key, value: value)
+    global_store.add_index('bill', bill_id_extractor)
+
+    await global_store.__getattribute__('_build_batch').__call__([('coffee:1', coffee('bill:1'), StoreRecordType.SET),
+                                                                  ('coffee:1', coffee('bill:2'), StoreRecordType.SET),
+                                                                  ('coffee:2', coffee('bill:2'), StoreRecordType.SET)])
+    global_store.get_persistency().__getattribute__('_set_initialize').__call__()
+
+    assert await global_store.get_index_keys('bill', 'bill:1') == []
+    assert await global_store.get_index_keys('bill', 'bill:2') == ['coffee:1', 'coffee:2']
+    assert len(await global_store.scan()) == 2
+
+    with pytest.raises(UnknownStoreIndex):
+        await global_store.get_index_keys('table', 'table:1')
+    with pytest.raises(BadEntryType):
+        await global_store.get_index_keys('bill', 'bill\x001')
+
+
+@pytest.mark.asyncio
+async def test_global_store_index_build_point_reads(event_loop):
+    global_store = GlobalStore(db_type=PersistencyType.MEMORY)
+    global_store.add_index('bill', bill_id_extractor)
+    persistency = global_store.get_persistency()
+    read_keys = list()
+
+    async def range_entries(start, end, reverse, limit):
+        raise AssertionError('range read on build')
+
+    async def get_many(keys):
+        read_keys.append(sorted(keys))
+        return await MemoryPersistency.build_get_many(persistency, keys)
+
+    persistency.__setattr__('_range', range_entries)
+    persistency.__setattr__('build_get_many', get_many)
+
+    # Current values of built keys are read by key, without range scan
+    await global_store.__getattribute__('_build_set').__call__('coffee:1', coffee('bill:1'))
+    await global_store.__getattribute__('_build_set').__call__('coffee:1', coffee('bill:2'))
+    await global_store.__getattribute__('_build_delete').__call__('coffee:1')
+    assert read_keys == [['coffee:1'], ['coffee:1'], ['coffee:1']]
+    persistency.__delattr__('_range')
+    persistency.__getattribute__('_set_initialize').__call__()
+
+    assert await global_store.get_index_keys('bill', 'bill:1') == []
+    assert await global_store.get_index_keys('bill', 'bill:2') == []
+    assert await global_store.scan() == []
+
+
+@pytest.mark.asyncio
+async def test_local_store_index_concurrent_writes(event_loop):
+    local_store = LocalStore(db_type=PersistencyType.MEMORY, loop=event_loop, write_behind=True)
+    local_store.add_index('bill', bill_id_extractor)
+    await local_store.__getattribute__('_build_set').__call__('coffee:1', coffee('bill:1'))
+    persistency = local_store.get_persistency()
+    persistency.__getattribute__('_set_initialize').__call__()
+
+    # Slow persistency reads, like a persistency backed by an executor
+    get_many = persistency.get_many
+
+    async def slow_get_many(keys):
+        await asyncio.sleep(0.01)
+        return await get_many(keys)
+    persistency.get_many = slow_get_many
+
+    # Both writes read current value of same key, index entries must follow last write only
+    await asyncio.gather(local_store.set('coffee:1', coffee('bill:2')), local_store.set('coffee:1', coffee('bill:3')),
+                         loop=event_loop)
+    assert await local_store.get_index_keys('bill', 'bill:1') == []
+    assert await local_store.get_index_keys('bill', 'bill:2') == []
+    assert await local_store.get_index_keys('bill', 'bill:3') == ['coffee:1']
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import asyncio
+
+import pytest
+from aiokafka.errors import KafkaError
+
+from tonga.services.producer.errors import UnknownEventBase
+from tonga.stores.manager.errors import FailToSendStoreRecord
+
+
+async def get_stored_offset(store_manager):
+    return await store_manager.__getattribute__('_KafkaStoreManager__get_stored_offset').__call__(
+        store_manager.get_local_store(), 0)
+
+
+@pytest.mark.asyncio
+async def test_store_manager_write_ends_ticket_on_send_error(event_loop, get_fake_producer_factory,
+                                                             get_kafka_store_manager_factory):
+    producer = get_fake_producer_factory()
+    producer.errors = {'a': KafkaError(), 'b': UnknownEventBase(), 'c': asyncio.CancelledError()}
+    store_manager = get_kafka_store_manager_factory(producer)
+
+    with pytest.raises(FailToSendStoreRecord):
+        await store_manager.set_entry_in_local_store('a', b'1')
+    with pytest.raises(UnknownEventBase):
+        await store_manager.set_entry_in_local_store('b', b'1')
+    with pytest.raises(asyncio.CancelledError):
+        await store_manager.delete_entry_in_local('c')
+    # Failed writes don't hold watermark back
+    assert len(store_manager.__getattribute__('_write_watermark')) == 0
+
+    await store_manager.set_entry_in_local_store('d', b'4')
+    await store_manager.set_entry_in_local_store('e', b'5')
+    await asyncio.sleep(0)
+    assert await store_manager.get_many_in_local_store(['a', 'd', 'e']) == {'d': b'4', 'e': b'5'}
+    assert await get_stored_offset(store_manager) == 2
+    assert store_manager.commits == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_store_manager_write_batch_applies_acknowledged_records(event_loop, get_fake_producer_factory,
+                                                                      get_kafka_store_manager_factory):
+    producer = get_fake_producer_factory()
+    producer.errors = {'b': KafkaError()}
+    store_manager = get_kafka_store_manager_factory(producer)
+
+    # Records acknowledged before & after failed one are in changelog, they are applied in local store
+    with pytest.raises(FailToSendStoreRecord):
+        await store_manager.set_many_in_local_store({'a': b'1', 'b': b'2', 'c': b'3'})
+    assert [store_record.key for _, store_record in producer.records] == ['a', 'c']
+    assert await store_manager.get_many_in_local_store(['a', 'b', 'c']) == {'a': b'1', 'c': b'3'}
+    assert await get_stored_offset(store_manager) == 2
+    assert len(store_manager.__getattribute__('_write_watermark')) == 0
+
+    with pytest.raises(FailToSendStoreRecord):
+        async with store_manager.write_batch() as batch:
+            batch.delete('b')
+    assert await get_stored_offset(store_manager) == 2
+
+    # Batch sent again once producer recovers
+    producer.errors = dict()
+    await store_manager.set_many_in_local_store({'a': b'1', 'b': b'2', 'c': b'3'})
+    assert await store_manager.get_many_in_local_store(['a', 'b', 'c']) == {'a': b'1', 'b': b'2', 'c': b'3'}
+    assert await get_stored_offset(store_manager) == 5
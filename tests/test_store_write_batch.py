@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+import pytest
+
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import BadEntryType
+from tonga.stores.manager.kafka_store_manager import KafkaStoreManager
+from tonga.stores.manager.write_batch import StoreWriteBatch
+
+
+class WriteBatchTestStoreManager:
+    """ Store manager without Kafka, records each written batch """
+
+    def __init__(self) -> None:
+        self.written = list()
+
+    async def _write_store_records(self, store_records):
+        self.written.append(store_records)
+
+
+def get_kafka_store_manager():
+    # KafkaStoreManager without client, only write batch path is used
+    store_manager = KafkaStoreManager.__new__(KafkaStoreManager)
+    store_manager.written = list()
+
+    async def write_store_records(store_records):
+        store_manager.written.append(store_records)
+
+    store_manager.__setattr__('_write_store_records', write_store_records)
+    return store_manager
+
+
+def operations(store_records):
+    return [(store_record.key, store_record.operation_type, store_record.value) for store_record in store_records]
+
+
+@pytest.mark.asyncio
+async def test_store_write_batch_last_operation_by_key(event_loop):
+    store_manager = WriteBatchTestStoreManager()
+    async with StoreWriteBatch(store_manager) as batch:
+        batch.set('a', b'1')
+        batch.set('b', b'2')
+        batch.delete('a')
+        batch.set('c', b'3')
+        batch.set('b', b'4', ttl=10)
+        assert len(batch) == 3
+
+    # One send, last operation of each key, in order of last operation
+    assert len(store_manager.written) == 1
+    assert operations(store_manager.written[0]) == [('a', StoreRecordType.DEL, b''), ('c', StoreRecordType.SET, b'3'),
+                                                    ('b', StoreRecordType.SET, b'4')]
+    assert store_manager.written[0][2].ttl == 10
+    assert len(batch) == 0
+
+    with pytest.raises(BadEntryType):
+        batch.set('a', 'not bytes')
+    with pytest.raises(BadEntryType):
+        batch.delete(1)
+
+
+@pytest.mark.asyncio
+async def test_store_write_batch_empty(event_loop):
+    store_manager = WriteBatchTestStoreManager()
+    async with StoreWriteBatch(store_manager):
+        pass
+    batch = StoreWriteBatch(store_manager)
+    await batch.commit()
+    batch.set('a', b'1')
+    await batch.commit()
+    # Committed batch is empty again
+    await batch.commit()
+
+    assert [operations(store_records) for store_records in store_manager.written] == \
+        [[('a', StoreRecordType.SET, b'1')]]
+
+
+@pytest.mark.asyncio
+async def test_store_write_batch_discard_on_exception(event_loop):
+    store_manager = WriteBatchTestStoreManager()
+    with pytest.raises(KeyError):
+        async with StoreWriteBatch(store_manager) as batch:
+            batch.set('a', b'1')
+            raise KeyError('a')
+
+    assert store_manager.written == []
+    assert len(batch) == 0
+
+
+@pytest.mark.asyncio
+async def test_store_manager_set_delete_many(event_loop):
+    store_manager = get_kafka_store_manager()
+    await store_manager.set_many_in_local_store({'a': b'1', 'b': b'2'})
+    await store_manager.delete_many_in_local_store(['b', 'a', 'b'])
+    await store_manager.set_many_in_local_store({})
+    await store_manager.delete_many_in_local_store([])
+
+    assert [operations(store_records) for store_records in store_manager.written] == \
+        [[('a', StoreRecordType.SET, b'1'), ('b', StoreRecordType.SET, b'2')],
+         [('a', StoreRecordType.DEL, b''), ('b', StoreRecordType.DEL, b'')]]
+
+    with pytest.raises(BadEntryType):
+        await store_manager.set_many_in_local_store({'a': 'not bytes'})
+    assert len(store_manager.written) == 2
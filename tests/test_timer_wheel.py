@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+from datetime import datetime, timezone
+
+from tonga.models.store.store_record import StoreRecord
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.services.coordinator.async_coordinator.timer_wheel import TimerWheel
+
+
+def test_timer_wheel_schedule_advance():
+    timer_wheel = TimerWheel(tick=1.0, now=0)
+
+    timer_wheel.schedule('test1', 3)
+    timer_wheel.schedule('test2', 2.5)
+    assert timer_wheel.get_expiry('test2') == 3
+    assert len(timer_wheel) == 2
+
+    assert timer_wheel.advance(2) == []
+    assert sorted(timer_wheel.advance(3)) == ['test1', 'test2']
+    assert 'test1' not in timer_wheel
+
+
+def test_timer_wheel_cancel_reschedule():
+    timer_wheel = TimerWheel(tick=1.0, now=0)
+
+    timer_wheel.schedule('test1', 3)
+    timer_wheel.schedule('test2', 3)
+    assert timer_wheel.cancel('test1')
+    assert not timer_wheel.cancel('test1')
+    timer_wheel.schedule('test2', 5)
+
+    assert timer_wheel.advance(4) == []
+    assert timer_wheel.advance(5) == ['test2']
+
+
+def test_timer_wheel_past_expiry():
+    timer_wheel = TimerWheel(tick=1.0, now=10)
+
+    timer_wheel.schedule('test1', 1)
+    assert timer_wheel.advance(10) == []
+    assert timer_wheel.advance(11) == ['test1']
+
+
+def test_timer_wheel_cascade():
+    # 2 levels of 4 slots, timers after 16 ticks stay in last level until reached
+    timer_wheel = TimerWheel(tick=1.0, wheel_bits=2, levels=2, now=0)
+
+    expiries = {f'test{i}': i * 3 for i in range(1, 20)}
+    for key, expires_at in expiries.items():
+        timer_wheel.schedule(key, expires_at)
+
+    expired = dict()
+    for now in range(1, 60):
+        for key in timer_wheel.advance(now):
+            expired[key] = now
+    assert expired == expiries
+    assert len(timer_wheel) == 0
+
+
+def test_store_record_ttl():
+    date = datetime(2019, 7, 1, tzinfo=timezone.utc)
+    store_record = StoreRecord(key='test1', operation_type=StoreRecordType.SET, value=b'value1', date=date,
+                               ttl=1.5)
+    assert store_record.expires_at() == date.timestamp() + 1.5
+
+    store_record = StoreRecord.from_dict(store_record.to_dict())
+    assert store_record.date == date
+    assert store_record.ttl == 1.5
+    assert StoreRecord(key='test1', operation_type=StoreRecordType.SET, value=b'value1').expires_at() is None
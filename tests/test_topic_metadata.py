@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+from types import SimpleNamespace
+
+import pytest
+from kafka.cluster import ClusterMetadata
+from kafka.protocol.metadata import MetadataResponse
+
+from tonga.services.coordinator.client.topic_metadata import TopicMetadataCache
+
+
+def get_metadata_response(leaders):
+    partitions = [(0, partition, leader, [0, 1], [0]) for partition, leader in leaders.items()]
+    return MetadataResponse[0](brokers=[(0, 'localhost', 9092), (1, 'localhost', 9093)],
+                               topics=[(0, 'test-topic', partitions)])
+
+
+@pytest.mark.asyncio
+async def test_topic_metadata_cache_fed_by_attached_client(event_loop):
+    topic_metadata = TopicMetadataCache(refresh_interval=0)
+    cluster = ClusterMetadata()
+    kafka_client = SimpleNamespace(cluster=cluster)
+
+    assert topic_metadata.partitions_for('test-topic') is None
+    topic_metadata.attach(kafka_client, event_loop)
+    cluster.update_metadata(get_metadata_response({1: 0, 0: 1, 2: -1}))
+
+    metadata = topic_metadata.get('test-topic')
+    assert metadata.partitions == [0, 1, 2]
+    assert metadata.available_partitions == [0, 1]
+    assert metadata.leaders == {0: 1, 1: 0, 2: -1}
+    assert metadata.replicas[0] == [0, 1]
+    assert metadata.isr[0] == [0]
+
+    # Detached client updates are ignored, cached metadata is kept
+    topic_metadata.detach(kafka_client)
+    cluster.update_metadata(get_metadata_response({0: 1}))
+    assert topic_metadata.partitions_for('test-topic') == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_topic_metadata_cache_invalidate(event_loop):
+    topic_metadata = TopicMetadataCache(refresh_interval=0)
+    cluster = ClusterMetadata()
+    cluster.update_metadata(get_metadata_response({0: 0}))
+    topic_metadata.update(cluster)
+    assert len(topic_metadata) == 1
+
+    topic_metadata.invalidate('test-topic', event_loop)
+    assert topic_metadata.get('test-topic') is None
+    assert await topic_metadata.fetch('test-topic') is None
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+from tonga.stores.manager.write_watermark import WriteWatermark
+
+
+def test_write_watermark_waits_for_lower_offsets():
+    watermark = WriteWatermark(position=10)
+    first = watermark.begin()
+    second = watermark.begin()
+
+    # Second write is acknowledged & applied before first one, first one may hold offset 10
+    watermark.acknowledged(second, 11, 12)
+    assert watermark.position(second) == 10
+    watermark.done(second)
+
+    watermark.acknowledged(first, 10, 10)
+    assert watermark.position(first) == 13
+    watermark.done(first)
+    assert len(watermark) == 0
+
+
+def test_write_watermark_never_goes_backward():
+    watermark = WriteWatermark()
+    first = watermark.begin()
+    # No acknowledged offset yet, position is unknown
+    second = watermark.begin()
+    watermark.acknowledged(first, 5, 5)
+    assert watermark.position(first) is None
+    watermark.done(first)
+
+    watermark.acknowledged(second, 6, 7)
+    assert watermark.position(second) == 8
+    watermark.done(second)
+
+    # Started after offset 7 acknowledgment, bounded by 8
+    third = watermark.begin()
+    fourth = watermark.begin()
+    watermark.acknowledged(fourth, 9, 9)
+    assert watermark.position(fourth) == 8
+    watermark.done(fourth)
+    watermark.done(third)
+    assert watermark.position(watermark.begin()) == 10
@@ -23,7 +23,8 @@ from tonga.services.coordinator.assignors.errors import BadAssignorPolicy
 from tonga.services.producer.errors import (ProducerConnectionError, AioKafkaProducerBadParams, KafkaProducerError,
                                             KafkaProducerNotStartedError, KafkaProducerAlreadyStartedError,
                                             KafkaProducerTimeoutError, KeyErrorSendEvent, ValueErrorSendEvent,
-                                            TypeErrorSendEvent, FailToSendEvent, UnknownEventBase, FailToSendBatch)
+                                            TypeErrorSendEvent, FailToSendEvent, UnknownEventBase, FailToSendBatch,
+                                            RecordTooLarge)
 
 # Import Consumer exceptions
 from tonga.services.consumer.errors import (ConsumerConnectionError, AioKafkaConsumerBadParams, KafkaConsumerError,
@@ -70,6 +71,7 @@ __all__ = [
     'FailToSendEvent',
     'UnknownEventBase',
     'FailToSendBatch',
+    'RecordTooLarge',
     # Consumer exceptions
     'ConsumerConnectionError',
     'AioKafkaConsumerBadParams',
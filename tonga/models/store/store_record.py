@@ -9,7 +9,7 @@ More detail in BaseStoreRecord
 """
 from datetime import datetime, timezone
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from tonga.models.structs.store_record_type import StoreRecordType
 
@@ -30,15 +30,17 @@ class StoreRecord:
                    Kafka compaction. Use an UUID for store value
         operation_type (StoreRecordType): Record type (possible value *set* / *del*)
         value (bytes): Record value as bytes format
+        ttl (Optional[float]): Entry time to live in seconds from record date, None if entry never expires
     """
     schema_version: str
     date: datetime
     key: str
     operation_type: StoreRecordType
     value: bytes
+    ttl: Optional[float]
 
     def __init__(self, key: str, operation_type: StoreRecordType, value: bytes,
-                 schema_version: str = None, date: datetime = None) -> None:
+                 schema_version: str = None, date: datetime = None, ttl: Optional[float] = None) -> None:
         """ BaseStoreRecord constructor
 
         Args:
@@ -50,6 +52,7 @@ class StoreRecord:
             schema_version (str): Includes the schema version of the record, it helps to keep applications compatible
                                   with older records in the system
             date (datetime): Datetime object
+            ttl (Optional[float]): Entry time to live in seconds from record date, None if entry never expires
 
         Returns:
             None
@@ -61,10 +64,23 @@ class StoreRecord:
 
         if date is None:
             self.date = datetime.now(timezone.utc)
+        else:
+            self.date = date
 
         self.key = key
         self.operation_type = operation_type
         self.value = value
+        self.ttl = ttl
+
+    def expires_at(self) -> Optional[float]:
+        """ Return entry expiration time (UNIX timestamp in seconds), computed from record date
+
+        Returns:
+            Optional[float]: Expiration time, None if entry never expires
+        """
+        if self.ttl is None:
+            return None
+        return self.date.timestamp() + self.ttl
 
     def to_dict(self) -> Dict[str, Any]:
         """ Serialize BaseRecord to dict
@@ -78,7 +94,8 @@ class StoreRecord:
             'timestamp': self.date.timestamp() * 1000,
             'operation_type': self.operation_type.value,
             'key': self.key,
-            'value': self.value
+            'value': self.value,
+            'ttl': None if self.ttl is None else int(self.ttl * 1000)
         }
 
     @classmethod
@@ -95,7 +112,8 @@ class StoreRecord:
                    operation_type=StoreRecordType(dict_data['operation_type']),
                    value=dict_data['value'],
                    schema_version=dict_data['schema_version'],
-                   date=datetime.fromtimestamp(dict_data['timestamp'] / 1000, timezone.utc))
+                   date=datetime.fromtimestamp(dict_data['timestamp'] / 1000, timezone.utc),
+                   ttl=None if dict_data.get('ttl') is None else dict_data['ttl'] / 1000)
 
     @classmethod
     def event_name(cls) -> str:
@@ -66,16 +66,12 @@ class StoreRecordHandler(BaseStoreRecordHandler):
             None
         """
 
-        # Set or delete from local store
-        if store_record.operation_type == StoreRecordType('set'):
-            await self._store_manager.set_from_local_store_rebuild(store_record.key, store_record.value)
-        elif store_record.operation_type == StoreRecordType('del'):
-            await self._store_manager.delete_from_local_store_rebuild(store_record.key)
-        else:
+        if store_record.operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
             raise UnknownStoreRecordType
-        # Update metadata from local store
+        # Set or delete from local store, committed with next offset to consume
         positioning.set_current_offset(positioning.get_current_offset() + 1)
-        await self._store_manager.update_metadata_from_local_store(positioning)
+        await self._store_manager.__getattribute__('_build_store_record_in_local_store').__call__(store_record,
+                                                                                                   positioning)
 
     async def global_store_handler(self, store_record: StoreRecord, positioning: BasePositioning) -> None:
         """ This function is automatically call by Tonga when an BaseStore with same name was receive by consumer.
@@ -92,13 +88,9 @@ class StoreRecordHandler(BaseStoreRecordHandler):
             None
         """
 
-        # Set or delete from global store
-        if store_record.operation_type == StoreRecordType('set'):
-            await self._store_manager.set_from_global_store(store_record.key, store_record.value)
-        elif store_record.operation_type == StoreRecordType('del'):
-            await self._store_manager.delete_from_global_store(store_record.key)
-        else:
+        if store_record.operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
             raise UnknownStoreRecordType
-        # Update metadata from global store
+        # Set or delete from global store, committed with next offset to consume
         positioning.set_current_offset(positioning.get_current_offset() + 1)
-        await self._store_manager.update_metadata_from_global_store(positioning)
+        await self._store_manager.__getattribute__('_build_store_record_in_global_store').__call__(store_record,
+                                                                                                    positioning)
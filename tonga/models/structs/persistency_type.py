@@ -21,9 +21,15 @@ class PersistencyType(Enum):
 
     Attributes:
         MEMORY (str): Memory persistency
+        COMPACT_MEMORY (str): Compact memory persistency (for large stores)
         SHELVE (str): Shelve persistency
         ROCKSDB (str): RocksDB persistency
+        SQLITE (str): SQLite persistency
+        APPEND_LOG (str): Append only log persistency
     """
     MEMORY: str = 'MEMORY'
+    COMPACT_MEMORY: str = 'COMPACT_MEMORY'
     SHELVE: str = 'SHELVE'
     ROCKSDB: str = 'ROCKSDB'
+    SQLITE: str = 'SQLITE'
+    APPEND_LOG: str = 'APPEND_LOG'
@@ -24,6 +24,7 @@ from tonga.models.handlers.command.command_handler import BaseCommandHandler
 from tonga.models.handlers.event.event_handler import BaseEventHandler
 from tonga.models.handlers.result.result_handler import BaseResultHandler
 from tonga.models.records.base import BaseRecord
+from tonga.models.records.result.result import BaseResult
 from tonga.models.store.base import BaseStoreRecordHandler
 from tonga.models.store.store_record import StoreRecord
 from tonga.services.consumer.base import BaseConsumer
@@ -190,6 +191,7 @@ class KafkaConsumer(BaseConsumer):
             try:
                 await self._kafka_consumer.start()
                 self._running = True
+                self._client.get_topic_metadata().attach(self._kafka_consumer.__getattribute__('_client'), self._loop)
                 self.logger.debug('Start consumer : %s, group_id : %s, retry : %s', self._client_id, self._group_id,
                                   retry)
             except KafkaTimeoutError as err:
@@ -220,6 +222,7 @@ class KafkaConsumer(BaseConsumer):
         """
         if not self._running:
             raise KafkaConsumerNotStartedError
+        self._client.get_topic_metadata().detach(self._kafka_consumer.__getattribute__('_client'))
         try:
             await self._kafka_consumer.stop()
             self._running = False
@@ -399,23 +402,28 @@ class KafkaConsumer(BaseConsumer):
                     record_class = msg.value['record_class']
                     handler_class = msg.value['handler_class']
 
-                    if handler_class is None:
+                    # Results of a pending request (KafkaProducer.request) are delivered to requester, without handler
+                    if isinstance(record_class, BaseResult) and \
+                            self._client.get_pending_requests().resolve(record_class):
+                        self.logger.debug('Result %s delivered to pending request', record_class.correlation_id)
+                        transactional = None
+                    elif handler_class is None:
                         self.logger.debug('Empty handler')
                         break
-
-                    self.logger.debug('Event name : %s  Event content :\n%s',
-                                      record_class.event_name(), record_class.__dict__)
-
-                    # Calls handle if event is instance BaseHandler
-                    if isinstance(handler_class, BaseEventHandler):
-                        transactional = await handler_class.handle(event=record_class)
-                    elif isinstance(handler_class, BaseCommandHandler):
-                        transactional = await handler_class.execute(event=record_class)
-                    elif isinstance(handler_class, BaseResultHandler):
-                        transactional = await handler_class.on_result(event=record_class)
                     else:
-                        # Otherwise raise KafkaConsumerUnknownHandler
-                        raise UnknownHandler
+                        self.logger.debug('Event name : %s  Event content :\n%s',
+                                          record_class.event_name(), record_class.__dict__)
+
+                        # Calls handle if event is instance BaseHandler
+                        if isinstance(handler_class, BaseEventHandler):
+                            transactional = await handler_class.handle(event=record_class)
+                        elif isinstance(handler_class, BaseCommandHandler):
+                            transactional = await handler_class.execute(event=record_class)
+                        elif isinstance(handler_class, BaseResultHandler):
+                            transactional = await handler_class.on_result(event=record_class)
+                        else:
+                            # Otherwise raise KafkaConsumerUnknownHandler
+                            raise UnknownHandler
 
                     # If result is none (no transactional process), check if consumer has an
                     # group_id (mandatory to commit in Kafka)
@@ -573,8 +581,9 @@ class KafkaConsumer(BaseConsumer):
 
                     positioning = self.__current_offsets[positioning_key]
                     if self._client.cur_instance == msg.partition:
-                        # Calls local_state_handler if event is instance BaseStorageBuilder
-                        if rebuild and not self._store_manager.get_local_store().get_persistency().is_initialize():
+                        # Calls local_state_handler while local store is built (from earliest, stored positioning
+                        # or last commit), afterwards local writes are applied by store manager
+                        if not self._store_manager.get_local_store().get_persistency().is_initialize():
                             if isinstance(record_class, StoreRecord):
                                 self.logger.debug('Call local_store_handler')
                                 await handler_class.local_store_handler(store_record=record_class,
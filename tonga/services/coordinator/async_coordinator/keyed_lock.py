@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" KeyedLock class
+
+Async lock table by key, used by stores for serialize writes on the same entry.
+"""
+
+import asyncio
+from asyncio import Future, AbstractEventLoop, get_event_loop
+from typing import Dict, Optional
+
+__all__ = [
+    'KeyedLock'
+]
+
+
+class KeyedLock:
+    """ KeyedLock class
+
+    A key is present in table only while it is locked, idle keys are evicted on release. All waiters of a key
+    share one future, release wakes every waiter of the key.
+
+    Attributes:
+        _loop (AbstractEventLoop): Asyncio loop
+        _locked (Dict[str, Optional[Future]]): Locked keys, with waiters future (None if no waiter)
+    """
+    _loop: AbstractEventLoop
+    _locked: Dict[str, Optional[Future]]
+
+    def __init__(self, loop: AbstractEventLoop = None) -> None:
+        """ KeyedLock constructor
+
+        Args:
+            loop (AbstractEventLoop): Asyncio loop
+
+        Returns:
+            None
+        """
+        if loop is None:
+            self._loop = get_event_loop()
+        else:
+            self._loop = loop
+        self._locked = dict()
+
+    def locked(self, key: str) -> bool:
+        """ Return true if key is locked
+
+        Args:
+            key (str): Key to check
+
+        Returns:
+            bool
+        """
+        return key in self._locked
+
+    async def acquire(self, key: str) -> None:
+        """ Lock key, wait while key is locked by another owner
+
+        Args:
+            key (str): Key to lock
+
+        Returns:
+            None
+        """
+        while key in self._locked:
+            await asyncio.shield(self.__get_waiter(key), loop=self._loop)
+        self._locked[key] = None
+
+    def release(self, key: str) -> None:
+        """ Unlock key & wake up all waiters
+
+        Args:
+            key (str): Key to unlock
+
+        Raises:
+            RuntimeError: raised when key is not locked
+
+        Returns:
+            None
+        """
+        try:
+            waiter = self._locked.pop(key)
+        except KeyError:
+            raise RuntimeError(f'Release unlocked key {key}')
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def wait(self, key: str) -> None:
+        """ Wait until key is unlocked, without lock it
+
+        Args:
+            key (str): Key to wait
+
+        Returns:
+            None
+        """
+        while key in self._locked:
+            await asyncio.shield(self.__get_waiter(key), loop=self._loop)
+
+    def __get_waiter(self, key: str) -> Future:
+        """ Return future shared by all waiters of key
+
+        Args:
+            key (str): Locked key
+
+        Returns:
+            Future: Waiters future
+        """
+        waiter = self._locked[key]
+        if waiter is None:
+            waiter = self._loop.create_future()
+            self._locked[key] = waiter
+        return waiter
+
+    def __len__(self) -> int:
+        return len(self._locked)
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} at {id(self):#x} locked={len(self._locked)}>'
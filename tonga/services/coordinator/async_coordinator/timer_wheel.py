@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" TimerWheel class
+
+Hierarchical timer wheel by key, used by stores for expire entries without scanning them.
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+__all__ = [
+    'TimerWheel'
+]
+
+
+class TimerWheel:
+    """ TimerWheel class
+
+    Level 0 has one slot per tick, each upper level slot covers a whole revolution of the level below. A timer is
+    put in the lowest level able to hold it & moved down (cascaded) when its upper level slot is reached, so each
+    tick only touches one slot per level. Timers after the last level revolution are kept in the last level & placed
+    again each time their slot is reached.
+
+    Schedule & cancel are O(1), each timer is cascaded at most once per level.
+
+    Attributes:
+        _tick (float): Tick duration in seconds
+        _bits (int): Number of bits of a slot index (wheel size is 2 ** bits)
+        _mask (int): Slot index mask
+        _levels (int): Number of levels
+        _current (int): Last processed tick
+        _wheels (List[List[Set[str]]]): Keys in each slot of each level
+        _timers (Dict[str, Tuple[int, int, int]]): (expiry tick, level, slot) by key
+    """
+    _tick: float
+    _bits: int
+    _mask: int
+    _levels: int
+    _current: int
+    _wheels: List[List[Set[str]]]
+    _timers: Dict[str, Tuple[int, int, int]]
+
+    def __init__(self, tick: float = 1.0, wheel_bits: int = 6, levels: int = 4, now: float = None) -> None:
+        """ TimerWheel constructor
+
+        Args:
+            tick (float): Tick duration in seconds
+            wheel_bits (int): Number of slots per level as power of two (default 64 slots)
+            levels (int): Number of levels (default 4 levels of 64 ticks, about 194 days with 1 second tick)
+            now (float): Current time in seconds (default time.time())
+
+        Returns:
+            None
+        """
+        self._tick = tick
+        self._bits = wheel_bits
+        self._mask = (1 << wheel_bits) - 1
+        self._levels = levels
+        self._current = int((time.time() if now is None else now) // tick)
+        self._wheels = [[set() for _ in range(1 << wheel_bits)] for _ in range(levels)]
+        self._timers = dict()
+
+    def schedule(self, key: str, expires_at: float) -> None:
+        """ Schedule (or reschedule) key expiration
+
+        A key whose expiration is already past expires on next tick
+
+        Args:
+            key (str): Timer key
+            expires_at (float): Expiration time in seconds (same clock as advance)
+
+        Returns:
+            None
+        """
+        self.cancel(key)
+        self.__place(key, max(math.ceil(expires_at / self._tick), self._current + 1))
+
+    def cancel(self, key: str) -> bool:
+        """ Cancel key expiration
+
+        Args:
+            key (str): Timer key
+
+        Returns:
+            bool: False if key was not scheduled
+        """
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        _, level, slot = timer
+        self._wheels[level][slot].discard(key)
+        return True
+
+    def get_expiry(self, key: str) -> Optional[float]:
+        """ Return key expiration time (rounded up to tick)
+
+        Args:
+            key (str): Timer key
+
+        Returns:
+            Optional[float]: Expiration time in seconds, None if key is not scheduled
+        """
+        timer = self._timers.get(key)
+        if timer is None:
+            return None
+        return timer[0] * self._tick
+
+    def advance(self, now: float = None) -> List[str]:
+        """ Process all ticks until now & return expired keys
+
+        Args:
+            now (float): Current time in seconds (default time.time())
+
+        Returns:
+            List[str]: Expired keys, in expiration order
+        """
+        target = int((time.time() if now is None else now) // self._tick)
+        expired: List[str] = list()
+        if not self._timers:
+            self._current = max(self._current, target)
+            return expired
+        while self._current < target:
+            self._current += 1
+            current = self._current
+            for level in range(1, self._levels):
+                if current & ((1 << (self._bits * level)) - 1):
+                    break
+                slot = (current >> (self._bits * level)) & self._mask
+                keys, self._wheels[level][slot] = self._wheels[level][slot], set()
+                for key in keys:
+                    expiry_tick = self._timers[key][0]
+                    if expiry_tick <= current:
+                        del self._timers[key]
+                        expired.append(key)
+                    else:
+                        self.__place(key, expiry_tick)
+            slot = current & self._mask
+            keys, self._wheels[0][slot] = self._wheels[0][slot], set()
+            for key in keys:
+                del self._timers[key]
+                expired.append(key)
+            if not self._timers:
+                self._current = target
+        return expired
+
+    def __place(self, key: str, expiry_tick: int) -> None:
+        """ Put timer in the lowest level able to hold it
+
+        Args:
+            key (str): Timer key
+            expiry_tick (int): Expiration tick (after current tick)
+
+        Returns:
+            None
+        """
+        delta = expiry_tick - self._current
+        level = 0
+        while level < self._levels - 1 and delta >= 1 << (self._bits * (level + 1)):
+            level += 1
+        slot = (expiry_tick >> (self._bits * level)) & self._mask
+        self._wheels[level][slot].add(key)
+        self._timers[key] = (expiry_tick, level, slot)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._timers
+
+    def __len__(self) -> int:
+        return len(self._timers)
@@ -11,7 +11,9 @@ __all__ = [
     'BadArgumentKafkaClient',
     'CurrentInstanceOutOfRange',
     'KafkaAdminConfigurationError',
-    'KafkaClientConnectionErrors'
+    'KafkaClientConnectionErrors',
+    'RequestAlreadyPending',
+    'RequestTimeoutError',
 ]
 
 
@@ -41,3 +43,17 @@ class KafkaClientConnectionErrors(ConnectionError):
 
     This error was raised when current instance is higher than number of replica
     """
+
+
+class RequestAlreadyPending(ValueError):
+    """RequestAlreadyPending
+
+    This error was raised when a request was sent with the correlation_id of a pending request
+    """
+
+
+class RequestTimeoutError(TimeoutError):
+    """RequestTimeoutError
+
+    This error was raised when no result of a request was received before its timeout
+    """
@@ -17,6 +17,9 @@ from kafka.errors import (KafkaConfigurationError, NoBrokersAvailable, KafkaConn
 from tonga.services.coordinator.client.base import BaseClient
 from tonga.services.coordinator.client.errors import (BadArgumentKafkaClient, KafkaClientConnectionErrors,
                                                       KafkaAdminConfigurationError)
+from tonga.services.coordinator.client.pending_requests import PendingRequests
+from tonga.services.coordinator.client.producer_pool import ProducerPool
+from tonga.services.coordinator.client.topic_metadata import TopicMetadataCache
 
 __all__ = [
     'KafkaClient'
@@ -41,6 +44,9 @@ class KafkaClient(BaseClient):
                         used to identify specific server-side log entries that correspond to this client
         cur_instance: (int): Current service instance
         nb_replica (int): Number of service replica
+        _producer_pool (ProducerPool): Producers shared by configuration (KafkaProducer.shared)
+        _topic_metadata (TopicMetadataCache): Topic metadata shared by producers & consumers
+        _pending_requests (PendingRequests): Requests sent by producers (KafkaProducer.request) & resolved by consumers
     """
     bootstrap_servers: Union[str, List[str]]
     client_id: str
@@ -49,8 +55,12 @@ class KafkaClient(BaseClient):
 
     _kafka_admin_client: KafkaAdminClient
     _cluster_metadata: ClusterMetadata
+    _producer_pool: ProducerPool
+    _topic_metadata: TopicMetadataCache
+    _pending_requests: PendingRequests
 
-    def __init__(self, client_id: str, bootstrap_servers: Union[str, List[str]] = None, **kwargs) -> None:
+    def __init__(self, client_id: str, bootstrap_servers: Union[str, List[str]] = None,
+                 metadata_refresh_interval: float = 60.0, **kwargs) -> None:
         """ KafkaClient constructor
 
         Args:
@@ -62,6 +72,7 @@ class KafkaClient(BaseClient):
                                         to localhost:9092.
             client_id (str): A name for this client. This string is passed in each request to servers and can be
                             used to identify specific server-side log entries that correspond to this client
+            metadata_refresh_interval (float): Time in seconds between two topic metadata cache refreshes
             cur_instance: Current service instance
             nb_replica: Number of service replica
 
@@ -83,6 +94,10 @@ class KafkaClient(BaseClient):
         else:
             raise BadArgumentKafkaClient
 
+        self._producer_pool = ProducerPool()
+        self._topic_metadata = TopicMetadataCache(metadata_refresh_interval)
+        self._pending_requests = PendingRequests()
+
         try:
             self._kafka_admin_client = KafkaAdminClient(bootstrap_servers=self.bootstrap_servers,
                                                         client_id=f'waiter-{self.cur_instance}')
@@ -107,3 +122,27 @@ class KafkaClient(BaseClient):
             ClusterMetadata
         """
         return self._cluster_metadata
+
+    def get_producer_pool(self) -> ProducerPool:
+        """ Return ProducerPool
+
+        Returns:
+            ProducerPool
+        """
+        return self._producer_pool
+
+    def get_topic_metadata(self) -> TopicMetadataCache:
+        """ Return TopicMetadataCache
+
+        Returns:
+            TopicMetadataCache
+        """
+        return self._topic_metadata
+
+    def get_pending_requests(self) -> PendingRequests:
+        """ Return PendingRequests
+
+        Returns:
+            PendingRequests
+        """
+        return self._pending_requests
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" PendingRequests class
+
+Commands sent by KafkaProducer.request & waiting for their result, shared by producers & consumers of a KafkaClient.
+"""
+
+import asyncio
+import time
+from asyncio import Future
+from logging import (getLogger, Logger)
+from typing import Dict, Optional
+
+from tonga.models.records.result.result import BaseResult
+from tonga.services.coordinator.async_coordinator.timer_wheel import TimerWheel
+from tonga.services.coordinator.client.errors import (RequestAlreadyPending, RequestTimeoutError)
+
+__all__ = [
+    'PendingRequests',
+]
+
+
+class PendingRequests:
+    """ PendingRequests class
+
+    Each pending request is a future keyed by its command correlation_id, resolved by consumers with the first
+    BaseResult of same correlation_id. Timeouts are kept in a TimerWheel advanced by a single expiry task (running
+    while requests are pending), so a request costs no asyncio timer. A request is removed as soon as its future is
+    done (result, timeout or cancelled by requester).
+
+    Attributes:
+        _tick (float): Timeout precision in seconds
+        _futures (Dict[str, Future]): Request future by correlation_id
+        _timeouts (TimerWheel): Request timeouts by correlation_id
+        _expiry_task (Optional[Future]): Expiry task, running while requests are pending
+    """
+    _logger: Logger
+    _tick: float
+    _futures: Dict[str, Future]
+    _timeouts: TimerWheel
+    _expiry_task: Optional[Future]
+
+    def __init__(self, tick: float = 0.05) -> None:
+        """ PendingRequests constructor
+
+        Args:
+            tick (float): Timeout precision in seconds
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._tick = tick
+        self._futures = dict()
+        self._timeouts = TimerWheel(tick=tick)
+        self._expiry_task = None
+
+    def register(self, correlation_id: str, timeout: float, loop: asyncio.AbstractEventLoop) -> Future:
+        """ Register a request, returns future resolved to its result
+
+        Args:
+            correlation_id (str): Command correlation_id
+            timeout (float): Time in seconds before future fails with RequestTimeoutError
+            loop (asyncio.AbstractEventLoop): Asyncio loop
+
+        Raises:
+            RequestAlreadyPending: raised when a request with same correlation_id is pending
+
+        Returns:
+            Future: Resolved to BaseResult of same correlation_id
+        """
+        if correlation_id in self._futures:
+            raise RequestAlreadyPending
+        future = loop.create_future()
+        self._futures[correlation_id] = future
+        future.add_done_callback(lambda done: self.__remove(correlation_id, done))
+
+        now = time.time()
+        # Timer wheel is idle between requests, move it to now before scheduling (nothing to expire when idle)
+        if len(self._timeouts) == 0:
+            self._timeouts.advance(now)
+        self._timeouts.schedule(correlation_id, now + timeout)
+        if self._expiry_task is None:
+            self._expiry_task = asyncio.ensure_future(self.__expire_requests(), loop=loop)
+        return future
+
+    def resolve(self, result: BaseResult) -> bool:
+        """ Resolve pending request of result correlation_id
+
+        Args:
+            result (BaseResult): Received result
+
+        Returns:
+            bool: True if result was delivered to a pending request
+        """
+        future = self._futures.get(result.correlation_id)
+        if future is None or future.done():
+            return False
+        future.set_result(result)
+        return True
+
+    def __remove(self, correlation_id: str, future: Future) -> None:
+        """ Remove a done request (request future done callback)
+
+        Args:
+            correlation_id (str): Command correlation_id
+            future (Future): Done request future
+
+        Returns:
+            None
+        """
+        if self._futures.get(correlation_id) is future:
+            del self._futures[correlation_id]
+            self._timeouts.cancel(correlation_id)
+
+    async def __expire_requests(self) -> None:
+        """ Fail timed out requests on each tick, until no request is pending
+
+        Returns:
+            None
+        """
+        try:
+            while self._futures:
+                await asyncio.sleep(self._tick)
+                for correlation_id in self._timeouts.advance(time.time()):
+                    future = self._futures.get(correlation_id)
+                    if future is not None and not future.done():
+                        self._logger.warning('Request %s timed out', correlation_id)
+                        future.set_exception(RequestTimeoutError(correlation_id))
+        finally:
+            self._expiry_task = None
+
+    def __contains__(self, correlation_id: str) -> bool:
+        return correlation_id in self._futures
+
+    def __len__(self) -> int:
+        return len(self._futures)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" ProducerPool class
+
+Producers shared by configuration between services, store managers & transactions of a KafkaClient.
+"""
+
+from logging import (getLogger, Logger)
+from typing import Callable, Dict, Hashable
+
+from tonga.services.producer.base import BaseProducer
+
+__all__ = [
+    'ProducerPool',
+]
+
+
+class ProducerPool:
+    """ ProducerPool class
+
+    Each producer configuration key maps to one producer, created on first acquire & shared by all next acquires.
+    Producers are reference counted, a producer is stopped & removed from pool when its last user releases it.
+
+    Attributes:
+        _producers (Dict[Hashable, BaseProducer]): Producer by configuration key
+        _keys (Dict[int, Hashable]): Configuration key by producer id
+        _ref_counts (Dict[Hashable, int]): Number of users by configuration key
+    """
+    _logger: Logger
+    _producers: Dict[Hashable, BaseProducer]
+    _keys: Dict[int, Hashable]
+    _ref_counts: Dict[Hashable, int]
+
+    def __init__(self) -> None:
+        """ ProducerPool constructor
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._producers = dict()
+        self._keys = dict()
+        self._ref_counts = dict()
+
+    def acquire(self, key: Hashable, factory: Callable[[], BaseProducer]) -> BaseProducer:
+        """ Return producer of a configuration key, created with factory if key has no producer yet
+
+        Args:
+            key (Hashable): Producer configuration key
+            factory (Callable[[], BaseProducer]): Producer factory (not started producer)
+
+        Returns:
+            BaseProducer: Shared producer
+        """
+        producer = self._producers.get(key)
+        if producer is None:
+            producer = factory()
+            self._producers[key] = producer
+            self._keys[id(producer)] = key
+            self._ref_counts[key] = 0
+            self._logger.debug('Create pooled producer for %s', key)
+        self._ref_counts[key] += 1
+        return producer
+
+    async def release(self, producer: BaseProducer) -> bool:
+        """ Release a producer, stops it once released by all its users
+
+        Args:
+            producer (BaseProducer): Producer returned by acquire
+
+        Raises:
+            KeyError: Producer is not in pool
+
+        Returns:
+            bool: True if producer was stopped & removed from pool
+        """
+        key = self._keys[id(producer)]
+        self._ref_counts[key] -= 1
+        if self._ref_counts[key] > 0:
+            return False
+        del self._producers[key]
+        del self._keys[id(producer)]
+        del self._ref_counts[key]
+        if producer.is_running():
+            await producer.stop_producer()
+        self._logger.debug('Stop pooled producer for %s', key)
+        return True
+
+    def get_ref_count(self, producer: BaseProducer) -> int:
+        """ Return number of users of a producer
+
+        Args:
+            producer (BaseProducer): Producer returned by acquire
+
+        Returns:
+            int: Number of users, 0 if producer is not in pool
+        """
+        key = self._keys.get(id(producer))
+        if key is None:
+            return 0
+        return self._ref_counts[key]
+
+    def __len__(self) -> int:
+        return len(self._producers)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" TopicMetadataCache class
+
+Topic metadata (partitions, leaders & replicas) shared by all producers / consumers of a KafkaClient, read without
+waiting for a metadata request.
+"""
+
+import asyncio
+from logging import (getLogger, Logger)
+from typing import Dict, List, Optional
+
+from aiokafka.client import AIOKafkaClient
+from kafka.cluster import ClusterMetadata
+
+__all__ = [
+    'TopicMetadata',
+    'TopicMetadataCache',
+]
+
+
+class TopicMetadata:
+    """ TopicMetadata class, metadata snapshot of a topic
+
+    Attributes:
+        topic (str): Topic name
+        partitions (List[int]): Sorted topic partitions
+        available_partitions (List[int]): Sorted partitions with a leader
+        leaders (Dict[int, int]): Leader broker id by partition (-1 if partition has no leader)
+        replicas (Dict[int, List[int]]): Replica broker ids by partition
+        isr (Dict[int, List[int]]): In sync replica broker ids by partition
+    """
+    topic: str
+    partitions: List[int]
+    available_partitions: List[int]
+    leaders: Dict[int, int]
+    replicas: Dict[int, List[int]]
+    isr: Dict[int, List[int]]
+
+    def __init__(self, topic: str, leaders: Dict[int, int], replicas: Dict[int, List[int]],
+                 isr: Dict[int, List[int]]) -> None:
+        """ TopicMetadata constructor
+
+        Args:
+            topic (str): Topic name
+            leaders (Dict[int, int]): Leader broker id by partition (-1 if partition has no leader)
+            replicas (Dict[int, List[int]]): Replica broker ids by partition
+            isr (Dict[int, List[int]]): In sync replica broker ids by partition
+
+        Returns:
+            None
+        """
+        self.topic = topic
+        self.leaders = leaders
+        self.replicas = replicas
+        self.isr = isr
+        self.partitions = sorted(leaders.keys())
+        self.available_partitions = [partition for partition in self.partitions if leaders[partition] != -1]
+
+
+class TopicMetadataCache:
+    """ TopicMetadataCache class
+
+    Cache is fed by the cluster metadata of attached aiokafka clients (producer & consumer clients): each metadata
+    update of an attached client replaces cached metadata of updated topics. Readers get the last snapshot without
+    any metadata request. A refresh (on *refresh_interval* timer, on a missing topic or after a metadata error) asks
+    an attached client for a metadata update.
+
+    Attributes:
+        _refresh_interval (float): Time in seconds between two timed refreshes (0 disables timed refresh)
+        _topics (Dict[str, TopicMetadata]): Metadata by topic
+        _sources (List[AIOKafkaClient]): Attached clients
+        _refresh_task (Optional[Future]): Timed refresh task, running while a client is attached
+    """
+    _logger: Logger
+    _refresh_interval: float
+    _topics: Dict[str, TopicMetadata]
+    _sources: List[AIOKafkaClient]
+    _refresh_task: Optional[asyncio.Future]
+
+    def __init__(self, refresh_interval: float = 60.0) -> None:
+        """ TopicMetadataCache constructor
+
+        Args:
+            refresh_interval (float): Time in seconds between two timed refreshes (0 disables timed refresh)
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._refresh_interval = refresh_interval
+        self._topics = dict()
+        self._sources = list()
+        self._refresh_task = None
+
+    def attach(self, client: AIOKafkaClient, loop: asyncio.AbstractEventLoop) -> None:
+        """ Attach an aiokafka client, its cluster metadata updates feed cache
+
+        Args:
+            client (AIOKafkaClient): Aiokafka client (producer.client / consumer._client)
+            loop (asyncio.AbstractEventLoop): Asyncio loop
+
+        Returns:
+            None
+        """
+        if client in self._sources:
+            return
+        self._sources.append(client)
+        client.cluster.add_listener(self.update)
+        self.update(client.cluster)
+        if self._refresh_task is None and self._refresh_interval > 0:
+            self._refresh_task = asyncio.ensure_future(self.__refresh_periodically(), loop=loop)
+
+    def detach(self, client: AIOKafkaClient) -> None:
+        """ Detach an aiokafka client (cached metadata is kept)
+
+        Args:
+            client (AIOKafkaClient): Attached aiokafka client
+
+        Returns:
+            None
+        """
+        if client not in self._sources:
+            return
+        self._sources.remove(client)
+        client.cluster.remove_listener(self.update)
+        if not self._sources and self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def update(self, cluster: ClusterMetadata) -> None:
+        """ Replace cached metadata of all topics known by cluster metadata (ClusterMetadata listener)
+
+        Args:
+            cluster (ClusterMetadata): Kafka-python cluster metadata
+
+        Returns:
+            None
+        """
+        partitions_metadata = cluster.__getattribute__('_partitions')
+        for topic in cluster.topics():
+            leaders: Dict[int, int] = dict()
+            replicas: Dict[int, List[int]] = dict()
+            isr: Dict[int, List[int]] = dict()
+            for partition, metadata in partitions_metadata.get(topic, dict()).items():
+                leaders[partition] = metadata.leader
+                replicas[partition] = list(metadata.replicas)
+                isr[partition] = list(metadata.isr)
+            if leaders:
+                self._topics[topic] = TopicMetadata(topic, leaders, replicas, isr)
+
+    def get(self, topic: str) -> Optional[TopicMetadata]:
+        """ Return cached topic metadata
+
+        Args:
+            topic (str): Topic name
+
+        Returns:
+            Optional[TopicMetadata]: Topic metadata, None if topic is not cached
+        """
+        return self._topics.get(topic)
+
+    def partitions_for(self, topic: str) -> Optional[List[int]]:
+        """ Return cached topic partitions
+
+        Args:
+            topic (str): Topic name
+
+        Returns:
+            Optional[List[int]]: Sorted partitions, None if topic is not cached
+        """
+        metadata = self._topics.get(topic)
+        return None if metadata is None else metadata.partitions
+
+    async def fetch(self, topic: str) -> Optional[TopicMetadata]:
+        """ Return topic metadata, an attached client is asked for topic metadata if topic is not cached
+
+        Args:
+            topic (str): Topic name
+
+        Returns:
+            Optional[TopicMetadata]: Topic metadata, None if topic is still unknown (or no client is attached)
+        """
+        metadata = self._topics.get(topic)
+        if metadata is None and self._sources:
+            await self._sources[0].add_topic(topic)
+            metadata = self._topics.get(topic)
+        return metadata
+
+    async def refresh(self) -> None:
+        """ Ask an attached client for a metadata update (cache is updated by client listener)
+
+        Returns:
+            None
+        """
+        if self._sources:
+            await self._sources[0].force_metadata_update()
+
+    def invalidate(self, topic: str, loop: asyncio.AbstractEventLoop) -> None:
+        """ Drop cached topic metadata after a metadata error & refresh cache in background
+
+        Args:
+            topic (str): Topic name
+            loop (asyncio.AbstractEventLoop): Asyncio loop
+
+        Returns:
+            None
+        """
+        self._topics.pop(topic, None)
+        asyncio.ensure_future(self.refresh(), loop=loop)
+
+    async def __refresh_periodically(self) -> None:
+        """ Refresh cache each refresh interval
+
+        Returns:
+            None
+        """
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as err:
+                self._logger.warning('Topic metadata refresh failed: %s', err.__str__())
+
+    def __len__(self) -> int:
+        return len(self._topics)
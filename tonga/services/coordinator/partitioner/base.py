@@ -5,7 +5,7 @@
 """ Base of partitioner class
 """
 
-from typing import List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 
 
 class BasePartitioner:
@@ -40,3 +40,27 @@ class BasePartitioner:
             int: Partition number
         """
         raise NotImplementedError()
+
+    def partition_many(self, keys: List[Union[str, bytes]], all_partitions: List[int],
+                       available_partitions: Optional[List[int]]) -> List[int]:
+        """ Returns partitions to be used for many messages of a topic
+
+        Arguments:
+            keys (List[Union[str, bytes]]): the keys to use for partitioning.
+            all_partitions (List[int]): a list of the topic's partitions.
+            available_partitions (Optional[List[int]]): a list of the broker's currently available partitions(optional).
+
+        Returns:
+            List[int]: Partition number of each key
+        """
+        return [self(key, all_partitions, available_partitions) for key in keys]
+
+    def get_pool_key(self) -> Tuple[Any, ...]:
+        """ Return partitioner configuration key, producers with same partitioner key can be shared (ProducerPool)
+
+        Partitioners configured by constructor params must add them in key
+
+        Returns:
+            Tuple[Any, ...]: Partitioner class & configuration
+        """
+        return (self.__class__,)
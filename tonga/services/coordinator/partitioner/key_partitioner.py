@@ -9,6 +9,7 @@ Each message with same *key* go in the same partitions
 """
 
 import random
+from collections import OrderedDict
 from typing import Union, List, Optional
 
 from kafka.partitioner.hashed import murmur2
@@ -21,7 +22,27 @@ class KeyPartitioner(BasePartitioner):
     """KeyPartitioner
 
     Send event in topic partition with murmur2 algo
+
+    Murmur2 hash of the last *cache_size* keys is kept in a LRU cache, hash doesn't depend on partitions so cached
+    hashes stay valid when topic partition count changes.
+
+    Attributes:
+        _cache_size (int): Max number of cached key hashes (0 disables cache)
+        _cache (OrderedDict[Union[str, bytes], int]): Key hashes, least recently used first
     """
+    _cache_size: int
+    _cache: 'OrderedDict[Union[str, bytes], int]'
+
+    def __init__(self, cache_size: int = 4096, **kwargs) -> None:
+        """ KeyPartitioner constructor
+
+        Args:
+            cache_size (int): Max number of cached key hashes (0 disables cache)
+            **kwargs (Dict[str, Any]): BasePartitioner params
+        """
+        super().__init__(**kwargs)
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
 
     def __call__(self, key: Union[str, bytes], all_partitions: List[int], available_partitions: Optional[List[int]]) \
             -> int:
@@ -41,12 +62,61 @@ class KeyPartitioner(BasePartitioner):
         """
         if key is None:
             return random.choice(all_partitions)
+        return all_partitions[self.__hash(key) % len(all_partitions)]
+
+    def partition_many(self, keys: List[Union[str, bytes]], all_partitions: List[int],
+                       available_partitions: Optional[List[int]]) -> List[int]:
+        """
+        Returns partitions to be used for many messages of a topic
+
+        Args:
+            keys (List[Union[str, bytes]]): the keys to use for partitioning.
+            all_partitions (List[int]): a list of the topic's partitions.
+            available_partitions (Optional[List[int]]): a list of the broker's currently available partitions(optional).
+
+        Raises:
+            BadKeyType: If a key is not bytes serializable
+
+        Returns:
+            List[int]: Partition number of each key
+        """
+        nb_partitions = len(all_partitions)
+        key_hash = self.__hash
+        return [random.choice(all_partitions) if key is None else all_partitions[key_hash(key) % nb_partitions]
+                for key in keys]
+
+    def __hash(self, key: Union[str, bytes]) -> int:
+        """
+        Returns positive murmur2 hash of a key (read in cache first)
+
+        Args:
+            key (Union[str, bytes]): the key to use for partitioning.
+
+        Raises:
+            BadKeyType: If key is not bytes serializable
+
+        Returns:
+            int: Key hash
+        """
+        try:
+            key_hash = self._cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            raise BadKeyType
+        else:
+            self._cache.move_to_end(key)
+            return key_hash
 
         if isinstance(key, str):
-            key = bytes(key, 'utf-8')
-        if isinstance(key, bytes):
-            idx = murmur2(key)
-            idx &= 0x7fffffff
-            idx %= len(all_partitions)
-            return all_partitions[idx]
-        raise BadKeyType
+            encoded_key = bytes(key, 'utf-8')
+        elif isinstance(key, bytes):
+            encoded_key = key
+        else:
+            raise BadKeyType
+        key_hash = murmur2(encoded_key) & 0x7fffffff
+        if self._cache_size > 0:
+            self._cache[key] = key_hash
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return key_hash
@@ -13,7 +13,7 @@ Examples:
     etc ...
 """
 
-from typing import Union, List, Optional
+from typing import Any, Union, List, Optional, Tuple
 
 from tonga.services.coordinator.partitioner.base import BasePartitioner
 from tonga.services.coordinator.partitioner.errors import OutsideInstanceNumber
@@ -58,3 +58,11 @@ class StatefulsetPartitioner(BasePartitioner):
         if self._instance <= len(all_partitions):
             return all_partitions[self._instance]
         raise OutsideInstanceNumber
+
+    def get_pool_key(self) -> Tuple[Any, ...]:
+        """ Return partitioner configuration key (class & instance)
+
+        Returns:
+            Tuple[Any, ...]: Partitioner class & instance
+        """
+        return self.__class__, self._instance
@@ -0,0 +1,473 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" RecordAccumulator class
+
+Accumulates records by topic partition in KafkaProducer batches, each batch is sent in one produce request.
+"""
+
+import asyncio
+from asyncio import AbstractEventLoop, Future, TimerHandle
+from logging import (getLogger, Logger)
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from aiokafka.errors import KafkaError, KafkaTimeoutError
+from aiokafka.producer import AIOKafkaProducer
+from aiokafka.producer.message_accumulator import BatchBuilder
+
+from tonga.models.records.base import BaseRecord
+from tonga.models.store.store_record import StoreRecord
+from tonga.models.structs.positioning import KafkaPositioning
+from tonga.services.coordinator.client.topic_metadata import TopicMetadataCache
+from tonga.services.coordinator.partitioner.base import BasePartitioner
+from tonga.services.producer.compression import (ADAPTIVE_COMPRESSION, BatchProfile, CompressionSelector,
+                                                 codec_attribute)
+from tonga.services.producer.errors import FailToSendBatch, RecordTooLarge, UnknownEventBase
+from tonga.services.serializer.base import BaseSerializer
+from tonga.services.serializer.kafka_key import KafkaKeySerializer
+
+__all__ = [
+    'RecordAccumulator',
+]
+
+
+class _PartitionBatch:
+    """ Open batch of a topic partition
+
+    Attributes:
+        builder (BatchBuilder): Aiokafka batch builder
+        futures (List[Tuple[Future, int]]): Record futures & record offset in batch
+        linger_handle (Optional[TimerHandle]): Linger timer, flushes batch once expired
+        codec (Optional[str]): Batch codec (None for producer compression_type)
+        sample (Optional[List[bytes]]): Record values kept for compression sampling, None if batch isn't sampled
+        sent_at (float): Loop time of batch send
+    """
+    builder: BatchBuilder
+    futures: List[Tuple[Future, int]]
+    linger_handle: Optional[TimerHandle]
+    codec: Optional[str]
+    sample: Optional[List[bytes]]
+    sent_at: float
+
+    def __init__(self, builder: BatchBuilder, codec: Optional[str] = None, sample: bool = False) -> None:
+        self.builder = builder
+        self.futures = list()
+        self.linger_handle = None
+        self.codec = codec
+        self.sample = list() if sample else None
+        self.sent_at = 0.0
+
+
+class RecordAccumulator:
+    """ RecordAccumulator class
+
+    Records are partitioned with producer partitioner (same partition as KafkaProducer.send) & appended in the open
+    batch of their topic partition. A batch is sent once it holds *max_records* records or *max_bytes* bytes, or
+    *linger* seconds after its first record. Each append returns a future resolved to record positioning once its
+    batch is acknowledged.
+
+    Topics with a BatchProfile use their profile linger / max_records / max_bytes & compression, the codec of a topic
+    with adaptive compression is chosen by its CompressionSelector.
+
+    Attributes:
+        _kafka_producer (AIOKafkaProducer): Aiokafka producer
+        _serializer (BaseSerializer): Record value serializer
+        _partitioner (BasePartitioner): Record partitioner
+        _loop (AbstractEventLoop): Asyncio loop
+        _default_profile (BatchProfile): Batching settings of topics without profile (producer compression_type)
+        _topic_profiles (Dict[str, BatchProfile]): Batching & compression settings by topic
+        _selectors (Dict[str, CompressionSelector]): Codec selector of topics with adaptive compression
+        _topic_metadata (Optional[TopicMetadataCache]): Topic metadata read before producer metadata
+        _batches (Dict[Tuple[str, int], _PartitionBatch]): Open batches by (topic, partition)
+        _in_flight (Dict[Future, Tuple[str, int]]): Sent batches not acknowledged yet
+    """
+    _logger: Logger
+    _kafka_producer: AIOKafkaProducer
+    _serializer: BaseSerializer
+    _partitioner: BasePartitioner
+    _loop: AbstractEventLoop
+    _default_profile: BatchProfile
+    _topic_profiles: Dict[str, BatchProfile]
+    _selectors: Dict[str, CompressionSelector]
+    _topic_metadata: Optional[TopicMetadataCache]
+    _batches: Dict[Tuple[str, int], _PartitionBatch]
+    _in_flight: Dict[Future, Tuple[str, int]]
+
+    def __init__(self, kafka_producer: AIOKafkaProducer, serializer: BaseSerializer, partitioner: BasePartitioner,
+                 loop: AbstractEventLoop, linger: float = 0.005, max_records: int = 500,
+                 max_bytes: int = 16384, topic_metadata: TopicMetadataCache = None,
+                 topic_profiles: Dict[str, BatchProfile] = None) -> None:
+        """ RecordAccumulator constructor
+
+        Args:
+            kafka_producer (AIOKafkaProducer): Aiokafka producer (started)
+            serializer (BaseSerializer): Record value serializer
+            partitioner (BasePartitioner): Record partitioner
+            loop (AbstractEventLoop): Asyncio loop
+            linger (float): Max time in seconds a record waits in an open batch
+            max_records (int): Max number of records by batch
+            max_bytes (int): Max batch size in bytes
+            topic_metadata (TopicMetadataCache): Topic metadata read before producer metadata
+            topic_profiles (Dict[str, BatchProfile]): Batching & compression settings by topic
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._kafka_producer = kafka_producer
+        self._serializer = serializer
+        self._partitioner = partitioner
+        self._loop = loop
+        self._default_profile = BatchProfile(None, linger, max_records, max_bytes)
+        self._topic_profiles = dict() if topic_profiles is None else topic_profiles
+        self._selectors = dict()
+        self._topic_metadata = topic_metadata
+        self._batches = dict()
+        self._in_flight = dict()
+
+    async def append(self, msg: Union[BaseRecord, StoreRecord], topic: str) -> Future:
+        """ Append a record in the open batch of its topic partition
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Record to send
+            topic (str): Topic name
+
+        Raises:
+            UnknownEventBase: msg is not a BaseRecord or a StoreRecord
+
+        Returns:
+            Future: Resolved to record KafkaPositioning once acknowledged (offset is None with acks=0)
+        """
+        return await self.append_encoded(msg, self.encode(msg), topic)
+
+    async def append_encoded(self, msg: Union[BaseRecord, StoreRecord], encoded: Tuple[str, bytes, bytes],
+                             topic: str) -> Future:
+        """ Append a record already serialized by encode in the open batch of its topic partition
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Record to send
+            encoded (Tuple[str, bytes, bytes]): Record key, serialized key & serialized value (encode result)
+            topic (str): Topic name
+
+        Returns:
+            Future: Resolved to record KafkaPositioning once acknowledged (offset is None with acks=0)
+        """
+        record_key, key, value = encoded
+        partition = await self.__partition(topic, key)
+        return await self.__append_encoded(msg, record_key, key, value, topic, partition)
+
+    async def append_many(self, msgs: List[Union[BaseRecord, StoreRecord]], topic: str) -> List[Future]:
+        """ Serialize all records, then append them in the open batches of their topic partition
+
+        Records are serialized before any append, so a record that can't be serialized raises before any record is
+        sent. Topic partitions are read once.
+
+        Args:
+            msgs (List[Union[BaseRecord, StoreRecord]]): Records to send
+            topic (str): Topic name
+
+        Raises:
+            UnknownEventBase: a msg is not a BaseRecord or a StoreRecord
+
+        Returns:
+            List[Future]: Futures in msgs order, resolved to record KafkaPositioning once acknowledged
+        """
+        encoded = [self.encode(msg) for msg in msgs]
+        all_partitions, available_partitions = await self.__partitions(topic)
+        partitions = self._partitioner.partition_many([key for _, key, _ in encoded], all_partitions,
+                                                      available_partitions)
+        futures: List[Future] = list()
+        for msg, (record_key, key, value), partition in zip(msgs, encoded, partitions):
+            futures.append(await self.__append_encoded(msg, record_key, key, value, topic, partition))
+        return futures
+
+    async def append_serialized(self, key: Optional[bytes], value: bytes, topic: str) -> Future:
+        """ Append an already serialized record in the open batch of its topic partition
+
+        Args:
+            key (Optional[bytes]): Serialized record key
+            value (bytes): Serialized record value
+            topic (str): Topic name
+
+        Returns:
+            Future: Resolved to record KafkaPositioning once acknowledged
+        """
+        partition = await self.__partition(topic, key)
+        return await self.__append_encoded(None, None, key, value, topic, partition)
+
+    def encode(self, msg: Union[BaseRecord, StoreRecord]) -> Tuple[str, bytes, bytes]:
+        """ Serialize record key & value
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Record to send
+
+        Raises:
+            UnknownEventBase: msg is not a BaseRecord or a StoreRecord
+
+        Returns:
+            Tuple[str, bytes, bytes]: Record key, serialized key & serialized value
+        """
+        if isinstance(msg, BaseRecord):
+            record_key = msg.partition_key
+        elif isinstance(msg, StoreRecord):
+            record_key = msg.key
+        else:
+            raise UnknownEventBase
+        return record_key, KafkaKeySerializer.encode(record_key), self._serializer.encode(msg)
+
+    async def __append_encoded(self, msg: Optional[Union[BaseRecord, StoreRecord]], record_key: Optional[str],
+                               key: Optional[bytes], value: bytes, topic: str, partition: int) -> Future:
+        """ Append a serialized record in the open batch of a topic partition
+
+        Args:
+            msg (Optional[Union[BaseRecord, StoreRecord]]): Record to send (sent by aiokafka if bigger than an empty
+                                                            batch), None for an already serialized record
+            record_key (Optional[str]): Record key
+            key (Optional[bytes]): Serialized record key
+            value (bytes): Serialized record value
+            topic (str): Topic name
+            partition (int): Partition number
+
+        Returns:
+            Future: Resolved to record KafkaPositioning once acknowledged
+        """
+        future = self._loop.create_future()
+        profile = self._topic_profiles.get(topic, self._default_profile)
+        for _ in range(2):
+            batch = self._batches.get((topic, partition))
+            if batch is None:
+                batch = self.__create_batch(topic, profile)
+                self._batches[(topic, partition)] = batch
+                batch.linger_handle = self._loop.call_later(profile.linger, self.__on_linger, topic, partition)
+            metadata = batch.builder.append(timestamp=None, key=key, value=value)
+            if metadata is not None:
+                batch.futures.append((future, metadata.offset))
+                if batch.sample is not None:
+                    batch.sample.append(value)
+                if len(batch.futures) >= profile.max_records or batch.builder.size() >= profile.max_bytes:
+                    await self.__send_batch(topic, partition)
+                return future
+            # Batch is full, sent it & retry in a new batch
+            await self.__send_batch(topic, partition)
+        # Record is bigger than an empty batch, sent alone by aiokafka (serialized again by aiokafka)
+        if msg is None:
+            future.set_exception(RecordTooLarge())
+            return future
+        record_future = await self._kafka_producer.send(topic, value=msg, key=record_key, partition=partition)
+        record_future.add_done_callback(lambda done: self.__resolve_record(future, done, topic, partition))
+        return future
+
+    def __create_batch(self, topic: str, profile: BatchProfile) -> _PartitionBatch:
+        """ Create an empty batch with topic profile codec
+
+        Args:
+            topic (str): Topic name
+            profile (BatchProfile): Topic profile
+
+        Returns:
+            _PartitionBatch: Empty batch
+        """
+        if profile.compression is None:
+            return _PartitionBatch(self._kafka_producer.create_batch())
+        sample = False
+        if profile.compression == ADAPTIVE_COMPRESSION:
+            selector = self._selectors.get(topic)
+            if selector is None:
+                selector = CompressionSelector()
+                self._selectors[topic] = selector
+            codec, sample = selector.next_batch()
+        else:
+            codec = profile.compression
+        # Same batch format as aiokafka MessageAccumulator.create_builder, with profile codec & size
+        api_version = self._kafka_producer.client.api_version
+        magic = 2 if api_version >= (0, 11) else 1 if api_version >= (0, 10) else 0
+        txn_manager = self._kafka_producer.__getattribute__('_txn_manager')
+        is_transactional = txn_manager is not None and txn_manager.transactional_id is not None
+        return _PartitionBatch(BatchBuilder(magic, profile.max_bytes, codec_attribute(codec),
+                                            is_transactional=is_transactional), codec, sample)
+
+    def get_compression_report(self) -> Dict[str, Dict[str, Any]]:
+        """ Return selected codec & codec samples of topics with adaptive compression
+
+        Returns:
+            Dict[str, Dict[str, Any]]: By topic, selected codec ('codec') & CompressionSelector report ('codecs')
+        """
+        return {topic: {'codec': selector.get_codec(), 'codecs': selector.get_report()}
+                for topic, selector in self._selectors.items()}
+
+    async def flush(self) -> None:
+        """ Send all open batches & wait until all sent batches are acknowledged (or failed)
+
+        Returns:
+            None
+        """
+        for topic, partition in list(self._batches.keys()):
+            await self.__send_batch(topic, partition)
+        if self._in_flight:
+            await asyncio.wait(list(self._in_flight.keys()), loop=self._loop)
+
+    async def flush_records(self, futures: List[Future]) -> None:
+        """ Send open batches holding record futures & wait until these records are acknowledged (or failed)
+
+        Other open batches keep waiting for their size or linger, other sent batches are not awaited
+
+        Args:
+            futures (List[Future]): Record futures returned by append
+
+        Returns:
+            None
+        """
+        pending = {future for future in futures if not future.done()}
+        if not pending:
+            return
+        for (topic, partition), batch in list(self._batches.items()):
+            if any(future in pending for future, _ in batch.futures):
+                await self.__send_batch(topic, partition)
+        await asyncio.wait(pending, loop=self._loop)
+
+    def __on_linger(self, topic: str, partition: int) -> None:
+        """ Linger timer callback, sends batch
+
+        Args:
+            topic (str): Topic name
+            partition (int): Partition number
+
+        Returns:
+            None
+        """
+        batch = self._batches.get((topic, partition))
+        if batch is not None:
+            batch.linger_handle = None
+            asyncio.ensure_future(self.__send_batch(topic, partition), loop=self._loop)
+
+    async def __partitions(self, topic: str) -> Tuple[List[int], List[int]]:
+        """ Return topic partitions, read in topic metadata cache first
+
+        Args:
+            topic (str): Topic name
+
+        Returns:
+            Tuple[List[int], List[int]]: Sorted partitions & available partitions
+        """
+        if self._topic_metadata is not None:
+            metadata = self._topic_metadata.get(topic)
+            if metadata is not None:
+                return metadata.partitions, metadata.available_partitions
+        all_partitions = sorted(await self._kafka_producer.partitions_for(topic))
+        available_partitions = list(self._kafka_producer.client.cluster.available_partitions_for_topic(topic))
+        return all_partitions, available_partitions
+
+    async def __partition(self, topic: str, key: Optional[bytes]) -> int:
+        """ Return record partition, chosen by producer partitioner
+
+        Args:
+            topic (str): Topic name
+            key (Optional[bytes]): Serialized record key
+
+        Returns:
+            int: Partition number
+        """
+        all_partitions, available_partitions = await self.__partitions(topic)
+        return self._partitioner(key, all_partitions, available_partitions)
+
+    async def __send_batch(self, topic: str, partition: int) -> None:
+        """ Close the open batch of a topic partition & send it, record futures are resolved on acknowledgment
+
+        Args:
+            topic (str): Topic name
+            partition (int): Partition number
+
+        Returns:
+            None
+        """
+        batch = self._batches.pop((topic, partition), None)
+        if batch is None:
+            return
+        if batch.linger_handle is not None:
+            batch.linger_handle.cancel()
+        self._logger.debug('Send batch of %s records in %s, %s', len(batch.futures), topic, partition)
+        selector = self._selectors.get(topic)
+        if selector is not None and batch.sample is not None:
+            selector.sample(batch.sample)
+            batch.sample = None
+        batch.sent_at = self._loop.time()
+        try:
+            batch_future = await self._kafka_producer.send_batch(batch.builder, topic, partition=partition)
+        except KafkaTimeoutError as err:
+            self._logger.exception('%s', err.__str__())
+            self.__fail_batch(batch, FailToSendBatch())
+            return
+        except KafkaError as err:
+            self._logger.exception('%s', err.__str__())
+            self.__fail_batch(batch, err)
+            return
+        self._in_flight[batch_future] = (topic, partition)
+        batch_future.add_done_callback(lambda done: self.__resolve_batch(batch, done))
+
+    def __resolve_batch(self, batch: _PartitionBatch, batch_future: Future) -> None:
+        """ Resolve record futures of an acknowledged batch
+
+        Args:
+            batch (_PartitionBatch): Sent batch
+            batch_future (Future): Aiokafka batch future
+
+        Returns:
+            None
+        """
+        topic, partition = self._in_flight.pop(batch_future)
+        if batch_future.cancelled():
+            self.__fail_batch(batch, FailToSendBatch())
+            return
+        exception = batch_future.exception()
+        if exception is not None:
+            self.__fail_batch(batch, exception)
+            return
+        record_metadata = batch_future.result()
+        selector = self._selectors.get(topic)
+        if selector is not None:
+            selector.record_latency(batch.codec, self._loop.time() - batch.sent_at)
+        for future, offset in batch.futures:
+            if not future.done():
+                future.set_result(KafkaPositioning(topic, partition,
+                                                   None if record_metadata is None
+                                                   else record_metadata.offset + offset))
+
+    @staticmethod
+    def __resolve_record(future: Future, record_future: Future, topic: str, partition: int) -> None:
+        """ Resolve record future of a record sent alone
+
+        Args:
+            future (Future): Record future
+            record_future (Future): Aiokafka record future
+            topic (str): Topic name
+            partition (int): Partition number
+
+        Returns:
+            None
+        """
+        if future.done():
+            return
+        if record_future.cancelled():
+            future.set_exception(FailToSendBatch())
+        elif record_future.exception() is not None:
+            future.set_exception(record_future.exception())
+        else:
+            record_metadata = record_future.result()
+            future.set_result(KafkaPositioning(topic, partition,
+                                               None if record_metadata is None else record_metadata.offset))
+
+    @staticmethod
+    def __fail_batch(batch: _PartitionBatch, exception: BaseException) -> None:
+        """ Fail record futures of a batch
+
+        Args:
+            batch (_PartitionBatch): Failed batch
+            exception (BaseException): Exception set on record futures
+
+        Returns:
+            None
+        """
+        for future, _ in batch.futures:
+            if not future.done():
+                future.set_exception(exception)
@@ -8,9 +8,12 @@ All producer must be inherit form this class
 """
 
 from abc import ABCMeta, abstractmethod
-from typing import Union, Awaitable, List, Dict
+from asyncio import Future
+from typing import Union, Awaitable, List, Dict, Optional, Callable
 
 from tonga.models.records.base import BaseRecord
+from tonga.models.records.command.command import BaseCommand
+from tonga.models.records.result.result import BaseResult
 from tonga.models.store.store_record import StoreRecord
 from tonga.models.structs.positioning import BasePositioning
 
@@ -21,6 +24,8 @@ __all__ = [
 
 class BaseProducer(metaclass=ABCMeta):
     """ BaseProducer all producer must be inherit form this class
+
+    Batching, tracked sends, bulk sends & requests are optional, default implementations raise NotImplementedError
     """
 
     @abstractmethod
@@ -93,6 +98,119 @@ class BaseProducer(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    async def send_batched(self, msg: Union[BaseRecord, StoreRecord], topic: str) -> Future:
+        """
+        Send a message in the open batch of its topic / partition, batch is sent on size or linger
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Event to send in Kafka, inherit form BaseRecord
+            topic (str): Topic name to send massage
+
+        Raises:
+            NotImplementedError: Producer doesn't implement this method
+
+        Returns:
+            Future: Resolved to message positioning once batch is acknowledged
+        """
+        raise NotImplementedError
+
+    async def send_batched_serialized(self, key: Optional[bytes], value: bytes, topic: str) -> Future:
+        """
+        Send an already serialized message in the open batch of its topic / partition
+
+        Args:
+            key (Optional[bytes]): Serialized message key
+            value (bytes): Serialized message
+            topic (str): Topic name to send massage
+
+        Raises:
+            NotImplementedError: Producer doesn't implement this method
+
+        Returns:
+            Future: Resolved to message positioning once batch is acknowledged
+        """
+        raise NotImplementedError
+
+    async def send_tracked(self, msg: Union[BaseRecord, StoreRecord], topic: str,
+                           callback: Callable[[Future], None] = None) -> Future:
+        """
+        Send a message without waiting its acknowledgment, waits while too many tracked messages are in flight
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Event to send in Kafka
+            topic (str): Topic name to send massage
+            callback (Callable[[Future], None]): Called with message future once acknowledged or failed
+
+        Raises:
+            NotImplementedError: Producer doesn't implement this method
+
+        Returns:
+            Future: Resolved to message positioning once acknowledged
+        """
+        raise NotImplementedError
+
+    async def request(self, command: BaseCommand, topic: str, reply_topic: str = None,
+                      timeout: float = 30.0) -> BaseResult:
+        """
+        Send a command & await its result
+
+        Args:
+            command (BaseCommand): Command to send in Kafka
+            topic (str): Topic name to send command
+            reply_topic (str): Topic name where command result is sent
+            timeout (float): Time in seconds to wait for result
+
+        Raises:
+            NotImplementedError: Producer doesn't implement this method
+
+        Returns:
+            BaseResult: Command result
+        """
+        raise NotImplementedError
+
+    async def send_many(self, msgs: List[Union[BaseRecord, StoreRecord]], topic: str) -> List[BasePositioning]:
+        """
+        Send many messages & await all acknowledgments
+
+        Args:
+            msgs (List[Union[BaseRecord, StoreRecord]]): Events to send in Kafka
+            topic (str): Topic name to send massage
+
+        Raises:
+            NotImplementedError: Producer doesn't implement this method
+
+        Returns:
+            List[BasePositioning]: Messages positioning, in msgs order
+        """
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        """
+        Send all open batches & wait for their acknowledgments
+
+        Raises:
+            NotImplementedError: Producer doesn't implement this method
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    async def flush_records(self, futures: List[Future]) -> None:
+        """
+        Send open batches holding messages futures & wait for these messages acknowledgments only
+
+        Args:
+            futures (List[Future]): Messages futures returned by send_batched / send_batched_serialized
+
+        Raises:
+            NotImplementedError: Producer doesn't implement this method
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def partitions_by_topic(self, topic: str) -> List[int]:
         """
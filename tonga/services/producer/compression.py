@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" BatchProfile & CompressionSelector classes
+
+Per topic batching / compression settings of KafkaProducer batching mode, & adaptive codec selection.
+"""
+
+import time
+from logging import (getLogger, Logger)
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiokafka.record.legacy_records import LegacyRecordBatchBuilder
+from kafka.codec import (has_gzip, has_lz4, has_snappy, gzip_encode, lz4_encode, snappy_encode)
+
+from tonga.services.producer.errors import BadCompressionCodec
+
+__all__ = [
+    'ADAPTIVE_COMPRESSION',
+    'available_codecs',
+    'codec_attribute',
+    'BatchProfile',
+    'CompressionSelector',
+]
+
+# Compression of a BatchProfile whose codec is chosen by a CompressionSelector
+ADAPTIVE_COMPRESSION = 'adaptive'
+
+# Codec name: (codec is installed, batch attribute, encode function)
+_CODECS: Dict[str, Tuple[Callable[[], bool], int, Optional[Callable[[bytes], bytes]]]] = {
+    'none': (lambda: True, 0, None),
+    'gzip': (has_gzip, LegacyRecordBatchBuilder.CODEC_GZIP, gzip_encode),
+    'snappy': (has_snappy, LegacyRecordBatchBuilder.CODEC_SNAPPY, snappy_encode),
+    'lz4': (has_lz4, LegacyRecordBatchBuilder.CODEC_LZ4, lz4_encode),
+}
+
+
+def available_codecs() -> List[str]:
+    """ Return installed codecs
+
+    Returns:
+        List[str]: Codec names ('none' is always installed)
+    """
+    return [name for name, (installed, _, _) in _CODECS.items() if installed()]
+
+
+def codec_attribute(codec: Optional[str]) -> int:
+    """ Return record batch compression attribute of a codec
+
+    Args:
+        codec (Optional[str]): Codec name (None for no compression)
+
+    Raises:
+        BadCompressionCodec: Codec is unknown or not installed
+
+    Returns:
+        int: Compression attribute
+    """
+    if codec is None:
+        return 0
+    if codec not in _CODECS or not _CODECS[codec][0]():
+        raise BadCompressionCodec
+    return _CODECS[codec][1]
+
+
+class BatchProfile:
+    """ BatchProfile class, batching & compression settings of a topic
+
+    Attributes:
+        compression (Optional[str]): Codec name ('none', 'gzip', 'snappy', 'lz4'), 'adaptive' for a codec chosen by
+                                     sampling, None for producer compression_type
+        linger (float): Max time in seconds a record waits in an open batch
+        max_records (int): Max number of records by batch
+        max_bytes (int): Max batch size in bytes
+    """
+    compression: Optional[str]
+    linger: float
+    max_records: int
+    max_bytes: int
+
+    def __init__(self, compression: str = None, linger: float = 0.005, max_records: int = 500,
+                 max_bytes: int = 16384) -> None:
+        """ BatchProfile constructor
+
+        Args:
+            compression (str): Codec name ('none', 'gzip', 'snappy', 'lz4'), 'adaptive' for a codec chosen by
+                               sampling, None for producer compression_type
+            linger (float): Max time in seconds a record waits in an open batch
+            max_records (int): Max number of records by batch
+            max_bytes (int): Max batch size in bytes (a profile with a compression can exceed producer
+                             max_batch_size, up to producer max_request_size)
+
+        Raises:
+            BadCompressionCodec: Codec is unknown or not installed
+
+        Returns:
+            None
+        """
+        if compression is not None and compression != ADAPTIVE_COMPRESSION:
+            codec_attribute(compression)
+        self.compression = compression
+        self.linger = linger
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+
+
+class CompressionSelector:
+    """ CompressionSelector class, chooses the codec of a topic by sampling its batches
+
+    Every *resample_batches* batches, the batch payload is compressed with each candidate codec. Codec cost is its
+    compression time plus compressed payload transfer time at *bandwidth* bytes per second, the cheapest codec is
+    used until next sample. Acknowledgment latency of batches is recorded by codec for report.
+
+    Attributes:
+        _codecs (List[str]): Candidate codecs
+        _bandwidth (float): Estimated producer bandwidth in bytes per second
+        _resample_batches (int): Number of batches between two samples
+        _nb_batches (int): Number of batches since last sample
+        _codec (str): Selected codec
+        _stats (Dict[str, Dict[str, float]]): Last sample & latency counters by codec
+    """
+    _logger: Logger
+    _codecs: List[str]
+    _bandwidth: float
+    _resample_batches: int
+    _nb_batches: int
+    _codec: str
+    _stats: Dict[str, Dict[str, float]]
+
+    def __init__(self, codecs: List[str] = None, bandwidth: float = 10 * 1024 * 1024,
+                 resample_batches: int = 1000) -> None:
+        """ CompressionSelector constructor
+
+        Args:
+            codecs (List[str]): Candidate codecs (default all installed codecs)
+            bandwidth (float): Estimated producer bandwidth in bytes per second
+            resample_batches (int): Number of batches between two samples
+
+        Raises:
+            BadCompressionCodec: A codec is unknown or not installed
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        if codecs is None:
+            codecs = available_codecs()
+        for codec in codecs:
+            codec_attribute(codec)
+        self._codecs = codecs
+        self._bandwidth = bandwidth
+        self._resample_batches = resample_batches
+        self._nb_batches = 0
+        self._codec = 'none'
+        self._stats = {codec: {'ratio': 1.0, 'compress_time': 0.0, 'cost': 0.0, 'latency_total': 0.0,
+                               'batches': 0} for codec in codecs}
+
+    def next_batch(self) -> Tuple[str, bool]:
+        """ Return codec of a new batch & if batch must be sampled
+
+        Returns:
+            Tuple[str, bool]: Codec name & sample flag
+        """
+        need_sample = self._nb_batches % self._resample_batches == 0
+        self._nb_batches += 1
+        return self._codec, need_sample
+
+    def sample(self, values: List[bytes]) -> str:
+        """ Compress a batch payload with each candidate codec & select the cheapest one
+
+        Args:
+            values (List[bytes]): Serialized record values of batch
+
+        Returns:
+            str: Selected codec
+        """
+        payload = b''.join(values)
+        if not payload:
+            return self._codec
+        best_codec, best_cost = self._codec, None
+        for codec in self._codecs:
+            encode = _CODECS[codec][2]
+            started_at = time.monotonic()
+            compressed_size = len(payload) if encode is None else len(encode(payload))
+            compress_time = time.monotonic() - started_at
+            cost = compress_time + compressed_size / self._bandwidth
+            self._stats[codec].update(ratio=compressed_size / len(payload), compress_time=compress_time, cost=cost)
+            if best_cost is None or cost < best_cost:
+                best_codec, best_cost = codec, cost
+        if best_codec != self._codec:
+            self._logger.info('Compression codec %s selected (ratio %.2f)', best_codec,
+                              self._stats[best_codec]['ratio'])
+            self._codec = best_codec
+        return self._codec
+
+    def record_latency(self, codec: str, latency: float) -> None:
+        """ Record acknowledgment latency of a batch
+
+        Args:
+            codec (str): Batch codec
+            latency (float): Time in seconds between batch send & acknowledgment
+
+        Returns:
+            None
+        """
+        if codec in self._stats:
+            self._stats[codec]['latency_total'] += latency
+            self._stats[codec]['batches'] += 1
+
+    def get_codec(self) -> str:
+        """ Return selected codec
+
+        Returns:
+            str: Codec name
+        """
+        return self._codec
+
+    def get_report(self) -> Dict[str, Dict[str, float]]:
+        """ Return last sample & mean acknowledgment latency by codec
+
+        Returns:
+            Dict[str, Dict[str, float]]: ratio, compress_time, cost, latency (mean) & batches by codec
+        """
+        report = dict()
+        for codec, stats in self._stats.items():
+            report[codec] = {
+                'ratio': stats['ratio'],
+                'compress_time': stats['compress_time'],
+                'cost': stats['cost'],
+                'latency': stats['latency_total'] / stats['batches'] if stats['batches'] else 0.0,
+                'batches': stats['batches'],
+            }
+        return report
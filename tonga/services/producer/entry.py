@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" Serialized record entry codec
+
+Serialized records kept locally before being sent (ProducerOutbox segments, RecordScheduler local store values)::
+
+    entry: header (topic length, key length), topic, key, value (serialized record)
+"""
+
+import struct
+from typing import Optional, Tuple
+
+__all__ = [
+    'encode_entry',
+    'decode_entry',
+]
+
+_ENTRY_HEADER = struct.Struct('>HI')  # topic length, key length
+
+# Key length of a record without key
+_NO_KEY = 0xFFFFFFFF
+
+
+def encode_entry(topic: str, key: Optional[bytes], value: bytes) -> bytes:
+    """ Encode a serialized record as entry
+
+    Args:
+        topic (str): Topic name
+        key (Optional[bytes]): Serialized record key
+        value (bytes): Serialized record value
+
+    Returns:
+        bytes: Encoded entry
+    """
+    raw_topic = topic.encode('utf-8')
+    header = _ENTRY_HEADER.pack(len(raw_topic), _NO_KEY if key is None else len(key))
+    return b''.join((header, raw_topic, b'' if key is None else key, value))
+
+
+def decode_entry(entry: bytes) -> Tuple[str, Optional[bytes], bytes]:
+    """ Decode a serialized record from entry
+
+    Args:
+        entry (bytes): Encoded entry
+
+    Returns:
+        Tuple[str, Optional[bytes], bytes]: Topic name, serialized record key & value
+    """
+    topic_len, key_len = _ENTRY_HEADER.unpack_from(entry)
+    pos = _ENTRY_HEADER.size
+    topic = entry[pos:pos + topic_len].decode('utf-8')
+    pos += topic_len
+    if key_len == _NO_KEY:
+        return topic, None, entry[pos:]
+    return topic, entry[pos:pos + key_len], entry[pos + key_len:]
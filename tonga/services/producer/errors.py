@@ -5,6 +5,10 @@
 """ Contains all producer errors
 """
 
+from typing import Dict, List, Optional
+
+from tonga.models.structs.positioning import KafkaPositioning
+
 __all__ = [
     'ProducerConnectionError',
     'AioKafkaProducerBadParams',
@@ -18,6 +22,10 @@ __all__ = [
     'FailToSendEvent',
     'UnknownEventBase',
     'FailToSendBatch',
+    'FailToSendRecords',
+    'RecordTooLarge',
+    'OutboxDisabledError',
+    'BadCompressionCodec',
 ]
 
 
@@ -98,6 +106,45 @@ class FailToSendBatch(Exception):
     """
 
 
+class FailToSendRecords(FailToSendBatch):
+    """FailToSendRecords
+
+    This error was raised when producer fail to send some records of a send_many call
+
+    Attributes:
+        positionings (List[Optional[KafkaPositioning]]): Positioning of each record in input order (None if failed)
+        errors (Dict[int, BaseException]): Error by index of failed record
+    """
+    positionings: List[Optional[KafkaPositioning]]
+    errors: Dict[int, BaseException]
+
+    def __init__(self, positionings: List[Optional[KafkaPositioning]], errors: Dict[int, BaseException]) -> None:
+        super().__init__('{} of {} records failed'.format(len(errors), len(positionings)))
+        self.positionings = positionings
+        self.errors = errors
+
+
+class RecordTooLarge(FailToSendBatch):
+    """RecordTooLarge
+
+    This error was raised when a serialized record is bigger than an empty batch (record can't be sent)
+    """
+
+
+class OutboxDisabledError(RuntimeError):
+    """OutboxDisabledError
+
+    This error was raised when send_outbox was call on a producer without outbox
+    """
+
+
+class BadCompressionCodec(ValueError):
+    """BadCompressionCodec
+
+    This error was raised when a compression codec is unknown or not installed
+    """
+
+
 class UnknownEventBase(TypeError):
     """UnknownEventBase
 
@@ -8,8 +8,9 @@ Produce messages and send them in a Kafka topic.
 """
 
 import asyncio
+from asyncio import Future
 from logging import (getLogger, Logger)
-from typing import Union, List, Dict, Awaitable
+from typing import Any, Union, List, Dict, Awaitable, Optional, Callable, cast
 
 from aiokafka.errors import KafkaError, KafkaTimeoutError
 from aiokafka.producer import AIOKafkaProducer
@@ -17,24 +18,32 @@ from aiokafka.producer.message_accumulator import BatchBuilder
 from aiokafka.producer.producer import TransactionContext
 
 from tonga.models.records.base import BaseRecord
+from tonga.models.records.command.command import BaseCommand
+from tonga.models.records.result.result import BaseResult
 from tonga.models.store.store_record import StoreRecord
 from tonga.models.structs.positioning import (BasePositioning, KafkaPositioning)
 from tonga.services.coordinator.client.kafka_client import KafkaClient
 from tonga.services.coordinator.partitioner.base import BasePartitioner
 from tonga.services.errors import BadSerializer
+from tonga.services.producer.accumulator import RecordAccumulator
 from tonga.services.producer.base import BaseProducer
+from tonga.services.producer.compression import BatchProfile
 from tonga.services.producer.errors import AioKafkaProducerBadParams
 from tonga.services.producer.errors import FailToSendBatch
 from tonga.services.producer.errors import FailToSendEvent
+from tonga.services.producer.errors import FailToSendRecords
 from tonga.services.producer.errors import KafkaProducerAlreadyStartedError
 from tonga.services.producer.errors import KafkaProducerError
 from tonga.services.producer.errors import KafkaProducerNotStartedError
 from tonga.services.producer.errors import KafkaProducerTimeoutError
 from tonga.services.producer.errors import KeyErrorSendEvent
+from tonga.services.producer.errors import OutboxDisabledError
 from tonga.services.producer.errors import ProducerConnectionError
 from tonga.services.producer.errors import TypeErrorSendEvent
 from tonga.services.producer.errors import UnknownEventBase
 from tonga.services.producer.errors import ValueErrorSendEvent
+from tonga.services.producer.outbox import ProducerOutbox
+from tonga.services.producer.tracker import SendTracker
 from tonga.services.serializer.base import BaseSerializer
 from tonga.services.serializer.kafka_key import KafkaKeySerializer
 
@@ -60,6 +69,15 @@ class KafkaProducer(BaseProducer):
         _transactional_id (str): Id for make transactional process
         _kafka_producer (AIOKafkaProducer): AioKafkaProducer for more information go to
         _loop (AbstractEventLoop): Asyncio loop
+        _partitioner (BasePartitioner): Record partitioner
+        _start_lock (asyncio.Lock): Serializes lazy producer start
+        _accumulator (Optional[RecordAccumulator]): Batches of send_batched records, created on first use
+        _batch_linger (float): Max time in seconds a send_batched record waits in an open batch
+        _batch_max_records (int): Max number of records by send_batched batch
+        _batch_max_bytes (int): Max send_batched batch size in bytes
+        _topic_profiles (Dict[str, BatchProfile]): send_batched batching & compression settings by topic
+        _outbox (Optional[ProducerOutbox]): Durable local outbox of send_outbox, None if outbox is disabled
+        _shared (bool): True if producer was created by shared (stop_producer releases it from client producer pool)
     """
     logger: Logger
     serializer: BaseSerializer
@@ -71,10 +89,24 @@ class KafkaProducer(BaseProducer):
     _transactional_id: str
     _kafka_producer: AIOKafkaProducer
     _loop: asyncio.AbstractEventLoop
+    _partitioner: BasePartitioner
+    _start_lock: asyncio.Lock
+    _accumulator: Optional[RecordAccumulator]
+    _batch_linger: float
+    _batch_max_records: int
+    _batch_max_bytes: int
+    _topic_profiles: Dict[str, BatchProfile]
+    _outbox: Optional[ProducerOutbox]
+    _tracker: SendTracker
+    _shared: bool
 
     def __init__(self, client: KafkaClient, serializer: BaseSerializer, loop: asyncio.AbstractEventLoop,
                  partitioner: BasePartitioner, client_id: str = None, acks: Union[int, str] = 1,
-                 transactional_id: str = None) -> None:
+                 transactional_id: str = None, batch_linger: float = 0.005, batch_max_records: int = 500,
+                 batch_max_bytes: int = 16384, outbox_path: str = None, compression_type: str = None,
+                 linger_ms: int = 0, max_batch_size: int = 16384,
+                 topic_profiles: Dict[str, BatchProfile] = None, max_in_flight_records: int = 10000,
+                 max_in_flight_bytes: int = 32 * 1024 * 1024) -> None:
         """
         KafkaProducer constructor
 
@@ -85,6 +117,20 @@ class KafkaProducer(BaseProducer):
                                  received before considering a request complete. Possible value (0 / 1 / all)
             client_id (str): Client name (if is none, KafkaConsumer use KafkaClient client_id)
             transactional_id: Id for make transactional process
+            batch_linger (float): Max time in seconds a send_batched record waits in an open batch
+            batch_max_records (int): Max number of records by send_batched batch
+            batch_max_bytes (int): Max send_batched batch size in bytes (bounded by aiokafka max_batch_size, 16384)
+            outbox_path (str): Outbox directory, enables send_outbox (not acknowledged records of a previous run
+                               are sent on creation)
+            compression_type (str): Aiokafka producer codec (None, gzip, snappy, lz4)
+            linger_ms (int): Aiokafka producer linger time in milliseconds (send / send_and_wait)
+            max_batch_size (int): Aiokafka producer max batch size in bytes
+            topic_profiles (Dict[str, BatchProfile]): send_batched batching & compression settings by topic (linger,
+                                                      max records / bytes, codec or adaptive codec), topics without
+                                                      profile use batch_* params & compression_type
+            max_in_flight_records (int): Max number of send_tracked records not acknowledged yet (send_tracked
+                                         waits beyond)
+            max_in_flight_bytes (int): Max size in bytes of send_tracked records not acknowledged yet
 
         Raises:
             AioKafkaProducerBadParams: raised when producer was call with bad params
@@ -112,6 +158,15 @@ class KafkaProducer(BaseProducer):
         self._transactional_id = transactional_id
         self._running = False
         self._loop = loop
+        self._partitioner = partitioner
+        self._start_lock = asyncio.Lock(loop=self._loop)
+        self._accumulator = None
+        self._batch_linger = batch_linger
+        self._batch_max_records = batch_max_records
+        self._batch_max_bytes = batch_max_bytes
+        self._topic_profiles = dict() if topic_profiles is None else topic_profiles
+        self._tracker = SendTracker(self._loop, max_in_flight_records, max_in_flight_bytes)
+        self._shared = False
 
         try:
             self._kafka_producer = AIOKafkaProducer(loop=self._loop, bootstrap_servers=self._bootstrap_servers,
@@ -119,7 +174,8 @@ class KafkaProducer(BaseProducer):
                                                     value_serializer=self.serializer.encode,
                                                     transactional_id=self._transactional_id,
                                                     key_serializer=KafkaKeySerializer.encode,
-                                                    partitioner=partitioner)
+                                                    partitioner=partitioner, compression_type=compression_type,
+                                                    linger_ms=linger_ms, max_batch_size=max_batch_size)
         except ValueError as err:
             self.logger.exception('%s', err.__str__())
             raise AioKafkaProducerBadParams
@@ -128,6 +184,46 @@ class KafkaProducer(BaseProducer):
             raise KafkaProducerError
         self.logger.debug('Create new producer %s', self._client_id)
 
+        if outbox_path is None:
+            self._outbox = None
+        else:
+            self._outbox = ProducerOutbox(self, self.serializer, outbox_path, self._loop)
+            self._outbox.start()
+
+    @classmethod
+    def shared(cls, client: KafkaClient, serializer: BaseSerializer, loop: asyncio.AbstractEventLoop,
+               partitioner: BasePartitioner, client_id: str = None, acks: Union[int, str] = 1,
+               transactional_id: str = None, **kwargs) -> 'KafkaProducer':
+        """
+        Return the client pool producer of this configuration, created on first call
+
+        Producers with same acks, transactional_id, partitioner key (BasePartitioner.get_pool_key), serializer &
+        loop are shared (client_id & kwargs of first call are used). A shared producer is released with
+        client.get_producer_pool().release(producer) or stop_producer, it's stopped by its last release.
+
+        Args:
+            client (KafkaClient): Initialization class, owner of producer pool
+            serializer (BaseSerializer): Serializer encode & decode event
+            loop (asyncio.AbstractEventLoop): Asyncio loop
+            partitioner (BasePartitioner): Record partitioner
+            client_id (str): Client name (if is none, KafkaProducer use KafkaClient client_id)
+            acks (Union[int, str]): The number of acknowledgments the producer requires (0 / 1 / all)
+            transactional_id: Id for make transactional process
+            **kwargs (Dict[str, Any]): KafkaProducer params
+
+        Returns:
+            KafkaProducer: Shared producer
+        """
+        key = (cls, acks, transactional_id, partitioner.get_pool_key(), id(serializer), id(loop))
+
+        def create_producer() -> 'KafkaProducer':
+            producer = cls(client=client, serializer=serializer, loop=loop, partitioner=partitioner,
+                           client_id=client_id, acks=acks, transactional_id=transactional_id, **kwargs)
+            producer._shared = True
+            return producer
+        # Pool key holds producer class, pooled producer of key is always a cls instance
+        return cast('KafkaProducer', client.get_producer_pool().acquire(key, create_producer))
+
     async def start_producer(self) -> None:
         """
         Start producer
@@ -146,6 +242,9 @@ class KafkaProducer(BaseProducer):
             try:
                 await self._kafka_producer.start()
                 self._running = True
+                self._client.get_topic_metadata().attach(self._kafka_producer.client, self._loop)
+                if self._outbox is not None:
+                    self._outbox.start()
                 self.logger.debug('Start producer : %s', self._client_id)
             except KafkaTimeoutError as err:
                 self.logger.exception('retry: %s, err:  %s', retry, err.__str__())
@@ -163,7 +262,7 @@ class KafkaProducer(BaseProducer):
 
     async def stop_producer(self) -> None:
         """
-        Stop producer
+        Stop producer, a shared producer is released from client producer pool (stopped by its last release)
 
         Raises:
             KafkaProducerNotStartedError: raised when producer was not started
@@ -173,8 +272,16 @@ class KafkaProducer(BaseProducer):
         Returns:
             None
         """
+        producer_pool = self._client.get_producer_pool()
+        if self._shared and producer_pool.get_ref_count(self) > 0:
+            await producer_pool.release(self)
+            return
         if not self._running:
             raise KafkaProducerNotStartedError
+        if self._outbox is not None:
+            await self._outbox.stop()
+        await self.flush()
+        self._client.get_topic_metadata().detach(self._kafka_producer.client)
         try:
             await self._kafka_producer.stop()
             self._running = False
@@ -186,6 +293,17 @@ class KafkaProducer(BaseProducer):
             self.logger.exception('%s', err.__str__())
             raise err
 
+    async def __ensure_started(self) -> None:
+        """
+        Start producer if not running (concurrent callers of a shared producer start it once)
+
+        Returns:
+            None
+        """
+        async with self._start_lock:
+            if not self._running:
+                await self.start_producer()
+
     def is_running(self) -> bool:
         """
         Get is running
@@ -239,8 +357,7 @@ class KafkaProducer(BaseProducer):
         Returns:
             None
         """
-        if not self._running:
-            await self.start_producer()
+        await self.__ensure_started()
 
         for retry in range(4):
             try:
@@ -293,8 +410,7 @@ class KafkaProducer(BaseProducer):
         Returns:
             None
         """
-        if not self._running:
-            await self.start_producer()
+        await self.__ensure_started()
 
         for retry in range(4):
             try:
@@ -326,6 +442,251 @@ class KafkaProducer(BaseProducer):
         else:
             raise FailToSendEvent
 
+    async def send_batched(self, msg: Union[BaseRecord, StoreRecord], topic: str) -> Future:
+        """
+        Send a message in the open batch of its topic / partition (partition chosen by producer partitioner)
+
+        Batch is sent once it holds batch_max_records records or batch_max_bytes bytes, or batch_linger seconds
+        after its first message. Returned future resolves once batch is acknowledged.
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Event to send in Kafka
+            topic (str): Topic name to send massage
+
+        Raises:
+            UnknownEventBase: raised when msg is not a BaseRecord or a StoreRecord
+
+        Returns:
+            Future: Resolved to message KafkaPositioning, or to batch send error (FailToSendBatch / KafkaError)
+        """
+        await self.__ensure_started()
+        return await self.__get_accumulator().append(msg, topic)
+
+    async def send_batched_serialized(self, key: Optional[bytes], value: bytes, topic: str) -> Future:
+        """
+        Send an already serialized message in the open batch of its topic / partition (see send_batched)
+
+        Args:
+            key (Optional[bytes]): Serialized message key (KafkaKeySerializer)
+            value (bytes): Serialized message
+            topic (str): Topic name to send massage
+
+        Returns:
+            Future: Resolved to message KafkaPositioning, or to batch send error (FailToSendBatch / KafkaError)
+        """
+        await self.__ensure_started()
+        return await self.__get_accumulator().append_serialized(key, value, topic)
+
+    async def send_tracked(self, msg: Union[BaseRecord, StoreRecord], topic: str,
+                           callback: Callable[[Future], None] = None) -> Future:
+        """
+        Send a message in batching mode without waiting its acknowledgment (see send_batched)
+
+        Waits while max_in_flight_records messages or max_in_flight_bytes bytes sent by send_tracked are not
+        acknowledged (open batches are sent first). Send errors are collected (pop_send_errors), flush waits for all
+        tracked messages.
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Event to send in Kafka
+            topic (str): Topic name to send massage
+            callback (Callable[[Future], None]): Called with message future once acknowledged or failed
+
+        Raises:
+            UnknownEventBase: raised when msg is not a BaseRecord or a StoreRecord
+
+        Returns:
+            Future: Resolved to message KafkaPositioning, or to send error
+        """
+        await self.__ensure_started()
+        accumulator = self.__get_accumulator()
+        encoded = accumulator.encode(msg)
+        size = len(encoded[1]) + len(encoded[2])
+        if not self._tracker.has_capacity(size):
+            # In flight records may wait in open batches, send them instead of waiting batches linger
+            await accumulator.flush()
+        await self._tracker.acquire(size)
+        try:
+            future = await accumulator.append_encoded(msg, encoded, topic)
+        except Exception as err:
+            future = self._loop.create_future()
+            future.set_exception(err)
+            self._tracker.track(future, size, callback)
+            raise
+        self._tracker.track(future, size, callback)
+        return future
+
+    def pop_send_errors(self) -> List[BaseException]:
+        """
+        Get & clear send_tracked errors collected since last call
+
+        Returns:
+            List[BaseException]: Send errors, oldest first
+        """
+        return self._tracker.pop_errors()
+
+    def get_send_stats(self) -> Dict[str, int]:
+        """
+        Get send_tracked counters
+
+        Returns:
+            Dict[str, int]: in_flight_records, in_flight_bytes, sent & failed
+        """
+        return self._tracker.get_stats()
+
+    async def request(self, command: BaseCommand, topic: str, reply_topic: str = None,
+                      timeout: float = 30.0) -> BaseResult:
+        """
+        Send a command & await its result (first BaseResult with command correlation_id)
+
+        Result is delivered by a KafkaConsumer of reply topic created with same KafkaClient, without calling its
+        result handler. Reply topic is written in command context ('reply_topic') for command handler.
+
+        Args:
+            command (BaseCommand): Command to send in Kafka
+            topic (str): Topic name to send command
+            reply_topic (str): Topic name where command result is sent (None keeps command context)
+            timeout (float): Time in seconds to wait for result
+
+        Raises:
+            RequestAlreadyPending: raised when a request with same correlation_id is pending
+            RequestTimeoutError: raised when no result was received before timeout
+            FailToSendEvent: raised when producer fail to send command (send_and_wait errors)
+
+        Returns:
+            BaseResult: Command result
+        """
+        if reply_topic is not None:
+            command.context['reply_topic'] = reply_topic
+        # Registered before send, a result can't be received before its request
+        result_future = self._client.get_pending_requests().register(command.correlation_id, timeout, self._loop)
+        try:
+            await self.send_and_wait(command, topic)
+        except Exception:
+            result_future.cancel()
+            raise
+        return await result_future
+
+    async def send_outbox(self, msg: Union[BaseRecord, StoreRecord], topic: str) -> None:
+        """
+        Write a message in producer outbox, returns once message is written on local disk
+
+        Outbox messages are sent in background in write order (at least once), a message not acknowledged before
+        producer stop is sent on next start.
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Event to send in Kafka
+            topic (str): Topic name to send massage
+
+        Raises:
+            OutboxDisabledError: raised when producer was created without outbox_path
+            UnknownEventBase: raised when msg is not a BaseRecord or a StoreRecord
+
+        Returns:
+            None
+        """
+        if self._outbox is None:
+            raise OutboxDisabledError
+        await self._outbox.append(msg, topic)
+
+    def get_outbox(self) -> Optional[ProducerOutbox]:
+        """
+        Get producer outbox
+
+        Returns:
+            Optional[ProducerOutbox]: Outbox, None if outbox is disabled
+        """
+        return self._outbox
+
+    async def send_many(self, msgs: List[Union[BaseRecord, StoreRecord]], topic: str) -> List[BasePositioning]:
+        """
+        Send many messages through send_batched batches & await all acknowledgments
+
+        All messages are serialized before any send, then appended in the batches of their topic / partition,
+        batches holding them are sent without waiting batch_linger (other batches & tracked messages are not
+        awaited).
+
+        Args:
+            msgs (List[Union[BaseRecord, StoreRecord]]): Events to send in Kafka
+            topic (str): Topic name to send massage
+
+        Raises:
+            UnknownEventBase: raised when a msg is not a BaseRecord or a StoreRecord (no message is sent)
+            FailToSendRecords: raised when some messages fail, contains positioning or error of each message
+
+        Returns:
+            List[BasePositioning]: Messages positioning (KafkaPositioning), in msgs order
+        """
+        if not msgs:
+            return list()
+        await self.__ensure_started()
+        self.logger.debug('Send %s records in %s', len(msgs), topic)
+        futures = await self.__get_accumulator().append_many(msgs, topic)
+        await self.flush_records(futures)
+
+        positionings: List[Optional[KafkaPositioning]] = list()
+        errors: Dict[int, BaseException] = dict()
+        for index, future in enumerate(futures):
+            exception = FailToSendBatch() if future.cancelled() else future.exception()
+            if exception is None:
+                positionings.append(future.result())
+            else:
+                errors[index] = exception
+                positionings.append(None)
+        if errors:
+            self.logger.error('Fail to send %s of %s records in %s', len(errors), len(msgs), topic)
+            raise FailToSendRecords(positionings, errors)
+        return [future.result() for future in futures]
+
+    async def flush(self) -> None:
+        """
+        Send all open send_batched batches & wait for their acknowledgments, and for all send_tracked messages
+
+        Returns:
+            None
+        """
+        if self._accumulator is not None:
+            await self._accumulator.flush()
+        await self._tracker.wait_all()
+
+    async def flush_records(self, futures: List[Future]) -> None:
+        """
+        Send open send_batched batches holding messages futures & wait for these messages acknowledgments only
+
+        Args:
+            futures (List[Future]): Messages futures returned by send_batched / send_batched_serialized
+
+        Returns:
+            None
+        """
+        if futures:
+            await self.__get_accumulator().flush_records(futures)
+
+    def __get_accumulator(self) -> RecordAccumulator:
+        """
+        Return send_batched accumulator, created on first use
+
+        Returns:
+            RecordAccumulator: Record accumulator
+        """
+        if self._accumulator is None:
+            self._accumulator = RecordAccumulator(self._kafka_producer, self.serializer, self._partitioner,
+                                                  self._loop, self._batch_linger, self._batch_max_records,
+                                                  self._batch_max_bytes, self._client.get_topic_metadata(),
+                                                  self._topic_profiles)
+        return self._accumulator
+
+    def get_compression_report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get codec selected for each topic with adaptive compression & codec samples
+
+        Returns:
+            Dict[str, Dict[str, Any]]: By topic, selected codec ('codec') & ratio / compress_time / cost / latency by
+                                       codec ('codecs')
+        """
+        if self._accumulator is None:
+            return dict()
+        return self._accumulator.get_compression_report()
+
     async def create_batch(self) -> BatchBuilder:
         """
         Creates an empty batch
@@ -334,8 +695,7 @@ class KafkaProducer(BaseProducer):
             BatchBuilder: Empty batch
         """
 
-        if not self._running:
-            await self.start_producer()
+        await self.__ensure_started()
         self.logger.debug('Create batch')
         return self._kafka_producer.create_batch()
 
@@ -359,8 +719,7 @@ class KafkaProducer(BaseProducer):
             None
         """
 
-        if not self._running:
-            await self.start_producer()
+        await self.__ensure_started()
 
         for retry in range(4):
             try:
@@ -394,11 +753,14 @@ class KafkaProducer(BaseProducer):
             topic (str): topic name
 
         Returns:
-            List[int]: list of partitions
+            List[int]: list of partitions (read in client topic metadata cache first)
         """
 
-        if not self._running:
-            await self.start_producer()
+        await self.__ensure_started()
+        topic_metadata = self._client.get_topic_metadata()
+        partitions = topic_metadata.partitions_for(topic)
+        if partitions is not None:
+            return partitions
         try:
             self.logger.debug('Get partitions by topic')
             partitions = await self._kafka_producer.partitions_for(topic)
@@ -407,8 +769,9 @@ class KafkaProducer(BaseProducer):
             raise KafkaProducerTimeoutError
         except KafkaError as err:
             self.logger.exception('%s', err.__str__())
+            topic_metadata.invalidate(topic, self._loop)
             raise err
-        return partitions
+        return sorted(partitions)
 
     def get_producer(self) -> AIOKafkaProducer:
         """
@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" ProducerOutbox class
+
+Durable local outbox of a KafkaProducer: records are appended to an fsynced local log & published in background,
+so senders wait for local disk instead of broker.
+
+Outbox directory layout::
+
+    <segment id>.log: frame*, frame header (crc32, payload length), payload = entry
+    entry: see tonga.services.producer.entry
+    ack: (segment id, offset) of first not acknowledged entry, replaced atomically
+    dead_letters: frame*, entries dropped on a not retriable send error (dead letters)
+
+Segments are removed once all their entries are acknowledged, entries after ack position are sent again on restart
+(at least once delivery).
+"""
+
+import asyncio
+import os
+import struct
+import zlib
+from collections import deque
+from logging import (getLogger, Logger)
+from typing import BinaryIO, Deque, List, Optional, Tuple, Union
+
+from aiokafka.errors import KafkaError, MessageSizeTooLargeError, RecordTooLargeError
+
+from tonga.models.records.base import BaseRecord
+from tonga.models.store.store_record import StoreRecord
+from tonga.services.producer.base import BaseProducer
+from tonga.services.producer.entry import decode_entry, encode_entry
+from tonga.services.producer.errors import RecordTooLarge, UnknownEventBase
+from tonga.services.serializer.base import BaseSerializer
+from tonga.services.serializer.kafka_key import KafkaKeySerializer
+from tonga.stores.persistency.executor import PersistencyExecutor
+
+__all__ = [
+    'ProducerOutbox',
+]
+
+_FRAME_HEADER = struct.Struct('>II')  # crc32 of payload, payload length
+_ACK = struct.Struct('>IQ')  # segment id, offset
+
+# Send errors of an entry that can't succeed on retry
+_NOT_RETRIABLE = (RecordTooLarge, MessageSizeTooLargeError, RecordTooLargeError)
+
+# Outbox entry: (topic, serialized key, serialized value)
+_Entry = Tuple[str, Optional[bytes], bytes]
+
+# Outbox entry frame position: (segment id, frame offset in segment, end offset in segment)
+_Position = Tuple[int, int, int]
+
+
+class ProducerOutbox:
+    """ ProducerOutbox class
+
+    Appends of a same loop iteration are written & fsynced together. The drainer sends pending entries in append
+    order, by batches of *batch_size* entries, through producer batching mode (send_batched_serialized), so entries
+    of a same key keep their order. When some entries of a batch fail, acknowledged position stops at first failed
+    entry & batch is sent again from there after *retry_backoff* seconds. An entry failing with a not retriable
+    error (record too large) is logged, written in dead letter log & acknowledged, so it doesn't block outbox.
+
+    Only entry positions are kept in memory, drainer reads payloads of each batch back from segments.
+
+    Attributes:
+        _producer (BaseProducer): Producer used by drainer (send_batched_serialized & flush_records)
+        _serializer (BaseSerializer): Record value serializer
+        _path (str): Outbox directory
+        _loop (AbstractEventLoop): Asyncio loop
+        _batch_size (int): Max number of entries sent by drainer round
+        _max_segment_size (int): Segment is rolled once it reaches this size (in bytes)
+        _retry_backoff (float): Time in seconds before a failed batch is sent again
+        _sync (bool): If true, segment is fsynced after each write
+        _entries (Deque[_Position]): Positions of written & not acknowledged entries, in append order
+        _pending (List[_Entry]): Appended entries waiting for next write
+        _write_future (Optional[Future]): Next write, shared by appends waiting for it
+        _active_id (int): Segment id of appends
+        _active_file (BinaryIO): Segment file of appends
+        _ack (Tuple[int, int]): Acknowledged position (segment id, offset)
+        _drain_task (Optional[Future]): Drainer task, None if outbox is stopped
+        _wakeup (asyncio.Event): Set when entries are written
+        _executor (PersistencyExecutor): Executor of blocking file calls
+    """
+    _logger: Logger
+    _producer: BaseProducer
+    _serializer: BaseSerializer
+    _path: str
+    _loop: asyncio.AbstractEventLoop
+    _batch_size: int
+    _max_segment_size: int
+    _retry_backoff: float
+    _sync: bool
+    _entries: Deque[_Position]
+    _pending: List[_Entry]
+    _write_future: Optional[asyncio.Future]
+    _active_id: int
+    _active_file: BinaryIO
+    _ack: Tuple[int, int]
+    _drain_task: Optional[asyncio.Future]
+    _wakeup: asyncio.Event
+    _executor: PersistencyExecutor
+
+    def __init__(self, producer: BaseProducer, serializer: BaseSerializer, path: str,
+                 loop: asyncio.AbstractEventLoop, batch_size: int = 500, max_segment_size: int = 16 * 1024 * 1024,
+                 retry_backoff: float = 1.0, sync: bool = True) -> None:
+        """ ProducerOutbox constructor, loads not acknowledged entries of a previous run
+
+        Args:
+            producer (BaseProducer): Producer used by drainer (send_batched_serialized & flush_records)
+            serializer (BaseSerializer): Record value serializer
+            path (str): Outbox directory (created if missing)
+            loop (asyncio.AbstractEventLoop): Asyncio loop
+            batch_size (int): Max number of entries sent by drainer round
+            max_segment_size (int): Segment is rolled once it reaches this size (in bytes)
+            retry_backoff (float): Time in seconds before a failed batch is sent again
+            sync (bool): If true, segment is fsynced after each write
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._producer = producer
+        self._serializer = serializer
+        self._path = path
+        self._loop = loop
+        self._batch_size = batch_size
+        self._max_segment_size = max_segment_size
+        self._retry_backoff = retry_backoff
+        self._sync = sync
+        self._entries = deque()
+        self._pending = list()
+        self._write_future = None
+        self._drain_task = None
+        self._wakeup = asyncio.Event(loop=self._loop)
+        self._executor = PersistencyExecutor(max_concurrency=1)
+
+        os.makedirs(self._path, exist_ok=True)
+        self.__load()
+
+    async def append(self, msg: Union[BaseRecord, StoreRecord], topic: str) -> None:
+        """ Append a record in outbox, returns once record is written (& fsynced) in outbox
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Record to send
+            topic (str): Topic name
+
+        Raises:
+            UnknownEventBase: msg is not a BaseRecord or a StoreRecord
+
+        Returns:
+            None
+        """
+        if isinstance(msg, BaseRecord):
+            key = KafkaKeySerializer.encode(msg.partition_key)
+        elif isinstance(msg, StoreRecord):
+            key = KafkaKeySerializer.encode(msg.key)
+        else:
+            raise UnknownEventBase
+        self._pending.append((topic, key, self._serializer.encode(msg)))
+        if self._write_future is None:
+            self._write_future = asyncio.ensure_future(self.__write_pending(), loop=self._loop)
+        await asyncio.shield(self._write_future, loop=self._loop)
+
+    def start(self) -> None:
+        """ Start drainer (not acknowledged entries of a previous run are sent first)
+
+        Returns:
+            None
+        """
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self.__drain(), loop=self._loop)
+
+    async def stop(self) -> None:
+        """ Stop drainer, entries not acknowledged yet stay in outbox & are sent on next start
+
+        Returns:
+            None
+        """
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+            self._drain_task = None
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._pending)
+
+    async def __write_pending(self) -> None:
+        """ Write appended entries in one write (& one fsync), then wake up drainer
+
+        Returns:
+            None
+        """
+        # Appends of current loop iteration join this write
+        await asyncio.sleep(0, loop=self._loop)
+        pending, self._pending = self._pending, list()
+        self._write_future = None
+        self._entries.extend(await self._executor.run(self.__write, pending))
+        self._wakeup.set()
+
+    async def __drain(self) -> None:
+        """ Send written entries by batches, in append order, & move acknowledged position
+
+        Returns:
+            None
+        """
+        while True:
+            if not self._entries:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            positions = [self._entries[i] for i in range(min(self._batch_size, len(self._entries)))]
+            batch = await self._executor.run(self.__read_entries, positions)
+            try:
+                futures = [await self._producer.send_batched_serialized(key, value, topic)
+                           for topic, key, value in batch]
+                await self._producer.flush_records(futures)
+            except (KafkaError, ConnectionError, TimeoutError) as err:
+                self._logger.exception('Outbox fail to send batch, retry in %ss, err: %s', self._retry_backoff,
+                                       err.__str__())
+                await asyncio.sleep(self._retry_backoff, loop=self._loop)
+                continue
+
+            nb_acked = 0
+            dead_letters: List[_Entry] = list()
+            for entry, future in zip(batch, futures):
+                if future.cancelled():
+                    break
+                if future.exception() is not None:
+                    if not isinstance(future.exception(), _NOT_RETRIABLE):
+                        break
+                    self._logger.error('Outbox drop entry of topic %s in dead letters, err: %s', entry[0],
+                                       future.exception().__str__())
+                    dead_letters.append(entry)
+                nb_acked += 1
+            if dead_letters:
+                await self._executor.run(self.__write_dead_letters, dead_letters)
+            for _ in range(nb_acked):
+                self._entries.popleft()
+            if nb_acked:
+                seg_id, _, offset = positions[nb_acked - 1]
+                await self._executor.run(self.__write_ack, seg_id, offset)
+            if nb_acked < len(batch):
+                self._logger.error('Outbox fail to send %s entries, retry in %ss', len(batch) - nb_acked,
+                                   self._retry_backoff)
+                await asyncio.sleep(self._retry_backoff, loop=self._loop)
+
+    def __segment_path(self, seg_id: int) -> str:
+        return os.path.join(self._path, f'{seg_id}.log')
+
+    def __ack_path(self) -> str:
+        return os.path.join(self._path, 'ack')
+
+    def __dead_letters_path(self) -> str:
+        return os.path.join(self._path, 'dead_letters')
+
+    def __load(self) -> None:
+        """ Load not acknowledged entries, truncate torn tail & remove acknowledged segments
+
+        Returns:
+            None
+        """
+        try:
+            with open(self.__ack_path(), 'rb') as ack_file:
+                ack_seg_id, ack_offset = _ACK.unpack(ack_file.read(_ACK.size))
+            self._ack = (ack_seg_id, ack_offset)
+        except (FileNotFoundError, struct.error):
+            self._ack = (0, 0)
+        seg_ids = sorted(int(name[:-4]) for name in os.listdir(self._path) if name.endswith('.log'))
+        for seg_id in seg_ids:
+            if seg_id < self._ack[0]:
+                os.remove(self.__segment_path(seg_id))
+                continue
+            self._entries.extend(self.__scan_segment(seg_id, self._ack[1] if seg_id == self._ack[0] else 0))
+        self._active_id = seg_ids[-1] if seg_ids else max(self._ack[0], 1)
+        self._active_file = open(self.__segment_path(self._active_id), 'ab')
+        if self._entries:
+            self._logger.info('Outbox loaded %s not acknowledged entries', len(self._entries))
+
+    def __scan_segment(self, seg_id: int, offset: int) -> List[_Position]:
+        """ Read segment entry positions after offset, a torn or corrupted tail is truncated
+
+        Args:
+            seg_id (int): Segment id
+            offset (int): First entry offset
+
+        Returns:
+            List[_Position]: Segment entry positions
+        """
+        with open(self.__segment_path(seg_id), 'rb') as segment_file:
+            data = segment_file.read()
+        positions: List[_Position] = list()
+        pos = offset
+        while pos + _FRAME_HEADER.size <= len(data):
+            crc, length = _FRAME_HEADER.unpack_from(data, pos)
+            payload = data[pos + _FRAME_HEADER.size:pos + _FRAME_HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            positions.append((seg_id, pos, pos + _FRAME_HEADER.size + length))
+            pos += _FRAME_HEADER.size + length
+        if pos < len(data):
+            self._logger.warning('Outbox truncate segment %s at %s (torn write)', seg_id, pos)
+            os.truncate(self.__segment_path(seg_id), pos)
+        return positions
+
+    def __read_entries(self, positions: List[_Position]) -> List[_Entry]:
+        """ Read entries back from segments, one read by segment (run in executor)
+
+        Args:
+            positions (List[_Position]): Entry positions, in append order
+
+        Returns:
+            List[_Entry]: Entries
+        """
+        entries: List[_Entry] = list()
+        first = 0
+        while first < len(positions):
+            seg_id, start, _ = positions[first]
+            last = first
+            while last + 1 < len(positions) and positions[last + 1][0] == seg_id:
+                last += 1
+            with open(self.__segment_path(seg_id), 'rb') as segment_file:
+                segment_file.seek(start)
+                data = segment_file.read(positions[last][2] - start)
+            for _, frame_start, frame_end in positions[first:last + 1]:
+                entries.append(decode_entry(data[frame_start - start + _FRAME_HEADER.size:frame_end - start]))
+            first = last + 1
+        return entries
+
+    @staticmethod
+    def __frames(entries: List[_Entry]) -> List[bytes]:
+        """ Return frames (frame header & payload) of entries
+
+        Args:
+            entries (List[_Entry]): Entries as (topic, key, value)
+
+        Returns:
+            List[bytes]: Frame header & payload of each entry
+        """
+        frames: List[bytes] = list()
+        for topic, key, value in entries:
+            payload = encode_entry(topic, key, value)
+            frames.append(_FRAME_HEADER.pack(zlib.crc32(payload), len(payload)))
+            frames.append(payload)
+        return frames
+
+    def __write(self, pending: List[_Entry]) -> List[_Position]:
+        """ Append entries in active segment (rolled once full) & fsync it (run in executor)
+
+        Args:
+            pending (List[_Entry]): Entries as (topic, key, value)
+
+        Returns:
+            List[_Position]: Written entry positions
+        """
+        if self._active_file.tell() >= self._max_segment_size:
+            self._active_file.close()
+            self._active_id += 1
+            self._active_file = open(self.__segment_path(self._active_id), 'ab')
+        offset = self._active_file.tell()
+        frames = self.__frames(pending)
+        positions: List[_Position] = list()
+        for header, payload in zip(frames[::2], frames[1::2]):
+            positions.append((self._active_id, offset, offset + len(header) + len(payload)))
+            offset += len(header) + len(payload)
+        self._active_file.write(b''.join(frames))
+        self._active_file.flush()
+        if self._sync:
+            os.fsync(self._active_file.fileno())
+        return positions
+
+    def __write_dead_letters(self, entries: List[_Entry]) -> None:
+        """ Append entries in dead letter log & fsync it (run in executor)
+
+        Args:
+            entries (List[_Entry]): Entries as (topic, key, value)
+
+        Returns:
+            None
+        """
+        with open(self.__dead_letters_path(), 'ab') as dead_letters_file:
+            dead_letters_file.write(b''.join(self.__frames(entries)))
+            dead_letters_file.flush()
+            if self._sync:
+                os.fsync(dead_letters_file.fileno())
+
+    def __write_ack(self, seg_id: int, offset: int) -> None:
+        """ Replace acknowledged position & remove fully acknowledged segments (run in executor)
+
+        Args:
+            seg_id (int): Segment id of last acknowledged entry
+            offset (int): End offset of last acknowledged entry
+
+        Returns:
+            None
+        """
+        tmp_path = self.__ack_path() + '.tmp'
+        with open(tmp_path, 'wb') as ack_file:
+            ack_file.write(_ACK.pack(seg_id, offset))
+            ack_file.flush()
+            if self._sync:
+                os.fsync(ack_file.fileno())
+        os.replace(tmp_path, self.__ack_path())
+        for old_id in range(self._ack[0], seg_id):
+            if os.path.exists(self.__segment_path(old_id)):
+                os.remove(self.__segment_path(old_id))
+        self._ack = (seg_id, offset)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" RecordScheduler class
+
+Delayed record delivery: scheduled records are kept in a local store (so in store changelog) & published by a
+KafkaProducer once their delivery time is reached.
+
+Scheduled record local store entry::
+
+    key: reserved prefix, delivery time (milliseconds, 16 digits), ':', uuid (keys are ordered by delivery time)
+    value: entry (see tonga.services.producer.entry)
+"""
+
+import asyncio
+import heapq
+import time
+import uuid
+from logging import (getLogger, Logger)
+from typing import Dict, List, Optional, Tuple, Union
+
+from tonga.models.records.base import BaseRecord
+from tonga.models.store.store_record import StoreRecord
+from tonga.services.producer.base import BaseProducer
+from tonga.services.producer.entry import decode_entry, encode_entry
+from tonga.services.producer.errors import UnknownEventBase
+from tonga.services.serializer.base import BaseSerializer
+from tonga.services.serializer.kafka_key import KafkaKeySerializer
+from tonga.stores.base import RESERVED_KEY_PREFIX
+from tonga.stores.manager.base import BaseStoreManager
+from tonga.stores.persistency.base import prefix_upper_bound
+
+__all__ = [
+    'RecordScheduler',
+]
+
+_SCHEDULE_KEY_PREFIX = RESERVED_KEY_PREFIX + 'schedule:'
+
+
+def _schedule_key(deliver_at: float) -> str:
+    """ Return a new local store key of a record scheduled at *deliver_at*
+
+    Args:
+        deliver_at (float): Delivery time in seconds
+
+    Returns:
+        str: Reserved key
+    """
+    return f'{_SCHEDULE_KEY_PREFIX}{max(int(deliver_at * 1000), 0):016d}:{uuid.uuid4().hex}'
+
+
+def _deliver_at(schedule_key: str) -> float:
+    """ Return delivery time of a scheduled record key
+
+    Args:
+        schedule_key (str): Scheduled record key
+
+    Returns:
+        float: Delivery time in seconds
+    """
+    return int(schedule_key[len(_SCHEDULE_KEY_PREFIX):len(_SCHEDULE_KEY_PREFIX) + 16]) / 1000
+
+
+class RecordScheduler:
+    """ RecordScheduler class
+
+    Scheduled records are written in store manager local store (reserved keys ordered by delivery time) & their
+    (delivery time, key) pushed in a heap, so schedule & pop are O(log n) & pending records payload stays in local
+    store. Records scheduled in a same loop iteration are written together in one store write batch (one changelog
+    round trip). A single timer task wakes up each *tick*, pops due keys by batches of *batch_size*, reads their entries
+    (cancelled or already delivered keys have no entry), sends them through producer batching mode & deletes
+    delivered entries. Failed records are scheduled again *retry_backoff* seconds later.
+
+    On start, the timer task waits for local store initialization & loads scheduled keys by pages (in delivery
+    order). Delivery is at least once: a record delivered right before a crash can be delivered again on restart.
+
+    Attributes:
+        _producer (BaseProducer): Producer of due records (send_batched_serialized & flush_records)
+        _store_manager (BaseStoreManager): Store manager of scheduled records local store
+        _serializer (BaseSerializer): Record value serializer
+        _loop (AbstractEventLoop): Asyncio loop
+        _tick (float): Time in seconds between two due records checks
+        _batch_size (int): Max number of records sent by batch
+        _retry_backoff (float): Time in seconds before a failed record is sent again
+        _load_page_size (int): Number of keys read by local store range on load
+        _heap (List[Tuple[float, str]]): (delivery time, key) heap of scheduled records
+        _pending (Dict[str, bytes]): Scheduled entries waiting for next write, by schedule key
+        _write_future (Optional[Future]): Next write, shared by schedules waiting for it
+        _timer_task (Optional[Future]): Timer task, None if scheduler is stopped
+    """
+    _logger: Logger
+    _producer: BaseProducer
+    _store_manager: BaseStoreManager
+    _serializer: BaseSerializer
+    _loop: asyncio.AbstractEventLoop
+    _tick: float
+    _batch_size: int
+    _retry_backoff: float
+    _load_page_size: int
+    _heap: List[Tuple[float, str]]
+    _pending: Dict[str, bytes]
+    _write_future: Optional[asyncio.Future]
+    _timer_task: Optional[asyncio.Future]
+
+    def __init__(self, producer: BaseProducer, store_manager: BaseStoreManager, serializer: BaseSerializer,
+                 loop: asyncio.AbstractEventLoop, tick: float = 0.1, batch_size: int = 500,
+                 retry_backoff: float = 1.0, load_page_size: int = 10000) -> None:
+        """ RecordScheduler constructor
+
+        Args:
+            producer (BaseProducer): Producer of due records (send_batched_serialized & flush_records)
+            store_manager (BaseStoreManager): Store manager of scheduled records local store
+            serializer (BaseSerializer): Record value serializer
+            loop (asyncio.AbstractEventLoop): Asyncio loop
+            tick (float): Time in seconds between two due records checks
+            batch_size (int): Max number of records sent by batch
+            retry_backoff (float): Time in seconds before a failed record is sent again
+            load_page_size (int): Number of keys read by local store range on load
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._producer = producer
+        self._store_manager = store_manager
+        self._serializer = serializer
+        self._loop = loop
+        self._tick = tick
+        self._batch_size = batch_size
+        self._retry_backoff = retry_backoff
+        self._load_page_size = load_page_size
+        self._heap = list()
+        self._pending = dict()
+        self._write_future = None
+        self._timer_task = None
+
+    def start(self) -> None:
+        """ Start timer task (scheduled records are loaded once local store is initialized)
+
+        Returns:
+            None
+        """
+        if self._timer_task is None:
+            self._timer_task = asyncio.ensure_future(self.__run(), loop=self._loop)
+
+    async def stop(self) -> None:
+        """ Stop timer task, scheduled records stay in local store
+
+        Returns:
+            None
+        """
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+            self._timer_task = None
+
+    async def schedule(self, msg: Union[BaseRecord, StoreRecord], topic: str, deliver_at: float) -> str:
+        """ Schedule a record, returns once record is written in local store (with records scheduled in same loop
+        iteration)
+
+        Args:
+            msg (Union[BaseRecord, StoreRecord]): Record to send
+            topic (str): Topic name
+            deliver_at (float): Delivery time in seconds (time.time() clock), a past time is delivered on next tick
+
+        Raises:
+            UnknownEventBase: msg is not a BaseRecord or a StoreRecord
+            FailToSendStoreRecord: local store entries of write batch can't all be written (acknowledged entries
+                                   are still delivered)
+
+        Returns:
+            str: Schedule key (used by cancel)
+        """
+        if isinstance(msg, BaseRecord):
+            record_key = msg.partition_key
+        elif isinstance(msg, StoreRecord):
+            record_key = msg.key
+        else:
+            raise UnknownEventBase
+        schedule_key = _schedule_key(deliver_at)
+        self._pending[schedule_key] = encode_entry(topic, KafkaKeySerializer.encode(record_key),
+                                                   self._serializer.encode(msg))
+        if self._write_future is None:
+            self._write_future = asyncio.ensure_future(self.__write_pending(), loop=self._loop)
+        await asyncio.shield(self._write_future, loop=self._loop)
+        return schedule_key
+
+    async def cancel(self, schedule_key: str) -> None:
+        """ Cancel a scheduled record (its key is dropped from heap when due)
+
+        Args:
+            schedule_key (str): Schedule key returned by schedule
+
+        Raises:
+            FailToSendStoreRecord: local store entry can't be deleted
+
+        Returns:
+            None
+        """
+        await self._store_manager.delete_many_in_local_store([schedule_key])
+
+    async def __write_pending(self) -> None:
+        """ Write scheduled entries in one store write batch, then push their keys in heap
+
+        Keys are pushed even when write batch fails: entries not written have no local store entry & are dropped
+        when due (like cancelled records)
+
+        Returns:
+            None
+        """
+        # Schedules of current loop iteration join this write
+        await asyncio.sleep(0, loop=self._loop)
+        pending, self._pending = self._pending, dict()
+        self._write_future = None
+        try:
+            async with self._store_manager.write_batch() as batch:
+                for schedule_key, entry in pending.items():
+                    batch.set(schedule_key, entry)
+        finally:
+            for schedule_key in pending:
+                heapq.heappush(self._heap, (_deliver_at(schedule_key), schedule_key))
+
+    async def __run(self) -> None:
+        """ Load scheduled records, then publish due records on each tick
+
+        Returns:
+            None
+        """
+        await self.__load()
+        while True:
+            await asyncio.sleep(self._tick, loop=self._loop)
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                keys = self.__pop_due(now)
+                try:
+                    await self.__publish(keys)
+                except Exception as err:
+                    self._logger.exception('Fail to publish %s scheduled records, retry in %ss, err: %s', len(keys),
+                                           self._retry_backoff, err.__str__())
+                    self.__reschedule(keys, now + self._retry_backoff)
+
+    async def __load(self) -> None:
+        """ Wait for local store initialization & push stored scheduled keys in heap
+
+        Returns:
+            None
+        """
+        local_store = self._store_manager.get_local_store()
+        while not local_store.get_persistency().is_initialize():
+            await asyncio.sleep(self._tick, loop=self._loop)
+
+        range_entries = local_store.__getattribute__('_range_entries')
+        start, end = _SCHEDULE_KEY_PREFIX, prefix_upper_bound(_SCHEDULE_KEY_PREFIX)
+        loaded: List[Tuple[float, str]] = list()
+        while True:
+            entries = await range_entries(start, end, False, self._load_page_size)
+            loaded.extend((_deliver_at(key), key) for key, value in entries if value)
+            if len(entries) < self._load_page_size:
+                break
+            start = entries[-1][0] + '\x00'
+        # Records scheduled while loading are already in heap, duplicated keys are delivered once (see __pop_due)
+        self._heap.extend(loaded)
+        heapq.heapify(self._heap)
+        self._logger.info('Loaded %s scheduled records', len(loaded))
+
+    def __pop_due(self, now: float) -> List[str]:
+        """ Pop due keys, at most batch_size distinct keys
+
+        Args:
+            now (float): Current time in seconds
+
+        Returns:
+            List[str]: Due keys, in delivery order
+        """
+        keys: Dict[str, None] = dict()
+        while self._heap and self._heap[0][0] <= now and len(keys) < self._batch_size:
+            keys[heapq.heappop(self._heap)[1]] = None
+        return list(keys)
+
+    def __reschedule(self, keys: List[str], deliver_at: float) -> None:
+        """ Push keys back in heap
+
+        Args:
+            keys (List[str]): Scheduled keys
+            deliver_at (float): New delivery time in seconds
+
+        Returns:
+            None
+        """
+        for key in keys:
+            heapq.heappush(self._heap, (deliver_at, key))
+
+    async def __publish(self, keys: List[str]) -> None:
+        """ Send scheduled records of keys & delete delivered entries
+
+        Args:
+            keys (List[str]): Due keys
+
+        Returns:
+            None
+        """
+        entries = await self._store_manager.get_many_in_local_store(keys)
+        sent_keys: List[str] = list()
+        futures: List[asyncio.Future] = list()
+        for key in keys:
+            entry = entries.get(key)
+            # Cancelled or already delivered
+            if not entry:
+                continue
+            topic, record_key, value = decode_entry(entry)
+            futures.append(await self._producer.send_batched_serialized(record_key, value, topic))
+            sent_keys.append(key)
+        if not futures:
+            return
+        await self._producer.flush_records(futures)
+
+        delivered = list()
+        failed = list()
+        for key, future in zip(sent_keys, futures):
+            if future.cancelled() or future.exception() is not None:
+                failed.append(key)
+            else:
+                delivered.append(key)
+        self._logger.debug('Published %s scheduled records', len(delivered))
+        if failed:
+            self._logger.error('Fail to publish %s scheduled records, retry in %ss', len(failed), self._retry_backoff)
+            self.__reschedule(failed, time.time() + self._retry_backoff)
+        if delivered:
+            await self._store_manager.delete_many_in_local_store(delivered)
+
+    def __len__(self) -> int:
+        return len(self._heap) + len(self._pending)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" SendTracker class
+
+Bounds records / bytes sent & not yet acknowledged by a KafkaProducer (send_tracked), collects send errors.
+"""
+
+import asyncio
+from asyncio import Future
+from collections import deque
+from logging import (getLogger, Logger)
+from typing import Callable, Deque, Dict, List, Optional
+
+__all__ = [
+    'SendTracker',
+]
+
+
+class SendTracker:
+    """ SendTracker class
+
+    Senders acquire the size of their record before sending it & wait while *max_records* records or *max_bytes*
+    bytes are in flight. A record bigger than *max_bytes* is accepted once nothing else is in flight. Capacity is
+    released when record future is done, then record callback is called. Send errors are kept (up to *max_errors*)
+    until popped.
+
+    Attributes:
+        _max_records (int): Max number of in flight records
+        _max_bytes (int): Max size in bytes of in flight records
+        _in_flight_records (int): Number of in flight records
+        _in_flight_bytes (int): Size in bytes of in flight records
+        _sent (int): Number of acknowledged records
+        _failed (int): Number of failed records
+        _errors (Deque[BaseException]): Send errors not popped yet
+        _condition (asyncio.Condition): Notified each time capacity is released
+    """
+    _logger: Logger
+    _loop: asyncio.AbstractEventLoop
+    _max_records: int
+    _max_bytes: int
+    _in_flight_records: int
+    _in_flight_bytes: int
+    _sent: int
+    _failed: int
+    _errors: Deque[BaseException]
+    _condition: asyncio.Condition
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_records: int = 10000, max_bytes: int = 32 * 1024 * 1024,
+                 max_errors: int = 1000) -> None:
+        """ SendTracker constructor
+
+        Args:
+            loop (asyncio.AbstractEventLoop): Asyncio loop
+            max_records (int): Max number of in flight records
+            max_bytes (int): Max size in bytes of in flight records
+            max_errors (int): Max number of kept errors (oldest errors are dropped)
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._loop = loop
+        self._max_records = max_records
+        self._max_bytes = max_bytes
+        self._in_flight_records = 0
+        self._in_flight_bytes = 0
+        self._sent = 0
+        self._failed = 0
+        self._errors = deque(maxlen=max_errors)
+        self._condition = asyncio.Condition(loop=loop)
+
+    def has_capacity(self, size: int) -> bool:
+        """ Return True if a record of *size* bytes can be sent now
+
+        Args:
+            size (int): Record size in bytes
+
+        Returns:
+            bool: True if record fits in capacity, or nothing is in flight
+        """
+        if self._in_flight_records == 0:
+            return True
+        return self._in_flight_records < self._max_records and self._in_flight_bytes + size <= self._max_bytes
+
+    async def acquire(self, size: int) -> None:
+        """ Wait until a record of *size* bytes fits in capacity, then reserve it
+
+        Args:
+            size (int): Record size in bytes
+
+        Returns:
+            None
+        """
+        if not self.has_capacity(size):
+            async with self._condition:
+                await self._condition.wait_for(lambda: self.has_capacity(size))
+        self._in_flight_records += 1
+        self._in_flight_bytes += size
+
+    def track(self, future: Future, size: int, callback: Optional[Callable[[Future], None]] = None) -> None:
+        """ Release reserved capacity & call *callback* once record future is done
+
+        Args:
+            future (Future): Record future (resolved to record positioning or to send error)
+            size (int): Record size in bytes, as acquired
+            callback (Optional[Callable[[Future], None]]): Called with record future once done
+
+        Returns:
+            None
+        """
+        future.add_done_callback(lambda done: self.__on_done(done, size, callback))
+
+    def __on_done(self, future: Future, size: int, callback: Optional[Callable[[Future], None]]) -> None:
+        """ Record future done callback
+
+        Args:
+            future (Future): Done record future
+            size (int): Record size in bytes
+            callback (Optional[Callable[[Future], None]]): Record callback
+
+        Returns:
+            None
+        """
+        self._in_flight_records -= 1
+        self._in_flight_bytes -= size
+        error = asyncio.CancelledError() if future.cancelled() else future.exception()
+        if error is not None:
+            self._failed += 1
+            self._logger.error('Fail to send tracked record: %s', error.__str__())
+            self._errors.append(error)
+        else:
+            self._sent += 1
+        if callback is not None:
+            try:
+                callback(future)
+            except Exception as err:
+                self._logger.exception('Tracked record callback failed: %s', err.__str__())
+        asyncio.ensure_future(self.__notify(), loop=self._loop)
+
+    async def __notify(self) -> None:
+        """ Wake senders waiting for capacity & flush
+
+        Returns:
+            None
+        """
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def wait_all(self) -> None:
+        """ Wait until no record is in flight
+
+        Returns:
+            None
+        """
+        if self._in_flight_records == 0:
+            return
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight_records == 0)
+
+    def pop_errors(self) -> List[BaseException]:
+        """ Return & clear send errors collected since last call
+
+        Returns:
+            List[BaseException]: Send errors, oldest first
+        """
+        errors = list(self._errors)
+        self._errors.clear()
+        return errors
+
+    def get_stats(self) -> Dict[str, int]:
+        """ Return in flight & completed record counters
+
+        Returns:
+            Dict[str, int]: in_flight_records, in_flight_bytes, sent & failed
+        """
+        return {
+            'in_flight_records': self._in_flight_records,
+            'in_flight_bytes': self._in_flight_bytes,
+            'sent': self._sent,
+            'failed': self._failed,
+        }
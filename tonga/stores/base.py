@@ -11,25 +11,42 @@ an BaseStoreMetaData but this one was never send in Kafka. Used by store or deve
 """
 
 from logging import Logger
+from typing import Callable, Dict, List, Set, Tuple, Optional
 
 from abc import ABCMeta, abstractmethod
 
-from tonga.stores.persistency.base import BasePersistency
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import BadEntryType, UnknownStoreIndex
+from tonga.stores.persistency.base import BasePersistency, prefix_upper_bound
 
 __all__ = [
     'BaseStores',
+    'RESERVED_KEY_PREFIX',
 ]
 
+RESERVED_KEY_PREFIX = '\x00'
+_INDEX_KEY_PREFIX = RESERVED_KEY_PREFIX + 'index:'
+_INDEX_SEPARATOR = '\x00'
+
 
 class BaseStores(metaclass=ABCMeta):
     """ Base of local & global stores
 
+    Keys starting with RESERVED_KEY_PREFIX are reserved for store internal entries (ex: secondary indexes, entry
+    expirations), they are never returned by scan / range.
+
+    Secondary indexes map an index key (extracted from entry value) to primary keys. Each index entry is stored in
+    store persistency as a reserved key (index name, index key & primary key), written in the same batch as its
+    entry, so indexes are maintained on writes & on store build (changelog replay).
+
     Attributes:
         _persistency (BasePersistency): Store persistency
         _logger (Logger): Store logger
+        _indexes (Dict[str, Callable[[str, bytes], List[str]]]): Index key extractor by index name
     """
     _persistency: BasePersistency
     _logger: Logger
+    _indexes: Dict[str, Callable[[str, bytes], List[str]]]
 
     @abstractmethod
     def get(self, key: str) -> bytes:
@@ -53,6 +70,165 @@ class BaseStores(metaclass=ABCMeta):
         """
         return self._persistency
 
+    def add_index(self, name: str, extractor: Callable[[str, bytes], List[str]]) -> None:
+        """ Declare a secondary index, must be declared before store is built
+
+        Args:
+            name (str): Index name
+            extractor (Callable[[str, bytes], List[str]]): Returns index keys of an entry (key, value), index keys
+                                                           can't contain null character
+
+        Returns:
+            None
+        """
+        if not isinstance(name, str) or _INDEX_SEPARATOR in name:
+            raise BadEntryType
+        self._indexes[name] = extractor
+
+    async def get_index_keys(self, name: str, index_key: str) -> List[str]:
+        """ Return primary keys of entries indexed by index key, ordered by key
+
+        Args:
+            name (str): Index name
+            index_key (str): Index key
+
+        Raises:
+            UnknownStoreIndex: Index was not declared
+
+        Returns:
+            List[str]: Primary keys
+        """
+        if name not in self._indexes:
+            raise UnknownStoreIndex
+        if not isinstance(index_key, str) or _INDEX_SEPARATOR in index_key:
+            raise BadEntryType
+        prefix = self.__index_entry_prefix(name, index_key)
+        return [key[len(prefix):] for key, _ in await self._range_entries(prefix, prefix_upper_bound(prefix))]
+
+    async def get_by_index(self, name: str, index_key: str) -> Dict[str, bytes]:
+        """ Return entries indexed by index key
+
+        Args:
+            name (str): Index name
+            index_key (str): Index key
+
+        Raises:
+            UnknownStoreIndex: Index was not declared
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by primary key
+        """
+        return await self.get_many(await self.get_index_keys(name, index_key))
+
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, missing keys are not in returned dict
+
+        Abstract method
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        raise NotImplementedError
+
+    async def _range_entries(self, start: Optional[str], end: Optional[str], reverse: bool = False,
+                             limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key is in [start, end), reserved keys included
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self._persistency.range(start, end, reverse, limit)
+
+    @staticmethod
+    def _skip_reserved_keys(start: Optional[str]) -> str:
+        """ Return range first key after reserved keys
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+
+        Returns:
+            str: First key (inclusive)
+        """
+        reserved_end = prefix_upper_bound(RESERVED_KEY_PREFIX)
+        if start is None or start < reserved_end:
+            return reserved_end
+        return start
+
+    @staticmethod
+    def __index_entry_prefix(name: str, index_key: str) -> str:
+        """ Return reserved key prefix of index entries of an index key
+
+        Args:
+            name (str): Index name
+            index_key (str): Index key
+
+        Returns:
+            str: Index entries prefix (followed by primary keys)
+        """
+        return f'{_INDEX_KEY_PREFIX}{name}{_INDEX_SEPARATOR}{index_key}{_INDEX_SEPARATOR}'
+
+    def __extract_index_keys(self, name: str, key: str, value: Optional[bytes]) -> Set[str]:
+        """ Return index keys of an entry
+
+        Args:
+            name (str): Index name
+            key (str): Entry key
+            value (Optional[bytes]): Entry value, None if entry doesn't exist
+
+        Returns:
+            Set[str]: Index keys
+        """
+        if value is None:
+            return set()
+        index_keys = set(self._indexes[name](key, value))
+        for index_key in index_keys:
+            if not isinstance(index_key, str) or _INDEX_SEPARATOR in index_key:
+                raise BadEntryType
+        return index_keys
+
+    def _index_operations(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                          values: Dict[str, bytes]) -> List[Tuple[str, bytes, StoreRecordType]]:
+        """ Return operations with their index entries operations
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            values (Dict[str, bytes]): Current values of operations keys (missing if entry doesn't exist), updated
+                                       with operations
+
+        Returns:
+            List[Tuple[str, bytes, StoreRecordType]]: Operations & index entries operations
+        """
+        indexed_operations: List[Tuple[str, bytes, StoreRecordType]] = list()
+        for key, value, operation_type in operations:
+            indexed_operations.append((key, value, operation_type))
+            if key.startswith(RESERVED_KEY_PREFIX):
+                continue
+            new_value = value if operation_type == StoreRecordType.SET else None
+            for name in self._indexes:
+                old_index_keys = self.__extract_index_keys(name, key, values.get(key))
+                new_index_keys = self.__extract_index_keys(name, key, new_value)
+                for index_key in sorted(old_index_keys - new_index_keys):
+                    indexed_operations.append((self.__index_entry_prefix(name, index_key) + key, b'',
+                                               StoreRecordType.DEL))
+                for index_key in sorted(new_index_keys - old_index_keys):
+                    indexed_operations.append((self.__index_entry_prefix(name, index_key) + key, b'',
+                                               StoreRecordType.SET))
+            if new_value is None:
+                values.pop(key, None)
+            else:
+                values[key] = new_value
+        return indexed_operations
+
     @abstractmethod
     async def _build_set(self, key: str, value: bytes) -> None:
         """ Set value & key in global store
@@ -76,4 +252,24 @@ class BaseStores(metaclass=ABCMeta):
         Returns:
             None
         """
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    async def _build_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of build operations & metadata (ex: changelog positioning) in one persistency commit
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if not isinstance(key, str) or (operation_type == StoreRecordType.SET and not isinstance(value, bytes)):
+                raise BadEntryType
+        if self._indexes:
+            keys = list({key for key, _, _ in operations if not key.startswith(RESERVED_KEY_PREFIX)})
+            values = await self._persistency.build_get_many(keys)
+            operations = self._index_operations(operations, values)
+        await self._persistency.build_batch(operations, metadata)
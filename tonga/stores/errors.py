@@ -9,7 +9,8 @@ __all__ = [
     'StoreKeyNotFound',
     'StorePartitionAlreadyAssigned',
     'StorePartitionNotAssigned',
-    'BadEntryType'
+    'BadEntryType',
+    'UnknownStoreIndex',
 ]
 
 
@@ -39,3 +40,10 @@ class StorePartitionNotAssigned(Exception):
 
     This error was raised when store have not assigned partition
     """
+
+
+class UnknownStoreIndex(KeyError):
+    """UnknownStoreIndex
+
+    This error was raised when a secondary index was not declared in store
+    """
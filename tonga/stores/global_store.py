@@ -6,14 +6,21 @@
 """
 
 from logging import getLogger
+from typing import Callable, Dict, List, Tuple, Optional
 
 from tonga.models.structs.persistency_type import PersistencyType
 from tonga.stores.base import BaseStores
 from tonga.stores.errors import BadEntryType
 from tonga.stores.manager.errors import UninitializedStore
+from tonga.stores.persistency.base import prefix_upper_bound
+from tonga.stores.persistency.bloom import BloomFilterPersistency
+from tonga.stores.persistency.cache import CachedPersistency
 from tonga.stores.persistency.memory import MemoryPersistency
+from tonga.stores.persistency.compact_memory import CompactMemoryPersistency
 from tonga.stores.persistency.shelve import ShelvePersistency
 from tonga.stores.persistency.rocksdb import RocksDBPersistency
+from tonga.stores.persistency.sqlite import SQLitePersistency
+from tonga.stores.persistency.append_log import AppendLogPersistency
 from tonga.models.structs.store_record_type import StoreRecordType
 
 __all__ = [
@@ -23,13 +30,40 @@ __all__ = [
 
 class GlobalStore(BaseStores):
     """ Global store
+
+    When *cache_size* (in bytes) is greater than 0, persistency is wrapped in a LRU read cache, see CachedPersistency.
+    When *bloom_filter_entries* is greater than 0, reads of missing keys are answered by a Bloom filter sized for
+    this number of keys, see BloomFilterPersistency.
+
+    Global store can replicate only a slice of other partitions entries: entries whose key doesn't start with
+    *key_prefix* are ignored, entries rejected by *entry_filter* are deleted (a filter on value can reject an entry
+    accepted before) & kept values are transformed by *projection*. Filter & projection are applied when store
+    records are built, changing them requires a rebuild of persisted global store.
+
+    Attributes:
+        _key_prefix (Optional[str]): Replicated keys prefix, None replicates all keys
+        _entry_filter (Optional[Callable[[str, bytes], bool]]): Returns true if entry (key, value) is replicated
+        _projection (Optional[Callable[[str, bytes], bytes]]): Returns stored value of a replicated entry
     """
+    _key_prefix: Optional[str]
+    _entry_filter: Optional[Callable[[str, bytes], bool]]
+    _projection: Optional[Callable[[str, bytes], bytes]]
 
-    def __init__(self, db_type: PersistencyType, db_path: str = None):
+    def __init__(self, db_type: PersistencyType, db_path: str = None, cache_size: int = 0,
+                 bloom_filter_entries: int = 0, key_prefix: Optional[str] = None,
+                 entry_filter: Optional[Callable[[str, bytes], bool]] = None,
+                 projection: Optional[Callable[[str, bytes], bytes]] = None):
         self._logger = getLogger('tonga')
 
+        self._indexes = dict()
+        self._key_prefix = key_prefix
+        self._entry_filter = entry_filter
+        self._projection = projection
+
         if db_type == PersistencyType.MEMORY:
             self._persistency = MemoryPersistency()
+        elif db_type == PersistencyType.COMPACT_MEMORY:
+            self._persistency = CompactMemoryPersistency()
         elif db_type == PersistencyType.SHELVE:
             if db_path is not None:
                 self._persistency = ShelvePersistency(db_path)
@@ -42,10 +76,28 @@ class GlobalStore(BaseStores):
             else:
                 # Todo change raised error
                 raise KeyError
+        elif db_type == PersistencyType.SQLITE:
+            if db_path is not None:
+                self._persistency = SQLitePersistency(db_path)
+            else:
+                # Todo change raised error
+                raise KeyError
+        elif db_type == PersistencyType.APPEND_LOG:
+            if db_path is not None:
+                self._persistency = AppendLogPersistency(db_path)
+            else:
+                # Todo change raised error
+                raise KeyError
         else:
             # Todo change raised error
             raise NotImplementedError
 
+        if cache_size > 0:
+            self._persistency = CachedPersistency(self._persistency, cache_size)
+
+        if bloom_filter_entries > 0:
+            self._persistency = BloomFilterPersistency(self._persistency, bloom_filter_entries)
+
     async def get(self, key: str) -> bytes:
         """ Get value by key in global store
 
@@ -63,6 +115,126 @@ class GlobalStore(BaseStores):
                 raise BadEntryType
         raise UninitializedStore
 
+    async def get_or_none(self, key: str) -> Optional[bytes]:
+        """ Get value by key in global store, without raising StoreKeyNotFound on missing key
+
+        Args:
+            key (str): Value key as string
+
+        Returns:
+            Optional[bytes]: Value as bytes, None if key is missing
+        """
+        if self._persistency.is_initialize():
+            if isinstance(key, str):
+                return await self._persistency.get_or_none(key)
+            else:
+                raise BadEntryType
+        raise UninitializedStore
+
+    async def exists(self, key: str) -> bool:
+        """ Return true if key exists in global store, false otherwise
+
+        Args:
+            key (str): Value key as string
+
+        Returns:
+            bool
+        """
+        return await self.get_or_none(key) is not None
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in global store, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Values key as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._persistency.is_initialize():
+            if all(isinstance(key, str) for key in keys):
+                return await self._persistency.get_many(keys)
+            else:
+                raise BadEntryType
+        raise UninitializedStore
+
+    async def scan(self, prefix: str = '', reverse: bool = False,
+                   limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key starts with prefix in global store, ordered by key
+
+        Args:
+            prefix (str): Keys prefix, empty prefix returns all entries
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        if self._persistency.is_initialize():
+            if isinstance(prefix, str):
+                return await self.range(prefix or None, prefix_upper_bound(prefix), reverse, limit)
+            else:
+                raise BadEntryType
+        raise UninitializedStore
+
+    async def range(self, start: Optional[str] = None, end: Optional[str] = None, reverse: bool = False,
+                    limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key is in [start, end) in global store, ordered by key, reserved keys are skipped
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        if self._persistency.is_initialize():
+            if all(bound is None or isinstance(bound, str) for bound in (start, end)):
+                start = self._skip_reserved_keys(start)
+                if end is not None and end <= start:
+                    return []
+                return await self._range_entries(start, end, reverse, limit)
+            else:
+                raise BadEntryType
+        raise UninitializedStore
+
+    def is_filtered(self) -> bool:
+        """ Return true if global store replicates only a slice of entries (key prefix, filter or projection)
+
+        Returns:
+            bool
+        """
+        return self._key_prefix is not None or self._entry_filter is not None or self._projection is not None
+
+    def _filter_operations(self, operations: List[Tuple[str, bytes, StoreRecordType]]) \
+            -> List[Tuple[str, bytes, StoreRecordType]]:
+        """ Apply key prefix, entry filter & projection on build operations
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+
+        Returns:
+            List[Tuple[str, bytes, StoreRecordType]]: Operations to write in persistency
+        """
+        if not self.is_filtered():
+            return operations
+        filtered_operations: List[Tuple[str, bytes, StoreRecordType]] = list()
+        for key, value, operation_type in operations:
+            if not isinstance(key, str) or (operation_type == StoreRecordType.SET and not isinstance(value, bytes)):
+                raise BadEntryType
+            if self._key_prefix is not None and not key.startswith(self._key_prefix):
+                continue
+            if operation_type == StoreRecordType.SET:
+                if self._entry_filter is not None and not self._entry_filter(key, value):
+                    filtered_operations.append((key, b'', StoreRecordType.DEL))
+                    continue
+                if self._projection is not None:
+                    value = self._projection(key, value)
+            filtered_operations.append((key, value, operation_type))
+        return filtered_operations
+
     async def _build_set(self, key: str, value: bytes) -> None:
         """ Set value & key in global store
 
@@ -74,6 +246,9 @@ class GlobalStore(BaseStores):
             None
         """
         if isinstance(key, str) and isinstance(value, bytes):
+            if self.is_filtered() or self._indexes:
+                await self._build_batch([(key, value, StoreRecordType.SET)])
+                return
             await self._persistency.__getattribute__('_build_operations').__call__(key, value, StoreRecordType.SET)
         else:
             raise BadEntryType
@@ -88,6 +263,25 @@ class GlobalStore(BaseStores):
             None
         """
         if isinstance(key, str):
+            if self.is_filtered() or self._indexes:
+                await self._build_batch([(key, b'', StoreRecordType.DEL)])
+                return
             await self._persistency.__getattribute__('_build_operations').__call__(key, '', StoreRecordType.DEL)
         else:
             raise BadEntryType
+
+    async def _build_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of build operations & metadata in one persistency commit, after key prefix, entry filter
+        & projection
+
+        Metadata (changelog positioning) is committed even if all operations are filtered out
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        await super()._build_batch(self._filter_operations(operations), metadata)
@@ -6,20 +6,25 @@
 
 """
 
-import asyncio
-import functools
-from asyncio import AbstractEventLoop, Task
+from asyncio import AbstractEventLoop
 from logging import getLogger
-from typing import Dict, Any
+from typing import Any, Optional, Callable, Awaitable, Dict, List, Tuple
 
 from tonga.models.structs.persistency_type import PersistencyType
-from tonga.services.coordinator.async_coordinator.async_coordinator import AsyncCoordinator
-from tonga.stores.base import BaseStores
+from tonga.services.coordinator.async_coordinator.keyed_lock import KeyedLock
+from tonga.stores.base import BaseStores, RESERVED_KEY_PREFIX
 from tonga.stores.errors import StoreKeyNotFound, BadEntryType
 from tonga.stores.manager.errors import UninitializedStore
+from tonga.stores.persistency.base import prefix_upper_bound
+from tonga.stores.persistency.bloom import BloomFilterPersistency
+from tonga.stores.persistency.cache import CachedPersistency
 from tonga.stores.persistency.memory import MemoryPersistency
+from tonga.stores.persistency.compact_memory import CompactMemoryPersistency
 from tonga.stores.persistency.shelve import ShelvePersistency
 from tonga.stores.persistency.rocksdb import RocksDBPersistency
+from tonga.stores.persistency.sqlite import SQLitePersistency
+from tonga.stores.persistency.append_log import AppendLogPersistency
+from tonga.stores.write_behind import WriteBehindBuffer
 from tonga.models.structs.store_record_type import StoreRecordType
 
 __all__ = [
@@ -29,20 +34,32 @@ __all__ = [
 
 class LocalStore(BaseStores):
     """ Local stores
+
+    When *write_behind* is true, writes are buffered in memory (reads are served from buffer first) and
+    flushed in persistency by batch, see WriteBehindBuffer. Otherwise each write locks its entry (KeyedLock)
+    while persistency writes data, reads wait until entry was unlocked.
+
+    When *cache_size* (in bytes) is greater than 0, persistency is wrapped in a LRU read cache, see CachedPersistency.
+    When *bloom_filter_entries* is greater than 0, reads of missing keys are answered by a Bloom filter sized for
+    this number of keys, see BloomFilterPersistency.
     """
-    _lock: Dict[str, Any]
-    _lock_coordinator: AsyncCoordinator
+    _key_lock: KeyedLock
     _loop: AbstractEventLoop
+    _write_behind: Optional[WriteBehindBuffer]
 
-    def __init__(self, db_type: PersistencyType, loop: AbstractEventLoop, db_path: str = None):
+    def __init__(self, db_type: PersistencyType, loop: AbstractEventLoop, db_path: str = None,
+                 write_behind: bool = False, write_behind_max_entries: int = 1000,
+                 write_behind_max_age: float = 1.0, cache_size: int = 0, bloom_filter_entries: int = 0):
         self._logger = getLogger('tonga')
-        self._lock = dict()
         self._loop = loop
 
-        self._lock_coordinator = AsyncCoordinator(maxsize=0, loop=self._loop)
+        self._key_lock = KeyedLock(loop=self._loop)
+        self._indexes = dict()
 
         if db_type == PersistencyType.MEMORY:
             self._persistency = MemoryPersistency()
+        elif db_type == PersistencyType.COMPACT_MEMORY:
+            self._persistency = CompactMemoryPersistency()
         elif db_type == PersistencyType.SHELVE:
             if db_path is not None:
                 self._persistency = ShelvePersistency(db_path)
@@ -55,10 +72,75 @@ class LocalStore(BaseStores):
             else:
                 # Todo change raised error
                 raise KeyError
+        elif db_type == PersistencyType.SQLITE:
+            if db_path is not None:
+                self._persistency = SQLitePersistency(db_path)
+            else:
+                # Todo change raised error
+                raise KeyError
+        elif db_type == PersistencyType.APPEND_LOG:
+            if db_path is not None:
+                self._persistency = AppendLogPersistency(db_path)
+            else:
+                # Todo change raised error
+                raise KeyError
         else:
             # Todo change raised error
             raise NotImplementedError
 
+        if cache_size > 0:
+            self._persistency = CachedPersistency(self._persistency, cache_size)
+
+        if bloom_filter_entries > 0:
+            self._persistency = BloomFilterPersistency(self._persistency, bloom_filter_entries)
+
+        if write_behind:
+            self._write_behind = WriteBehindBuffer(self._persistency, self._loop, write_behind_max_entries,
+                                                   write_behind_max_age)
+        else:
+            self._write_behind = None
+
+    def is_write_behind(self) -> bool:
+        """ Return true if writes are buffered, false otherwise
+
+        Returns:
+            bool
+        """
+        return self._write_behind is not None
+
+    async def flush(self) -> None:
+        """ Write all buffered entries in persistency (no-op without write behind)
+
+        Returns:
+            None
+        """
+        if self._write_behind is not None:
+            await self._write_behind.flush()
+
+    def set_flush_marker(self, marker: Any) -> None:
+        """ Set marker handed to flush callback once all entries written before it are flushed
+
+        Args:
+            marker (Any): Flush marker (ex: changelog positioning)
+
+        Returns:
+            None
+        """
+        if self._write_behind is not None:
+            self._write_behind.set_flush_marker(marker)
+
+    def set_flush_callback(self, callback: Callable[[Any], Awaitable[None]]) -> None:
+        """ Set coroutine called after each flush with the last flush marker
+
+        Args:
+            callback (Callable[[Any], Awaitable[None]]): Flush callback
+
+        Returns:
+            None
+        """
+        if self._write_behind is not None:
+            self._write_behind.set_flush_callback(callback)
+
     async def get(self, key: str) -> bytes:
         """ Get value by key in local store
 
@@ -70,11 +152,15 @@ class LocalStore(BaseStores):
         """
         if self._persistency.is_initialize():
             if isinstance(key, str):
-                await self.__ready(key)
-                try:
+                if self._write_behind is not None:
+                    buffered, value = self._write_behind.lookup(key)
+                    if buffered:
+                        if value is None:
+                            raise StoreKeyNotFound
+                        return value
                     return await self._persistency.get(key)
-                except StoreKeyNotFound:
-                    raise StoreKeyNotFound
+                await self._key_lock.wait(key)
+                return await self._persistency.get(key)
             else:
                 raise BadEntryType
         raise UninitializedStore
@@ -91,12 +177,17 @@ class LocalStore(BaseStores):
         """
         if self._persistency.is_initialize():
             if isinstance(key, str) and isinstance(value, bytes):
-                if key in self._lock:
-                    if self._lock[key]:
-                        await self.__ready(key)
-                await self.__lock_entry(key)
-                future = asyncio.ensure_future(self.__set_in_store(key, value), loop=self._loop)
-                future.add_done_callback(functools.partial(self.__unlock_entry, key, False))
+                if self._indexes:
+                    await self.write_batch([(key, value, StoreRecordType.SET)])
+                    return
+                if self._write_behind is not None:
+                    await self._write_behind.set(key, value)
+                    return
+                await self._key_lock.acquire(key)
+                try:
+                    await self._persistency.set(key, value)
+                finally:
+                    self._key_lock.release(key)
             else:
                 raise BadEntryType
         else:
@@ -113,88 +204,245 @@ class LocalStore(BaseStores):
         """
         if self._persistency.is_initialize():
             if isinstance(key, str):
+                if self._indexes:
+                    # Raises StoreKeyNotFound if entry doesn't exist
+                    await self.get(key)
+                    await self.write_batch([(key, b'', StoreRecordType.DEL)])
+                    return
+                if self._write_behind is not None:
+                    # Raises StoreKeyNotFound if entry doesn't exist
+                    await self.get(key)
+                    await self._write_behind.set(key, None)
+                    return
+                await self._key_lock.acquire(key)
                 try:
-                    if self._lock[key]:
-                        await self.__ready(key)
-                    await self.__lock_entry(key)
-                    future = asyncio.ensure_future(self.__delete_in_store(key), loop=self._loop)
-                    future.add_done_callback(functools.partial(self.__unlock_entry, key, True))
-                except (KeyError, ValueError, TypeError) as err:
-                    self._logger.exception('Fail to find %s | err -> %s', key, err)
-                    raise StoreKeyNotFound
+                    # Raises StoreKeyNotFound if entry doesn't exist
+                    await self._persistency.delete(key)
+                finally:
+                    self._key_lock.release(key)
             else:
                 raise BadEntryType
         else:
             raise UninitializedStore
 
-    async def __set_in_store(self, key: str, value: bytes) -> None:
-        """ Async private function for set key & value in persistency storage
+    async def get_or_none(self, key: str) -> Optional[bytes]:
+        """ Get value by key in local store, without raising StoreKeyNotFound on missing key
 
         Args:
             key (str): Key entry as string
-            value (bytes): Value as bytes
 
         Returns:
-            None
+            Optional[bytes]: Value as bytes, None if key is missing
         """
-        await self._persistency.set(key, value)
+        if self._persistency.is_initialize():
+            if isinstance(key, str):
+                if self._write_behind is not None:
+                    buffered, value = self._write_behind.lookup(key)
+                    if buffered:
+                        return value
+                    return await self._persistency.get_or_none(key)
+                await self._key_lock.wait(key)
+                return await self._persistency.get_or_none(key)
+            else:
+                raise BadEntryType
+        raise UninitializedStore
 
-    async def __delete_in_store(self, key: str) -> None:
-        """ Async private function for del key & value in persistency storage
+    async def exists(self, key: str) -> bool:
+        """ Return true if key exists in local store, false otherwise
 
         Args:
             key (str): Key entry as string
 
+        Returns:
+            bool
+        """
+        return await self.get_or_none(key) is not None
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in local store, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._persistency.is_initialize():
+            if not all(isinstance(key, str) for key in keys):
+                raise BadEntryType
+            values: Dict[str, bytes] = dict()
+            missing: List[str] = list()
+            for key in keys:
+                if self._write_behind is not None:
+                    buffered, value = self._write_behind.lookup(key)
+                    if buffered:
+                        if value is not None:
+                            values[key] = value
+                        continue
+                else:
+                    await self._key_lock.wait(key)
+                missing.append(key)
+            if missing:
+                values.update(await self._persistency.get_many(missing))
+            return values
+        raise UninitializedStore
+
+    async def set_many(self, entries: Dict[str, bytes]) -> None:
+        """ Set many values & keys in local store, in one write batch
+
+        Args:
+            entries (Dict[str, bytes]): Values as bytes by key
+
         Returns:
             None
         """
-        await self._persistency.delete(key)
+        await self.write_batch([(key, value, StoreRecordType.SET) for key, value in entries.items()])
 
-    async def __ready(self, key: str) -> None:
-        """ Check if entry is ready to get
+    async def delete_many(self, keys: List[str]) -> None:
+        """ Delete many values by key in local store, in one write batch (missing keys are ignored)
 
         Args:
-            key (str): Key entry as string
+            keys (List[str]): Keys entry as string
 
         Returns:
             None
         """
-        try:
-            if self._lock[key]:
-                self._lock[key] = await self._lock_coordinator.get(key)
-        except KeyError:
-            raise StoreKeyNotFound
+        await self.write_batch([(key, b'', StoreRecordType.DEL) for key in keys])
 
-    async def __lock_entry(self, key: str) -> None:
-        """ Lock entry by key
+    async def write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                          metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations in local store, in order
 
-        Entry is locked while persistency writes data
+        Delete operations on missing keys are ignored. All batch keys are locked (in sorted order) while current
+        values are read for secondary indexes & batch is written (in persistency, or in write behind buffer, then
+        metadata is written with the flush of these operations). Secondary index entries are written in the same
+        batch
 
         Args:
-            key (str): Key entry for lock
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name (ex: changelog positioning), committed
+                                                   with operations
 
         Returns:
             None
         """
-        self._lock_coordinator.put_nowait(key, True)
-        self._lock[key] = True
+        if self._persistency.is_initialize():
+            for key, value, operation_type in operations:
+                if not isinstance(key, str) or (operation_type == StoreRecordType.SET and
+                                                not isinstance(value, bytes)):
+                    raise BadEntryType
+            keys = sorted({key for key, _, _ in operations})
+            acquired: List[str] = list()
+            try:
+                for key in keys:
+                    await self._key_lock.acquire(key)
+                    acquired.append(key)
+                if self._indexes:
+                    operations = self._index_operations(operations, await self.__get_current_values(operations))
+                if self._write_behind is not None:
+                    for key, value, operation_type in operations:
+                        await self._write_behind.set(key, value if operation_type == StoreRecordType.SET else None)
+                    if metadata:
+                        self._write_behind.set_metadata(metadata)
+                else:
+                    await self._persistency.write_batch(operations, metadata)
+            finally:
+                for key in acquired:
+                    self._key_lock.release(key)
+        else:
+            raise UninitializedStore
+
+    async def __get_current_values(self, operations: List[Tuple[str, bytes, StoreRecordType]]) -> Dict[str, bytes]:
+        """ Return current values of operations keys (buffered first), operations keys must be locked by caller
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key, missing entries are not in returned dict
+        """
+        values: Dict[str, bytes] = dict()
+        missing: List[str] = list()
+        for key in {key for key, _, _ in operations if not key.startswith(RESERVED_KEY_PREFIX)}:
+            if self._write_behind is not None:
+                buffered, value = self._write_behind.lookup(key)
+                if buffered:
+                    if value is not None:
+                        values[key] = value
+                    continue
+            missing.append(key)
+        if missing:
+            values.update(await self._persistency.get_many(missing))
+        return values
+
+    async def scan(self, prefix: str = '', reverse: bool = False,
+                   limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key starts with prefix in local store, ordered by key
 
-    def __unlock_entry(self, key: str, is_deleted: bool, task: Task) -> None:
-        """ Unlock entry by key
+        Args:
+            prefix (str): Keys prefix, empty prefix returns all entries
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
 
-        Entry is unlocked after persistency writes data
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        if isinstance(prefix, str):
+            return await self.range(prefix or None, prefix_upper_bound(prefix), reverse, limit)
+        raise BadEntryType
+
+    async def range(self, start: Optional[str] = None, end: Optional[str] = None, reverse: bool = False,
+                    limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key is in [start, end) in local store, ordered by key, reserved keys are skipped
 
         Args:
-            key (str): Key entry for lock
-            task: (Task): Asyncio task
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
 
         Returns:
-            None
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        if self._persistency.is_initialize():
+            if not all(bound is None or isinstance(bound, str) for bound in (start, end)):
+                raise BadEntryType
+            start = self._skip_reserved_keys(start)
+            if end is not None and end <= start:
+                return []
+            return await self._range_entries(start, end, reverse, limit)
+        raise UninitializedStore
+
+    async def _range_entries(self, start: Optional[str], end: Optional[str], reverse: bool = False,
+                             limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key is in [start, end), reserved keys included
+
+        With write behind, buffered entries (taken before persistency read) are merged over persistency
+        snapshot
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
         """
-        self._lock_coordinator.put_nowait(key, False)
-        self._lock[key] = False
-        if is_deleted:
-            del self._lock[key]
+        if self._persistency.is_initialize():
+            if self._write_behind is None:
+                return await self._persistency.range(start, end, reverse, limit)
+
+            buffered = self._write_behind.lookup_range(start, end)
+            # Each buffered entry can hide at most one persisted entry
+            persisted_limit = None if limit is None else limit + len(buffered)
+            entries = dict(await self._persistency.range(start, end, reverse, persisted_limit))
+            entries.update(buffered)
+            keys = sorted((key for key, value in entries.items() if value is not None), reverse=reverse)
+            if limit is not None:
+                keys = keys[:limit]
+            return [(key, entries[key]) for key in keys]
+        raise UninitializedStore
 
     async def _build_set(self, key: str, value: bytes) -> None:
         """ Set value & key in global store
@@ -207,8 +455,10 @@ class LocalStore(BaseStores):
             None
         """
         if isinstance(key, str) and isinstance(value, bytes):
+            if self._indexes:
+                await self._build_batch([(key, value, StoreRecordType.SET)])
+                return
             await self._persistency.__getattribute__('_build_operations').__call__(key, value, StoreRecordType.SET)
-            self._lock[key] = False
         else:
             raise BadEntryType
 
@@ -222,7 +472,9 @@ class LocalStore(BaseStores):
             None
         """
         if isinstance(key, str):
+            if self._indexes:
+                await self._build_batch([(key, b'', StoreRecordType.DEL)])
+                return
             await self._persistency.__getattribute__('_build_operations').__call__(key, '', StoreRecordType.DEL)
-            del self._lock[key]
         else:
             raise BadEntryType
@@ -9,13 +9,17 @@ All store manager must be inherit form this class
 from asyncio import AbstractEventLoop
 from logging import Logger
 from abc import ABCMeta, abstractmethod
+from typing import Dict, List, Optional
 
+from tonga.models.store.store_record import StoreRecord
+from tonga.models.structs.positioning import BasePositioning
 from tonga.services.consumer.base import BaseConsumer
 from tonga.services.producer.base import BaseProducer
 from tonga.services.coordinator.client.base import BaseClient
 from tonga.services.serializer.base import BaseSerializer
 from tonga.stores.local_store import LocalStore
 from tonga.stores.global_store import GlobalStore
+from tonga.stores.manager.write_batch import StoreWriteBatch
 from tonga.models.structs.persistency_type import PersistencyType
 
 __all__ = [
@@ -72,7 +76,7 @@ class BaseStoreManager(metaclass=ABCMeta):
 
     # Store function
     @abstractmethod
-    async def set_entry_in_local_store(self, key: str, value: bytes) -> None:
+    async def set_entry_in_local_store(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
         """ Set an entry in local store
 
         This method send an StoreRecord in event bus and store entry asynchronously
@@ -82,6 +86,8 @@ class BaseStoreManager(metaclass=ABCMeta):
         Args:
             key (str): Key entry as string
             value (bytes): Value as bytes
+            ttl (Optional[float]): Entry time to live in seconds, once expired entry is deleted (tombstone is sent
+                                   in event bus). None if entry never expires
 
         Returns:
             None
@@ -104,6 +110,34 @@ class BaseStoreManager(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_or_none_in_local_store(self, key: str) -> Optional[bytes]:
+        """ Get an entry by key in local store, None if key is missing (no StoreKeyNotFound)
+
+        Abstract method
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            Optional[bytes]: Value as bytes, None if key is missing
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_many_in_local_store(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many entries by key in local store, in one persistency call
+
+        Abstract method
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def delete_entry_in_local(self, key: str) -> None:
         """ Delete an entry in local store
@@ -120,6 +154,82 @@ class BaseStoreManager(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    async def set_many_in_local_store(self, entries: Dict[str, bytes]) -> None:
+        """ Set many entries in local store
+
+        This method send all StoreRecord in event bus, wait once for all acknowledgments and store entries
+
+        Abstract method
+
+        Args:
+            entries (Dict[str, bytes]): Values as bytes by key
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_many_in_local_store(self, keys: List[str]) -> None:
+        """ Delete many entries in local store
+
+        This method send all StoreRecord in event bus, wait once for all acknowledgments and delete entries
+
+        Abstract method
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def flush_local_store(self) -> None:
+        """ Flush local store buffered writes
+
+        Abstract method
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    async def stop_store_manager(self) -> None:
+        """ Stop store manager & release its store producer
+
+        Raises:
+            NotImplementedError: Store manager doesn't implement this method
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def write_batch(self) -> StoreWriteBatch:
+        """ Return a new write batch, used as async context manager
+
+        Returns:
+            StoreWriteBatch: Empty write batch bound to this store manager
+        """
+        return StoreWriteBatch(self)
+
+    @abstractmethod
+    async def _write_store_records(self, store_records: List[StoreRecord]) -> None:
+        """ Send store records in one round trip, then apply them in local store
+
+        Abstract method
+
+        Args:
+            store_records (List[StoreRecord]): Store records to send & apply
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def get_entry_in_global_store(self, key: str) -> bytes:
         """ Get an entry by key in global store
@@ -136,6 +246,34 @@ class BaseStoreManager(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    async def get_or_none_in_global_store(self, key: str) -> Optional[bytes]:
+        """ Get an entry by key in global store, None if key is missing (no StoreKeyNotFound)
+
+        Abstract method
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            Optional[bytes]: Value as bytes, None if key is missing
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_many_in_global_store(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many entries by key in global store, in one persistency call
+
+        Abstract method
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        raise NotImplementedError
+
     # Storage builder part
     @abstractmethod
     async def _build_set_entry_in_global_store(self, key: str, value: bytes) -> None:
@@ -202,3 +340,35 @@ class BaseStoreManager(metaclass=ABCMeta):
             None
         """
         raise NotImplementedError
+
+    @abstractmethod
+    async def _build_store_record_in_local_store(self, store_record: StoreRecord,
+                                                 positioning: BasePositioning) -> None:
+        """ Apply a store record in local store, committed with its changelog positioning
+
+        Abstract method
+
+        Args:
+            store_record (StoreRecord): Store record received by store consumer
+            positioning (BasePositioning): Positioning of next store record (topic / partition / offset)
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _build_store_record_in_global_store(self, store_record: StoreRecord,
+                                                  positioning: BasePositioning) -> None:
+        """ Apply a store record in global store, committed with its changelog positioning
+
+        Abstract method
+
+        Args:
+            store_record (StoreRecord): Store record received by store consumer
+            positioning (BasePositioning): Positioning of next store record (topic / partition / offset)
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
@@ -8,44 +8,157 @@ This class manage one local & global store.
 """
 
 import asyncio
+import time
 from asyncio import (AbstractEventLoop, Future)
 from logging import (Logger, getLogger)
-from typing import List, Union, Dict
+from typing import Callable, List, Union, Dict, Optional, Tuple
+
+from aiokafka.errors import KafkaError
 
 from tonga.models.store.store_record import StoreRecord
 from tonga.models.structs.positioning import (KafkaPositioning, BasePositioning)
 from tonga.models.structs.store_record_type import StoreRecordType
 from tonga.services.consumer.errors import (OffsetError, TopicPartitionError, NoPartitionAssigned)
 from tonga.services.consumer.kafka_consumer import KafkaConsumer
+from tonga.services.coordinator.async_coordinator.keyed_lock import KeyedLock
+from tonga.services.coordinator.async_coordinator.timer_wheel import TimerWheel
 from tonga.services.coordinator.client.kafka_client import KafkaClient
 from tonga.services.coordinator.partitioner.statefulset_partitioner import StatefulsetPartitioner
 from tonga.services.producer.errors import (KeyErrorSendEvent, ValueErrorSendEvent,
-                                            TypeErrorSendEvent, FailToSendEvent)
+                                            TypeErrorSendEvent, FailToSendEvent, FailToSendBatch)
 from tonga.services.producer.kafka_producer import KafkaProducer
 from tonga.services.serializer.avro import AvroSerializer
 from tonga.models.structs.persistency_type import PersistencyType
 from tonga.stores.errors import StoreKeyNotFound
+from tonga.stores.persistency.base import prefix_upper_bound
+from tonga.stores.persistency.bloom import BloomFilterPersistency
+from tonga.stores.persistency.cache import CachedPersistency
+from tonga.stores.persistency.compact_memory import CompactMemoryPersistency
 from tonga.stores.persistency.memory import MemoryPersistency
+from tonga.stores.base import BaseStores, RESERVED_KEY_PREFIX
 from tonga.stores.local_store import LocalStore
 from tonga.stores.global_store import GlobalStore
 from tonga.stores.manager.base import BaseStoreManager
 from tonga.stores.manager.errors import (UninitializedStore, CanNotInitializeStore, FailToSendStoreRecord)
+from tonga.stores.manager.write_watermark import WriteWatermark
 
 __all__ = [
     'KafkaStoreManager'
 ]
 
 
+def _positioning_metadata_name(topic: str, partition: int) -> str:
+    """ Return name of persistency metadata where next offset to consume of a store topic partition is stored
+
+    Args:
+        topic (str): Store topic
+        partition (int): Store topic partition
+
+    Returns:
+        str: Metadata name
+    """
+    return f'positioning:{topic}:{partition}'
+
+
+def _encode_offset(offset: int) -> bytes:
+    """ Encode an offset as persistency metadata value
+
+    Args:
+        offset (int): Offset
+
+    Returns:
+        bytes: Metadata value
+    """
+    return offset.to_bytes(8, 'big', signed=True)
+
+
+def _decode_offset(value: bytes) -> int:
+    """ Decode an offset from persistency metadata value
+
+    Args:
+        value (bytes): Metadata value
+
+    Returns:
+        int: Offset
+    """
+    return int.from_bytes(value, 'big', signed=True)
+
+
+_EXPIRY_KEY_PREFIX = RESERVED_KEY_PREFIX + 'expiry:'
+
+
+def _expiry_key(key: str) -> str:
+    """ Return local store reserved key where expiration time of an entry is stored
+
+    Args:
+        key (str): Entry key
+
+    Returns:
+        str: Reserved key
+    """
+    return _EXPIRY_KEY_PREFIX + key
+
+
+def _encode_expiry(expires_at: float) -> bytes:
+    """ Encode an expiration time as local store value (milliseconds)
+
+    Args:
+        expires_at (float): Expiration time in seconds
+
+    Returns:
+        bytes: Encoded expiration time
+    """
+    return int(expires_at * 1000).to_bytes(8, 'big', signed=True)
+
+
+def _decode_expiry(value: bytes) -> float:
+    """ Decode an expiration time from local store value
+
+    Args:
+        value (bytes): Encoded expiration time
+
+    Returns:
+        float: Expiration time in seconds
+    """
+    return int.from_bytes(value, 'big', signed=True) / 1000
+
+
 class KafkaStoreManager(BaseStoreManager):
     """Kafka Store Manager
 
     This class manage one local & global store. He builds stores on services start. He has own KafkaProducer
     & KafkaConsumer
+
+    Local entries set with a ttl are deleted once expired: expiration time is stored in a reserved local store
+    entry (written with entry) and tracked in a TimerWheel, each tick only handles entries expired during this
+    tick. Expired entries are deleted like any entry, a tombstone is sent in event bus so global stores &
+    topic compaction follow. After a restart, expirations are loaded back from local store (or rebuilt from
+    store records date & ttl), entries expired meanwhile are deleted on first tick.
+
+    Local store writes are sent concurrently but applied one at a time, the stored changelog position is the
+    WriteWatermark of applied writes, so it never skips a sent & not applied record. Written keys are locked from
+    send to apply, so writes of a key (expired entry deletes included) reach changelog & local store in same order.
     """
+    _client: KafkaClient
     _topic_store: str
+    _write_watermark: WriteWatermark
+    _apply_lock: asyncio.Lock
+    _write_lock: KeyedLock
+    _expiry: TimerWheel
+    _expiry_tick: float
+    _expiry_loaded: bool
+    _expiry_task: Optional[Future]
+    _stopped: bool
 
     def __init__(self, client: KafkaClient, topic_store: str, persistency_type: PersistencyType,
-                 serializer: AvroSerializer, loop: AbstractEventLoop, rebuild: bool = False) -> None:
+                 serializer: AvroSerializer, loop: AbstractEventLoop, rebuild: bool = False,
+                 write_behind: bool = False, cache_size: int = 0, bloom_filter_entries: int = 0,
+                 expiry_tick: float = 1.0,
+                 global_key_prefix: Optional[str] = None,
+                 global_entry_filter: Optional[Callable[[str, bytes], bool]] = None,
+                 global_projection: Optional[Callable[[str, bytes], bytes]] = None,
+                 local_indexes: Optional[Dict[str, Callable[[str, bytes], List[str]]]] = None,
+                 global_indexes: Optional[Dict[str, Callable[[str, bytes], List[str]]]] = None) -> None:
         """
         KafkaStoreManager constructor
 
@@ -54,7 +167,24 @@ class KafkaStoreManager(BaseStoreManager):
             topic_store (str): Name topic where store event was send
             loop (AbstractEventLoop): Asyncio loop
             rebuild (bool): If is true store is rebuild from first offset of topic / partition
+            write_behind (bool): If is true local store writes are buffered & flushed by batch, store offsets are
+                                 committed after each flush
+            cache_size (int): Local & global store read cache size in bytes, 0 disables cache
+            bloom_filter_entries (int): Local & global store Bloom filter size in number of keys, 0 disables
+                                        Bloom filter
+            expiry_tick (float): Entry expiration precision in seconds
+            global_key_prefix (Optional[str]): Global store only replicates keys starting with this prefix
+            global_entry_filter (Optional[Callable[[str, bytes], bool]]): Global store only replicates entries
+                                                                          (key, value) accepted by this filter
+            global_projection (Optional[Callable[[str, bytes], bytes]]): Returns value stored in global store
+                                                                         for a replicated entry
+            local_indexes (Optional[Dict[str, Callable[[str, bytes], List[str]]]]): Local store secondary indexes,
+                                                                                    index key extractor by name
+            global_indexes (Optional[Dict[str, Callable[[str, bytes], List[str]]]]): Global store secondary
+                                                                                     indexes, index key extractor
+                                                                                     by name
         """
+        self._logger = getLogger('tonga')
         self._topic_store = topic_store
         self._persistency_type = persistency_type
 
@@ -62,8 +192,27 @@ class KafkaStoreManager(BaseStoreManager):
         self._loop = loop
         self._rebuild = rebuild
 
-        self._local_store = LocalStore(self._persistency_type, self._loop)
-        self._global_store = GlobalStore(self._persistency_type)
+        self._local_store = LocalStore(self._persistency_type, self._loop, write_behind=write_behind,
+                                       cache_size=cache_size, bloom_filter_entries=bloom_filter_entries)
+        self._local_store.set_flush_callback(self._commit_store_positioning)
+        self._global_store = GlobalStore(self._persistency_type, cache_size=cache_size,
+                                         bloom_filter_entries=bloom_filter_entries,
+                                         key_prefix=global_key_prefix, entry_filter=global_entry_filter,
+                                         projection=global_projection)
+        for name, extractor in (local_indexes or dict()).items():
+            self._local_store.add_index(name, extractor)
+        for name, extractor in (global_indexes or dict()).items():
+            self._global_store.add_index(name, extractor)
+
+        self._expiry_tick = expiry_tick
+        self._expiry = TimerWheel(tick=expiry_tick)
+        self._expiry_loaded = False
+        self._expiry_task = None
+
+        self._write_watermark = WriteWatermark()
+        self._apply_lock = asyncio.Lock(loop=self._loop)
+        self._write_lock = KeyedLock(loop=self._loop)
+        self._stopped = False
 
         self._serializer = serializer
 
@@ -80,14 +229,140 @@ class KafkaStoreManager(BaseStoreManager):
 
         asyncio.ensure_future(self._store_consumer.listen_store_records(self._rebuild), loop=self._loop)
 
-        self._store_producer = KafkaProducer(client=self._client,
-                                             client_id=client_id,
-                                             partitioner=StatefulsetPartitioner(instance=self._client.cur_instance),
-                                             loop=self._loop, serializer=self._serializer, acks='all')
+        # Store producer is shared by all store managers of client with same serializer
+        self._store_producer = KafkaProducer.shared(client=self._client, client_id=client_id,
+                                                    partitioner=StatefulsetPartitioner(
+                                                        instance=self._client.cur_instance),
+                                                    loop=self._loop, serializer=self._serializer, acks='all')
 
     def get_topic_store(self) -> str:
         return self._topic_store
 
+    def _initialize_local_store(self) -> None:
+        """ This protected method set local store initialize flag to true & starts entry expiration
+
+        Returns:
+            None
+        """
+        super()._initialize_local_store()
+        if self._expiry_task is None:
+            self._expiry_task = asyncio.ensure_future(self.__expire_entries(), loop=self._loop)
+
+    async def __expire_entries(self) -> None:
+        """ Load stored entry expirations, then delete expired entries on each tick
+
+        Returns:
+            None
+        """
+        persistency = self._local_store.get_persistency()
+        for key, value in await persistency.range(_EXPIRY_KEY_PREFIX, prefix_upper_bound(_EXPIRY_KEY_PREFIX)):
+            self._expiry.schedule(key[len(_EXPIRY_KEY_PREFIX):], _decode_expiry(value))
+        self._expiry_loaded = True
+        self._logger.info('Loaded %s entry expirations', len(self._expiry))
+
+        while True:
+            await asyncio.sleep(self._expiry_tick, loop=self._loop)
+            expired_keys = self._expiry.advance(time.time())
+            if expired_keys:
+                await self.__delete_expired_entries(expired_keys)
+
+    async def __delete_expired_entries(self, keys: List[str]) -> None:
+        """ Delete expired entries in local store & send their tombstones
+
+        Expired keys are locked while stored expiration is checked & tombstones are sent & applied, so an entry set
+        meanwhile is never deleted (timer wheel can be ahead of local store)
+
+        Args:
+            keys (List[str]): Expired keys
+
+        Returns:
+            None
+        """
+        keys = await self.__lock_keys(keys)
+        try:
+            now = time.time()
+            stored = await self._local_store.get_many([_expiry_key(key) for key in keys])
+            store_records: List[StoreRecord] = list()
+            for key in keys:
+                value = stored.get(_expiry_key(key))
+                if value is None:
+                    continue
+                expires_at = _decode_expiry(value)
+                if expires_at > now:
+                    self._expiry.schedule(key, expires_at)
+                else:
+                    store_records.append(StoreRecord(key=key, value=b'', operation_type=StoreRecordType.DEL))
+            try:
+                await self.__send_store_records(store_records, clear_expiry=True)
+            except FailToSendStoreRecord:
+                self._logger.warning('Fail to delete %s expired entries, retry on next tick', len(store_records))
+                for store_record in store_records:
+                    if store_record.key not in self._expiry:
+                        self._expiry.schedule(store_record.key, now)
+        finally:
+            self.__unlock_keys(keys)
+
+    async def __lock_keys(self, keys: List[str]) -> List[str]:
+        """ Lock written keys (sorted, so concurrent writes of many keys can't deadlock)
+
+        Args:
+            keys (List[str]): Written keys
+
+        Returns:
+            List[str]: Locked keys, sorted & without duplicates (to give to __unlock_keys)
+        """
+        locked: List[str] = list()
+        try:
+            for key in sorted(set(keys)):
+                await self._write_lock.acquire(key)
+                locked.append(key)
+        except BaseException:
+            self.__unlock_keys(locked)
+            raise
+        return locked
+
+    def __unlock_keys(self, keys: List[str]) -> None:
+        """ Unlock keys locked by __lock_keys
+
+        Args:
+            keys (List[str]): Locked keys
+
+        Returns:
+            None
+        """
+        for key in keys:
+            self._write_lock.release(key)
+
+    def __expiry_operation(self, store_record: StoreRecord,
+                           clear: bool = False) -> Optional[Tuple[str, bytes, StoreRecordType]]:
+        """ Update timer wheel with a written store record & return its local store expiration operation
+
+        Args:
+            store_record (StoreRecord): Written store record
+            clear (bool): If true stored expiration is deleted even if entry is not in timer wheel
+
+        Returns:
+            Optional[Tuple[str, bytes, StoreRecordType]]: Expiration operation, None if there is nothing to write
+        """
+        expires_at = store_record.expires_at() if store_record.operation_type == StoreRecordType.SET else None
+        if expires_at is not None:
+            self._expiry.schedule(store_record.key, expires_at)
+            return _expiry_key(store_record.key), _encode_expiry(expires_at), StoreRecordType.SET
+        if self._expiry.cancel(store_record.key) or clear or not self._expiry_loaded:
+            return _expiry_key(store_record.key), b'', StoreRecordType.DEL
+        return None
+
+    def __is_memory_persistency(self) -> bool:
+        """ Returns true if local store persistency is kept in memory (must be rebuilt from earliest on start)
+
+        Returns:
+            bool: true if persistency is a memory persistency
+        """
+        persistency = self._local_store.get_persistency()
+        while isinstance(persistency, (BloomFilterPersistency, CachedPersistency)):
+            persistency = persistency.get_persistency()
+        return isinstance(persistency, (MemoryPersistency, CompactMemoryPersistency))
+
     async def _initialize_stores(self) -> None:
         """ This method initialize stores (construct, pre-build)
 
@@ -99,7 +374,7 @@ class KafkaStoreManager(BaseStoreManager):
         self._logger.info('Start initialize store manager')
 
         # LocalStore part
-        if isinstance(self._local_store.get_persistency(), MemoryPersistency):
+        if self.__is_memory_persistency():
             try:
                 self._logger.info('LocalStore is an memory persistency, seek to earliest')
                 await self._store_consumer.seek_to_beginning(KafkaPositioning(topic=self._topic_store,
@@ -110,23 +385,29 @@ class KafkaStoreManager(BaseStoreManager):
                 raise CanNotInitializeStore
         else:
             if not self._rebuild:
+                partition = self._client.cur_instance
                 try:
-                    positioning = await self._store_consumer.get_last_committed_offsets()
-                    key = KafkaPositioning.make_class_assignment_key(self._topic_store, self._client.cur_instance)
-                    last_committed = positioning[key].get_current_offset()
-                    if last_committed is None:
-                        self._logger.info('LocalStore seek to beginning, %s, %s', self._topic_store,
-                                          self._client.cur_instance)
-                        await self._store_consumer.seek_to_beginning(KafkaPositioning(topic=self._topic_store,
-                                                                                      partition=self._client.cur_instance,
-                                                                                      current_offset=0))
+                    stored_offset = await self.__get_stored_offset(self._local_store, partition)
+                    if stored_offset is not None:
+                        self._logger.info('LocalStore seek to stored positioning, %s, %s, %s', self._topic_store,
+                                          partition, stored_offset)
+                        await self._store_consumer.seek_custom(KafkaPositioning(topic=self._topic_store,
+                                                                                partition=partition,
+                                                                                current_offset=stored_offset))
                     else:
-
-                        self._logger.info('LocalStore seek to last committed, %s, %s', self._topic_store,
-                                          self._client.cur_instance)
-                        await self._store_consumer.seek_to_last_commit(KafkaPositioning(topic=self._topic_store,
-                                                                                        partition=self._client.cur_instance,
-                                                                                        current_offset=last_committed))
+                        positioning = await self._store_consumer.get_last_committed_offsets()
+                        key = KafkaPositioning.make_class_assignment_key(self._topic_store, partition)
+                        last_committed = positioning[key].get_current_offset()
+                        if last_committed is None:
+                            self._logger.info('LocalStore seek to beginning, %s, %s', self._topic_store, partition)
+                            await self._store_consumer.seek_to_beginning(KafkaPositioning(topic=self._topic_store,
+                                                                                          partition=partition,
+                                                                                          current_offset=0))
+                        else:
+                            self._logger.info('LocalStore seek to last committed, %s, %s', self._topic_store,
+                                              partition)
+                            await self._store_consumer.seek_to_last_commit(KafkaPositioning(
+                                topic=self._topic_store, partition=partition, current_offset=last_committed))
                 except (TopicPartitionError, NoPartitionAssigned) as err:
                     self._logger.exception('%s', err.__str__())
                     raise CanNotInitializeStore
@@ -142,7 +423,7 @@ class KafkaStoreManager(BaseStoreManager):
                     raise CanNotInitializeStore
 
         # GlobalStore part
-        if isinstance(self._local_store.get_persistency(), MemoryPersistency):
+        if self.__is_memory_persistency():
             for part in range(0, self._client.nb_replica):
                 if part != self._client.cur_instance:
                     try:
@@ -158,6 +439,14 @@ class KafkaStoreManager(BaseStoreManager):
                 for part in range(0, self._client.nb_replica):
                     if part != self._client.cur_instance:
                         try:
+                            stored_offset = await self.__get_stored_offset(self._global_store, part)
+                            if stored_offset is not None:
+                                self._logger.info('GlobalStore seek to stored positioning, %s, %s, %s',
+                                                  self._topic_store, part, stored_offset)
+                                await self._store_consumer.seek_custom(KafkaPositioning(topic=self._topic_store,
+                                                                                        partition=part,
+                                                                                        current_offset=stored_offset))
+                                continue
                             positioning = await self._store_consumer.get_last_committed_offsets()
                             key = KafkaPositioning.make_class_assignment_key(self._topic_store,
                                                                              self._client.cur_instance)
@@ -191,7 +480,7 @@ class KafkaStoreManager(BaseStoreManager):
                             raise CanNotInitializeStore
 
     # Store function
-    async def set_entry_in_local_store(self, key: str, value: bytes) -> None:
+    async def set_entry_in_local_store(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
         """ Set an entry in local store
 
         This method send an StoreRecord in event bus and store entry asynchronously
@@ -199,22 +488,48 @@ class KafkaStoreManager(BaseStoreManager):
         Args:
             key (str): Key entry as string
             value (bytes): Value as bytes
+            ttl (Optional[float]): Entry time to live in seconds, None if entry never expires
 
         Returns:
             None
         """
         if self._local_store.get_persistency().is_initialize():
-            store_record = StoreRecord(key=key, value=value, operation_type=StoreRecordType('set'))
+            store_record = StoreRecord(key=key, value=value, operation_type=StoreRecordType('set'), ttl=ttl)
+            await self.__write_store_record(store_record)
+        else:
+            raise UninitializedStore
+
+    async def __write_store_record(self, store_record: StoreRecord) -> None:
+        """ Lock record key, send store record & apply it in local store
+
+        Write ticket is always ended when send fails (send error, cancellation...), so watermark never stays
+        behind a write that won't be applied
+
+        Args:
+            store_record (StoreRecord): Store record to send & apply
+
+        Raises:
+            FailToSendStoreRecord: raised when store record can't be sent
+
+        Returns:
+            None
+        """
+        await self._write_lock.acquire(store_record.key)
+        try:
+            ticket = self._write_watermark.begin()
             try:
                 record_metadata: BasePositioning = await self._store_producer.send_and_wait(store_record,
                                                                                             self._topic_store)
-                asyncio.ensure_future(self._store_consumer.__getattribute__('_make_manual_commit').
-                                      __call__([record_metadata]), loop=self._loop)
-            except (KeyErrorSendEvent, ValueErrorSendEvent, TypeErrorSendEvent, FailToSendEvent):
+            except (KeyErrorSendEvent, ValueErrorSendEvent, TypeErrorSendEvent, FailToSendEvent, KafkaError) as err:
+                self._write_watermark.done(ticket)
+                self._logger.exception('Fail to send store record | err -> %s', err)
                 raise FailToSendStoreRecord
-            await self._local_store.set(key, value)
-        else:
-            raise UninitializedStore
+            except BaseException:
+                self._write_watermark.done(ticket)
+                raise
+            await self.__apply_store_records(ticket, [store_record], [record_metadata])
+        finally:
+            self._write_lock.release(store_record.key)
 
     async def get_entry_in_local_store(self, key: str) -> bytes:
         """ Get an entry by key in local store
@@ -229,6 +544,28 @@ class KafkaStoreManager(BaseStoreManager):
         """
         return await self._local_store.get(key)
 
+    async def get_or_none_in_local_store(self, key: str) -> Optional[bytes]:
+        """ Get an entry by key in local store, None if key is missing (no StoreKeyNotFound)
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            Optional[bytes]: Value as bytes, None if key is missing
+        """
+        return await self._local_store.get_or_none(key)
+
+    async def get_many_in_local_store(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many entries by key in local store, in one persistency call
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._local_store.get_many(keys)
+
     async def delete_entry_in_local(self, key: str) -> None:
         """ Delete an entry in local store
 
@@ -242,17 +579,274 @@ class KafkaStoreManager(BaseStoreManager):
         """
         if self._local_store.get_persistency().is_initialize():
             store_record = StoreRecord(key=key, value=b'', operation_type=StoreRecordType('del'))
-            try:
-                record_metadata: BasePositioning = await self._store_producer.send_and_wait(store_record,
-                                                                                            self._topic_store)
-                asyncio.ensure_future(self._store_consumer.__getattribute__('_make_manual_commit').
-                                      __call__([record_metadata]), loop=self._loop)
-            except (KeyErrorSendEvent, ValueErrorSendEvent, TypeErrorSendEvent, FailToSendEvent):
-                raise FailToSendStoreRecord
-            await self._local_store.delete(key)
+            await self.__write_store_record(store_record)
         else:
             raise UninitializedStore
 
+    async def set_many_in_local_store(self, entries: Dict[str, bytes]) -> None:
+        """ Set many entries in local store
+
+        This method send all StoreRecord in event bus, wait once for all acknowledgments and store entries
+
+        Args:
+            entries (Dict[str, bytes]): Values as bytes by key
+
+        Returns:
+            None
+        """
+        batch = self.write_batch()
+        for key, value in entries.items():
+            batch.set(key, value)
+        await batch.commit()
+
+    async def delete_many_in_local_store(self, keys: List[str]) -> None:
+        """ Delete many entries in local store
+
+        This method send all StoreRecord in event bus, wait once for all acknowledgments and delete entries
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            None
+        """
+        batch = self.write_batch()
+        for key in keys:
+            batch.delete(key)
+        await batch.commit()
+
+    async def _write_store_records(self, store_records: List[StoreRecord]) -> None:
+        """ Send store records in one round trip, then apply them in local store
+
+        All records are pipelined in producer, acknowledgments are awaited once and only the highest offset
+        is committed. When some records fail, acknowledged ones are still applied.
+
+        Args:
+            store_records (List[StoreRecord]): Store records to send & apply
+
+        Raises:
+            FailToSendStoreRecord: raised when at least one store record can't be sent
+
+        Returns:
+            None
+        """
+        await self.__write_store_records(store_records)
+
+    async def __write_store_records(self, store_records: List[StoreRecord]) -> None:
+        """ Lock written keys, send store records in one round trip & apply them in local store
+
+        Args:
+            store_records (List[StoreRecord]): Store records to send & apply
+
+        Returns:
+            None
+        """
+        if not self._local_store.get_persistency().is_initialize():
+            raise UninitializedStore
+        if not store_records:
+            return
+        keys = await self.__lock_keys([store_record.key for store_record in store_records])
+        try:
+            await self.__send_store_records(store_records)
+        finally:
+            self.__unlock_keys(keys)
+
+    async def __send_store_records(self, store_records: List[StoreRecord], clear_expiry: bool = False) -> None:
+        """ Send store records in one round trip, then apply them in local store with their expirations
+
+        Written keys must be locked by caller. Store records aren't sent in a transaction, when some records fail
+        the acknowledged ones are in changelog, so they are still applied in local store (local store stays in line
+        with changelog) before FailToSendStoreRecord is raised. Store records hold the final state of their key, so
+        caller can send the whole batch again.
+
+        Args:
+            store_records (List[StoreRecord]): Store records to send & apply
+            clear_expiry (bool): If true stored expirations of deleted entries are always deleted
+
+        Raises:
+            FailToSendStoreRecord: raised when at least one store record can't be sent (acknowledged store records
+                                   are applied)
+
+        Returns:
+            None
+        """
+        if not self._local_store.get_persistency().is_initialize():
+            raise UninitializedStore
+        if not store_records:
+            return
+
+        ticket = self._write_watermark.begin()
+        send_error: Optional[BaseException] = None
+        record_futures: List[Future] = list()
+        try:
+            # Tracked sends, in flight store records are bounded & awaited by producer flush on stop
+            try:
+                for store_record in store_records:
+                    record_futures.append(await self._store_producer.send_tracked(store_record, self._topic_store))
+            except (KeyErrorSendEvent, ValueErrorSendEvent, TypeErrorSendEvent, FailToSendEvent, FailToSendBatch,
+                    KafkaError) as err:
+                # Records sent before failing one may be acknowledged, wait for them
+                send_error = err
+            results = await asyncio.gather(*record_futures, loop=self._loop, return_exceptions=True)
+        except BaseException:
+            self._write_watermark.done(ticket)
+            raise
+
+        sent_records: List[StoreRecord] = list()
+        records_positioning: List[BasePositioning] = list()
+        for store_record, result in zip(store_records, results):
+            if isinstance(result, BaseException):
+                send_error = send_error or result
+            else:
+                sent_records.append(store_record)
+                records_positioning.append(result)
+        if len(sent_records) < len(store_records):
+            self._logger.error('Fail to send %s of %s store records | err -> %s',
+                               len(store_records) - len(sent_records), len(store_records), send_error)
+        if sent_records:
+            await self.__apply_store_records(ticket, sent_records, records_positioning, clear_expiry)
+        else:
+            self._write_watermark.done(ticket)
+        if send_error is not None:
+            raise FailToSendStoreRecord
+
+    async def __apply_store_records(self, ticket: int, store_records: List[StoreRecord],
+                                    records_positioning: List[BasePositioning], clear_expiry: bool = False) -> None:
+        """ Apply acknowledged store records in local store with changelog position & commit position
+
+        Writes are applied one at a time, so stored position never goes backward. A write whose local store
+        batch fails stays pending in watermark (stored position doesn't pass it until restart).
+
+        Args:
+            ticket (int): Write ticket (WriteWatermark.begin)
+            store_records (List[StoreRecord]): Sent store records
+            records_positioning (List[BasePositioning]): Positioning of each sent store record
+            clear_expiry (bool): If true stored expirations of deleted entries are always deleted
+
+        Returns:
+            None
+        """
+        offsets = [positioning.get_current_offset() for positioning in records_positioning]
+        self._write_watermark.acknowledged(ticket, min(offsets), max(offsets))
+        topic, partition = records_positioning[0].get_topics(), records_positioning[0].get_partition()
+        async with self._apply_lock:
+            position = self._write_watermark.position(ticket)
+            metadata = None if position is None else self.__positioning_metadata(topic, partition, position)
+            await self._local_store.write_batch(self.__local_operations(store_records, clear_expiry), metadata)
+            self._write_watermark.done(ticket)
+        if position is not None and position > 0:
+            self.__commit_after_write(KafkaPositioning(topic, partition, position - 1))
+
+    def __local_operations(self, store_records: List[StoreRecord],
+                           clear_expiry: bool = False) -> List[Tuple[str, bytes, StoreRecordType]]:
+        """ Return local store operations of written store records, with their expiration operations
+
+        Args:
+            store_records (List[StoreRecord]): Written store records
+            clear_expiry (bool): If true stored expirations of deleted entries are always deleted
+
+        Returns:
+            List[Tuple[str, bytes, StoreRecordType]]: Operations as (key, value, operation type)
+        """
+        operations = list()
+        for store_record in store_records:
+            operations.append((store_record.key, store_record.value, store_record.operation_type))
+            expiry_operation = self.__expiry_operation(store_record, clear_expiry)
+            if expiry_operation is not None:
+                operations.append(expiry_operation)
+        return operations
+
+    @staticmethod
+    def __positioning_metadata(topic: str, partition: int, position: int) -> Dict[str, bytes]:
+        """ Return store metadata of a store topic partition position
+
+        Args:
+            topic (str): Store topic
+            partition (int): Store topic partition
+            position (int): Next offset to consume
+
+        Returns:
+            Dict[str, bytes]: Metadata values by name
+        """
+        return {_positioning_metadata_name(topic, partition): _encode_offset(position)}
+
+    async def __get_stored_offset(self, store: BaseStores, partition: int) -> Optional[int]:
+        """ Return next offset to consume stored in store persistency (committed with store data)
+
+        Args:
+            store (BaseStores): Local or global store
+            partition (int): Store topic partition
+
+        Returns:
+            Optional[int]: Next offset to consume, None if store has no stored positioning
+        """
+        value = await store.get_persistency().get_metadata(_positioning_metadata_name(self._topic_store, partition))
+        if value is None:
+            return None
+        return _decode_offset(value)
+
+    def __commit_after_write(self, positioning: BasePositioning) -> None:
+        """ Commit store positioning once the local store write is durable
+
+        Without write behind the commit is made right away, otherwise positioning is committed after the next
+        local store flush
+
+        Args:
+            positioning (BasePositioning): Positioning of the last applied store record
+
+        Returns:
+            None
+        """
+        if self._local_store.is_write_behind():
+            self._local_store.set_flush_marker(positioning)
+        else:
+            asyncio.ensure_future(self._commit_store_positioning(positioning), loop=self._loop)
+
+    async def _commit_store_positioning(self, positioning: BasePositioning) -> None:
+        """ Commit store positioning in store consumer
+
+        Args:
+            positioning (BasePositioning): Positioning to commit
+
+        Returns:
+            None
+        """
+        await self._store_consumer.__getattribute__('_make_manual_commit').__call__([positioning])
+
+    async def flush_local_store(self) -> None:
+        """ Flush local store buffered writes & commit their positioning
+
+        Must be called before shutdown when local store use write behind
+
+        Returns:
+            None
+        """
+        await self._local_store.flush()
+
+    async def stop_store_manager(self) -> None:
+        """ Stop entry expirations, flush local store, stop store consumer & release store producer
+
+        Store producer is shared (KafkaProducer.shared), it's stopped by its last release. Next calls do nothing
+
+        Returns:
+            None
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+            try:
+                await self._expiry_task
+            except asyncio.CancelledError:
+                pass
+            self._expiry_task = None
+        await self.flush_local_store()
+        if self._store_consumer.is_running():
+            await self._store_consumer.stop_consumer()
+        await self._client.get_producer_pool().release(self._store_producer)
+        self._logger.debug('Stop store manager of %s', self._topic_store)
+
     async def get_entry_in_global_store(self, key: str) -> bytes:
         """ Get an entry by key in global store
 
@@ -266,6 +860,28 @@ class KafkaStoreManager(BaseStoreManager):
         """
         return await self._global_store.get(key)
 
+    async def get_or_none_in_global_store(self, key: str) -> Optional[bytes]:
+        """ Get an entry by key in global store, None if key is missing (no StoreKeyNotFound)
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            Optional[bytes]: Value as bytes, None if key is missing
+        """
+        return await self._global_store.get_or_none(key)
+
+    async def get_many_in_global_store(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many entries by key in global store, in one persistency call
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._global_store.get_many(keys)
+
     # Storage builder part
     async def _build_set_entry_in_global_store(self, key: str, value: str) -> None:
         """ Set an entry in global store
@@ -324,3 +940,43 @@ class KafkaStoreManager(BaseStoreManager):
             None
         """
         await self._local_store.__getattribute__('_build_delete').__call__(key)
+
+    async def _build_store_record_in_local_store(self, store_record: StoreRecord,
+                                                 positioning: BasePositioning) -> None:
+        """ Apply a store record in local store, committed with its changelog positioning
+
+        Entry expiration is computed from store record date & ttl. Timer wheel is loaded from local store once
+        built, so stored expiration is always written (or deleted)
+
+        Args:
+            store_record (StoreRecord): Store record received by store consumer
+            positioning (BasePositioning): Positioning of next store record (topic / partition / offset)
+
+        Returns:
+            None
+        """
+        metadata = {_positioning_metadata_name(positioning.get_topics(), positioning.get_partition()):
+                    _encode_offset(positioning.get_current_offset())}
+        expires_at = store_record.expires_at() if store_record.operation_type == StoreRecordType.SET else None
+        if expires_at is not None:
+            expiry_operation = (_expiry_key(store_record.key), _encode_expiry(expires_at), StoreRecordType.SET)
+        else:
+            expiry_operation = (_expiry_key(store_record.key), b'', StoreRecordType.DEL)
+        await self._local_store.__getattribute__('_build_batch').__call__(
+            [(store_record.key, store_record.value, store_record.operation_type), expiry_operation], metadata)
+
+    async def _build_store_record_in_global_store(self, store_record: StoreRecord,
+                                                  positioning: BasePositioning) -> None:
+        """ Apply a store record in global store, committed with its changelog positioning
+
+        Args:
+            store_record (StoreRecord): Store record received by store consumer
+            positioning (BasePositioning): Positioning of next store record (topic / partition / offset)
+
+        Returns:
+            None
+        """
+        metadata = {_positioning_metadata_name(positioning.get_topics(), positioning.get_partition()):
+                    _encode_offset(positioning.get_current_offset())}
+        await self._global_store.__getattribute__('_build_batch').__call__(
+            [(store_record.key, store_record.value, store_record.operation_type)], metadata)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" StoreWriteBatch class
+
+Collects local store mutations and sends them to the store manager as a single batch.
+
+Examples:
+    async with store_manager.write_batch() as batch:
+        batch.set('coffee-1', b'...')
+        batch.delete('coffee-2')
+"""
+
+from typing import Dict, List, Optional
+
+from tonga.models.store.store_record import StoreRecord
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import BadEntryType
+
+__all__ = [
+    'StoreWriteBatch'
+]
+
+
+class StoreWriteBatch:
+    """ StoreWriteBatch class
+
+    Only the last operation of each key is kept, the changelog & the local store only need the final state of
+    each key. Records are sent when the context manager exits without exception, otherwise they are discarded.
+
+    Batch isn't sent in a transaction: when some records fail, acknowledged records are applied in local store
+    (local store stays in line with changelog) & FailToSendStoreRecord is raised. Sending the same operations
+    again is safe.
+
+    Attributes:
+        _store_manager (BaseStoreManager): Store manager used for send & apply the batch
+        _records (Dict[str, StoreRecord]): Pending store records by key
+    """
+    _records: Dict[str, StoreRecord]
+
+    def __init__(self, store_manager) -> None:
+        """ StoreWriteBatch constructor
+
+        Args:
+            store_manager (BaseStoreManager): Store manager used for send & apply the batch
+
+        Returns:
+            None
+        """
+        self._store_manager = store_manager
+        self._records = dict()
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """ Add a set operation in batch
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+            ttl (Optional[float]): Entry time to live in seconds, None if entry never expires
+
+        Returns:
+            None
+        """
+        if not isinstance(key, str) or not isinstance(value, bytes):
+            raise BadEntryType
+        self._records.pop(key, None)
+        self._records[key] = StoreRecord(key=key, value=value, operation_type=StoreRecordType.SET, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        """ Add a delete operation in batch
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        if not isinstance(key, str):
+            raise BadEntryType
+        self._records.pop(key, None)
+        self._records[key] = StoreRecord(key=key, value=b'', operation_type=StoreRecordType.DEL)
+
+    def get_records(self) -> List[StoreRecord]:
+        """ Return pending store records, in operation order
+
+        Returns:
+            List[StoreRecord]: Pending store records
+        """
+        return list(self._records.values())
+
+    def clear(self) -> None:
+        """ Discard all pending operations
+
+        Returns:
+            None
+        """
+        self._records.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def commit(self) -> None:
+        """ Send all pending operations in one round trip, then clear the batch
+
+        Raises:
+            FailToSendStoreRecord: raised when at least one operation can't be sent (acknowledged operations are
+                                   applied)
+
+        Returns:
+            None
+        """
+        if self._records:
+            records = self.get_records()
+            self._records.clear()
+            await self._store_manager.__getattribute__('_write_store_records').__call__(records)
+
+    async def __aenter__(self) -> 'StoreWriteBatch':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            self.clear()
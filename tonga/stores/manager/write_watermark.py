@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" WriteWatermark class
+
+Next changelog offset a local store can resume from, while local store writes are sent & applied concurrently.
+"""
+
+from typing import Dict, Optional
+
+__all__ = [
+    'WriteWatermark'
+]
+
+
+class WriteWatermark:
+    """ WriteWatermark class
+
+    Each local store write takes a ticket before sending its store records. Until its acknowledgment, a write is
+    bounded by the highest acknowledged offset known when it started (its records are appended after it), then by
+    its first record offset. Stored position is the lowest bound of writes not applied yet (all lower offsets are
+    applied), or the offset after the highest acknowledged record if no other write is pending. Position never
+    goes backward.
+
+    Attributes:
+        _next_ticket (int): Ticket of next write
+        _pending (Dict[int, Optional[int]]): Lowest possible offset by ticket of not applied writes (None if unknown)
+        _high (Optional[int]): Offset after the highest acknowledged record, None if no record was acknowledged
+        _position (Optional[int]): Last returned position
+    """
+    _next_ticket: int
+    _pending: Dict[int, Optional[int]]
+    _high: Optional[int]
+    _position: Optional[int]
+
+    def __init__(self, position: Optional[int] = None) -> None:
+        """ WriteWatermark constructor
+
+        Args:
+            position (Optional[int]): Stored position (next offset to consume), None if store has no position
+
+        Returns:
+            None
+        """
+        self._next_ticket = 0
+        self._pending = dict()
+        self._high = position
+        self._position = position
+
+    def begin(self) -> int:
+        """ Register a write before sending its store records
+
+        Returns:
+            int: Write ticket
+        """
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        self._pending[ticket] = self._high
+        return ticket
+
+    def acknowledged(self, ticket: int, first_offset: int, last_offset: int) -> None:
+        """ Set offsets of an acknowledged write
+
+        Args:
+            ticket (int): Write ticket
+            first_offset (int): Lowest offset of write records
+            last_offset (int): Highest offset of write records
+
+        Returns:
+            None
+        """
+        self._pending[ticket] = first_offset
+        if self._high is None or last_offset + 1 > self._high:
+            self._high = last_offset + 1
+
+    def position(self, ticket: int) -> Optional[int]:
+        """ Return position to store with a write, write being applied in the same local store batch
+
+        Args:
+            ticket (int): Write ticket
+
+        Returns:
+            Optional[int]: Next offset to consume, None if no position is known yet
+        """
+        bounds = [bound for other, bound in self._pending.items() if other != ticket]
+        if None in bounds:
+            return self._position
+        position = min(bounds, default=self._high)
+        if position is not None and (self._position is None or position > self._position):
+            self._position = position
+        return self._position
+
+    def done(self, ticket: int) -> None:
+        """ Unregister an applied (or failed) write
+
+        Args:
+            ticket (int): Write ticket
+
+        Returns:
+            None
+        """
+        self._pending.pop(ticket, None)
+
+    def __len__(self) -> int:
+        return len(self._pending)
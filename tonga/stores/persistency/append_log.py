@@ -0,0 +1,852 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" AppendLogPersistency class
+
+Log structured persistency with an in-memory hash index (Bitcask like), no native dependency.
+
+Writes are appended to the active segment file, an in-memory dict maps each key to (segment id, value offset,
+value length). When the active segment reaches *max_segment_size* it's sealed: a hint file (index entries of the
+segment) is written next to it & segment is mmaped for reads. A background compaction rewrites live entries of all
+sealed segments in one segment & drops old segments.
+
+Segment file layout::
+
+    segment header (magic, first covered segment id)
+    frame*: frame header (crc32, payload length), payload = entry*
+    entry: entry header (operation, key length, value length), key, value
+
+Metadata values (ex: changelog positioning) are entries with a metadata operation, the key is the metadata name.
+A frame is written by one write call & checked by crc32 on load, so all entries of a write batch (& its metadata)
+are applied together or not at all. A compacted segment keeps the id of the newest segment it covers & records the
+oldest one, on load all covered segments left by an interrupted compaction are removed.
+"""
+
+import asyncio
+import mmap
+import os
+import struct
+import threading
+import zlib
+from logging import getLogger
+from typing import Dict, List, Tuple, Optional, BinaryIO
+
+from tonga.stores.persistency.base import BasePersistency
+from tonga.stores.persistency.executor import PersistencyExecutor
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import StoreKeyNotFound
+from tonga.stores.manager.errors import UninitializedStore
+from tonga.stores.persistency.errors import UnknownOperationType
+
+__all__ = [
+    'AppendLogPersistency'
+]
+
+_SEGMENT_MAGIC = b'TGSL'
+_HINT_MAGIC = b'TGSH'
+_SEGMENT_HEADER = struct.Struct('>4sI')  # magic, first covered segment id
+_FRAME_HEADER = struct.Struct('>II')  # crc32 of payload, payload length
+_ENTRY_HEADER = struct.Struct('>BII')  # operation, key length, value length
+_HINT_HEADER = struct.Struct('>4sQ')  # magic, segment size
+_HINT_ENTRY = struct.Struct('>BIQI')  # operation, key length, value offset, value length
+
+_OP_SET = 1
+_OP_DEL = 2
+_OP_META = 3
+
+# Max payload size of a frame written by compaction
+_COMPACTION_FRAME_SIZE = 1024 * 1024
+
+# Index location: (segment id, value offset, value length)
+_Location = Tuple[int, int, int]
+
+
+class AppendLogPersistency(BasePersistency):
+    """ Append only log persistency
+
+    All file calls are blocking, they are run in persistency thread pool (see PersistencyExecutor), compaction runs
+    in its own executor. Index & segments are guarded by a thread lock.
+
+    Attributes:
+        _db_path (str): Directory of segment & hint files
+        _max_segment_size (int): Active segment is sealed when it reaches this size (in bytes)
+        _compaction_min_segments (int): Min number of sealed segments before a compaction is started
+        _compaction_dead_ratio (float): Min ratio of dead bytes in sealed segments before a compaction is started
+        _sync (bool): If true, active segment is fsynced after each write
+        _index (Dict[str, _Location]): Location of each live key
+        _maps (Dict[int, mmap.mmap]): Sealed segments
+        _sizes (Dict[int, int]): Segments size
+        _live (Dict[int, int]): Live bytes in each segment
+        _active_id (int): Active segment id
+        _active_file (BinaryIO): Active segment file
+        _active_hints (List[Tuple[int, str, int, int]]): Hint entries of active segment
+        _metadata (Dict[str, bytes]): Metadata values by name
+    """
+    _db_path: str
+    _max_segment_size: int
+    _compaction_min_segments: int
+    _compaction_dead_ratio: float
+    _sync: bool
+    _index: Dict[str, _Location]
+    _maps: Dict[int, mmap.mmap]
+    _sizes: Dict[int, int]
+    _live: Dict[int, int]
+    _active_id: int
+    _active_file: BinaryIO
+    _active_hints: List[Tuple[int, str, int, int]]
+    _active_dirty: bool
+    _metadata: Dict[str, bytes]
+    _lock: threading.Lock
+    _compacting: bool
+    _executor: PersistencyExecutor
+    _compaction_executor: PersistencyExecutor
+
+    def __init__(self, db_path: str, max_segment_size: int = 64 * 1024 * 1024, compaction_min_segments: int = 2,
+                 compaction_dead_ratio: float = 0.5, sync: bool = False):
+        """ AppendLogPersistency constructor, loads index from existing segments (hint files when they're valid)
+
+        Args:
+            db_path (str): Directory of segment & hint files (created if missing)
+            max_segment_size (int): Active segment is sealed when it reaches this size (in bytes)
+            compaction_min_segments (int): Min number of sealed segments before a compaction is started
+            compaction_dead_ratio (float): Min ratio of dead bytes in sealed segments before a compaction is started
+            sync (bool): If true, active segment is fsynced after each write
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._db_path = db_path
+        self._max_segment_size = max_segment_size
+        self._compaction_min_segments = compaction_min_segments
+        self._compaction_dead_ratio = compaction_dead_ratio
+        self._sync = sync
+
+        self._index = dict()
+        self._maps = dict()
+        self._sizes = dict()
+        self._live = dict()
+        self._metadata = dict()
+        self._lock = threading.Lock()
+        self._compacting = False
+
+        self._executor = PersistencyExecutor(max_concurrency=1)
+        self._compaction_executor = PersistencyExecutor(max_concurrency=1)
+
+        os.makedirs(self._db_path, exist_ok=True)
+        self.__load()
+
+        self._initialize = False
+
+    def get_executor(self) -> PersistencyExecutor:
+        """ Return persistency executor (queue wait & execution time are available in executor stats)
+
+        Returns:
+            PersistencyExecutor: persistency executor
+        """
+        return self._executor
+
+    def _set_initialize(self) -> None:
+        """ Flush build operations & set persistency initialize flag to true
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.__flush()
+        self._initialize = True
+
+    async def get(self, key: str) -> bytes:
+        """ Get value by key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        if self._initialize:
+            return await self._executor.run(self.__get, key)
+        raise UninitializedStore
+
+    async def get_view(self, key: str) -> memoryview:
+        """ Get value by key without copy, value is a view on mmaped segment (except for active segment)
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            memoryview: value view
+        """
+        if self._initialize:
+            return await self._executor.run(self.__get_view, key)
+        raise UninitializedStore
+
+    async def set(self, key: str, value: bytes) -> None:
+        """ Set value & key
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        if self._initialize:
+            await self._executor.run(self.__write, [(key, value, StoreRecordType.SET)], False, True)
+            self.__maybe_compact()
+        else:
+            raise UninitializedStore
+
+    async def delete(self, key: str) -> None:
+        """ Delete value by key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        if self._initialize:
+            await self._executor.run(self.__write, [(key, b'', StoreRecordType.DEL)], True, True)
+            self.__maybe_compact()
+        else:
+            raise UninitializedStore
+
+    async def _build_operations(self, key: str, value: bytes, operation_type: StoreRecordType) -> None:
+        """ This function is used for build DB when store is not initialize
+
+        Build operations are not flushed one by one, they're flushed when store is initialized
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+            operation_type (StoreRecordType): Operation type (SET or DEL)
+
+        Returns:
+            None
+        """
+        if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+            raise UnknownOperationType
+        await self._executor.run(self.__write, [(key, value, operation_type)], True, False)
+        self.__maybe_compact()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._initialize:
+            return await self._get_many(keys)
+        raise UninitializedStore
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._executor.run(self.__get_many, keys)
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata in one frame (atomic on load), without initialize check
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, written in the same frame
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+                raise UnknownOperationType
+        await self._executor.run(self.__write, operations, False, self._initialize, metadata)
+        self.__maybe_compact()
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name (metadata are kept in memory)
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return self._metadata.get(name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end) in one blocking call, without initialize check
+
+        Hash index keys are not ordered, keys are sorted on each call
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self._executor.run(self.__range, start, end, reverse, limit)
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, without initialize check
+
+        Returns:
+            List[str]: Keys
+        """
+        return await self._executor.run(self.__all_keys)
+
+    async def compact(self) -> None:
+        """ Rewrite live entries of all sealed segments in one segment & remove old segments
+
+        Active segment is sealed first. Reads & writes continue during compaction.
+
+        Returns:
+            None
+        """
+        if self._compacting:
+            return
+        self._compacting = True
+        try:
+            await self._compaction_executor.run(self.__compact)
+        finally:
+            self._compacting = False
+
+    def get_stats(self) -> Dict[str, int]:
+        """ Return index & segments counters
+
+        Returns:
+            Dict[str, int]: keys, segments, total_bytes, live_bytes
+        """
+        with self._lock:
+            return {
+                'keys': len(self._index),
+                'segments': len(self._sizes),
+                'total_bytes': sum(self._sizes.values()),
+                'live_bytes': sum(self._live.values()),
+            }
+
+    def __maybe_compact(self) -> None:
+        """ Start a background compaction when sealed segments contain enough dead bytes
+
+        Returns:
+            None
+        """
+        if self._compacting or len(self._maps) < self._compaction_min_segments:
+            return
+        with self._lock:
+            total = sum(self._sizes[seg_id] - _SEGMENT_HEADER.size for seg_id in self._maps)
+            live = sum(self._live[seg_id] for seg_id in self._maps)
+        if total > 0 and (total - live) / total >= self._compaction_dead_ratio:
+            asyncio.ensure_future(self.compact())
+
+    # Blocking part, run in persistency thread pool
+    def __get(self, key: str) -> bytes:
+        """ Blocking get
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        with self._lock:
+            location = self._index.get(key)
+            if location is None:
+                self._logger.debug('Fail to get %s, key not found', key)
+                raise StoreKeyNotFound
+            return self.__read(location)
+
+    def __get_view(self, key: str) -> memoryview:
+        """ Blocking get view
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            memoryview: value view
+        """
+        with self._lock:
+            location = self._index.get(key)
+            if location is None:
+                self._logger.debug('Fail to get %s, key not found', key)
+                raise StoreKeyNotFound
+            seg_id, offset, length = location
+            if seg_id in self._maps:
+                return memoryview(self._maps[seg_id])[offset:offset + length]
+            return memoryview(self.__read(location))
+
+    def __get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Blocking get many
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        values: Dict[str, bytes] = dict()
+        with self._lock:
+            for key in keys:
+                location = self._index.get(key)
+                if location is not None:
+                    values[key] = self.__read(location)
+        return values
+
+    def __range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Blocking range read
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        with self._lock:
+            keys = sorted((key for key in self._index if (start is None or key >= start) and
+                           (end is None or key < end)), reverse=reverse)
+            if limit is not None:
+                keys = keys[:limit]
+            return [(key, self.__read(self._index[key])) for key in keys]
+
+    def __all_keys(self) -> List[str]:
+        """ Blocking keys only scan
+
+        Returns:
+            List[str]: Keys
+        """
+        with self._lock:
+            return list(self._index)
+
+    def __read(self, location: _Location) -> bytes:
+        """ Read value at location (lock must be held)
+
+        Args:
+            location (_Location): (segment id, value offset, value length)
+
+        Returns:
+            bytes: value
+        """
+        seg_id, offset, length = location
+        if seg_id in self._maps:
+            return self._maps[seg_id][offset:offset + length]
+        if self._active_dirty:
+            self._active_file.flush()
+            self._active_dirty = False
+        return os.pread(self._active_file.fileno(), length, offset)
+
+    def __write(self, operations: List[Tuple[str, bytes, StoreRecordType]], strict_delete: bool,
+                flush: bool, metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Blocking write of operations & metadata in one frame
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            strict_delete (bool): If true, raises StoreKeyNotFound when a deleted key doesn't exist
+            flush (bool): If true, active segment is flushed after write
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name
+
+        Returns:
+            None
+        """
+        if not operations and not metadata:
+            return
+        with self._lock:
+            if strict_delete:
+                for key, _, operation_type in operations:
+                    if operation_type == StoreRecordType.DEL and key not in self._index:
+                        self._logger.debug('Fail to delete %s, key not found', key)
+                        raise StoreKeyNotFound
+
+            payload = bytearray()
+            entries: List[Tuple[int, str, int, int]] = list()
+            base_offset = self._sizes[self._active_id] + _FRAME_HEADER.size
+            for key, value, operation_type in operations:
+                key_bytes = key.encode('utf-8')
+                if operation_type == StoreRecordType.SET:
+                    operation, data = _OP_SET, value
+                else:
+                    operation, data = _OP_DEL, b''
+                payload += _ENTRY_HEADER.pack(operation, len(key_bytes), len(data))
+                payload += key_bytes
+                entries.append((operation, key, base_offset + len(payload), len(data)))
+                payload += data
+            if metadata:
+                for name, data in metadata.items():
+                    name_bytes = name.encode('utf-8')
+                    payload += _ENTRY_HEADER.pack(_OP_META, len(name_bytes), len(data))
+                    payload += name_bytes
+                    entries.append((_OP_META, name, base_offset + len(payload), len(data)))
+                    payload += data
+
+            frame = _FRAME_HEADER.pack(zlib.crc32(payload), len(payload)) + payload
+            self._active_file.write(frame)
+            self._active_dirty = True
+            self._sizes[self._active_id] += len(frame)
+
+            for operation, key, offset, length in entries:
+                self._active_hints.append((operation, key, offset, length))
+                if operation == _OP_SET:
+                    self.__index_set(key, (self._active_id, offset, length))
+                elif operation == _OP_DEL:
+                    self.__index_delete(key)
+            if metadata:
+                self._metadata.update(metadata)
+
+            if flush:
+                self.__flush()
+            if self._sizes[self._active_id] >= self._max_segment_size:
+                self.__roll()
+
+    def __flush(self) -> None:
+        """ Flush active segment (fsync if sync is true), lock must be held
+
+        Returns:
+            None
+        """
+        if self._active_dirty:
+            self._active_file.flush()
+            if self._sync:
+                os.fsync(self._active_file.fileno())
+            self._active_dirty = False
+
+    def __index_set(self, key: str, location: _Location) -> None:
+        """ Set key location in index & update live bytes counters (lock must be held)
+
+        Args:
+            key (str): Key entry as string
+            location (_Location): (segment id, value offset, value length)
+
+        Returns:
+            None
+        """
+        self.__index_delete(key)
+        self._index[key] = location
+        self._live[location[0]] += _ENTRY_HEADER.size + len(key) + location[2]
+
+    def __index_delete(self, key: str) -> None:
+        """ Remove key from index & update live bytes counters (lock must be held)
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        location = self._index.pop(key, None)
+        if location is not None:
+            self._live[location[0]] -= _ENTRY_HEADER.size + len(key) + location[2]
+
+    def __segment_path(self, seg_id: int) -> str:
+        return os.path.join(self._db_path, f'{seg_id:010d}.log')
+
+    def __hint_path(self, seg_id: int) -> str:
+        return os.path.join(self._db_path, f'{seg_id:010d}.hint')
+
+    def __open_active(self, seg_id: int) -> None:
+        """ Create a new active segment (lock must be held)
+
+        Args:
+            seg_id (int): Segment id
+
+        Returns:
+            None
+        """
+        self._active_id = seg_id
+        self._active_file = open(self.__segment_path(seg_id), 'w+b')
+        self._active_file.write(_SEGMENT_HEADER.pack(_SEGMENT_MAGIC, seg_id))
+        self._active_file.flush()
+        self._active_dirty = False
+        self._active_hints = list()
+        self._sizes[seg_id] = _SEGMENT_HEADER.size
+        self._live[seg_id] = 0
+
+    def __roll(self) -> None:
+        """ Seal active segment (write its hint file & mmap it), then open a new active segment (lock must be held)
+
+        Returns:
+            None
+        """
+        if self._sizes[self._active_id] == _SEGMENT_HEADER.size:
+            return
+        seg_id = self._active_id
+        self._active_file.flush()
+        os.fsync(self._active_file.fileno())
+        self._active_file.close()
+        self.__write_hint(seg_id, self._sizes[seg_id], self._active_hints)
+        self._maps[seg_id] = self.__map(seg_id)
+        self.__open_active(seg_id + 1)
+
+    def __map(self, seg_id: int) -> mmap.mmap:
+        """ mmap a sealed segment
+
+        Args:
+            seg_id (int): Segment id
+
+        Returns:
+            mmap.mmap: Read only segment map
+        """
+        with open(self.__segment_path(seg_id), 'rb') as segment_file:
+            return mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __write_hint(self, seg_id: int, segment_size: int, hints: List[Tuple[int, str, int, int]],
+                     path: str = None) -> None:
+        """ Write hint file of a sealed segment (written in a temporary file, then renamed)
+
+        Args:
+            seg_id (int): Segment id
+            segment_size (int): Segment size, hint is ignored on load when it doesn't match segment size
+            hints (List[Tuple[int, str, int, int]]): Hint entries (operation, key, value offset, value length)
+            path (str): Hint file path, default is segment hint path
+
+        Returns:
+            None
+        """
+        if path is None:
+            path = self.__hint_path(seg_id)
+        data = bytearray(_HINT_HEADER.pack(_HINT_MAGIC, segment_size))
+        for operation, key, offset, length in hints:
+            key_bytes = key.encode('utf-8')
+            data += _HINT_ENTRY.pack(operation, len(key_bytes), offset, length)
+            data += key_bytes
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as hint_file:
+            hint_file.write(data)
+            hint_file.flush()
+            os.fsync(hint_file.fileno())
+        os.replace(tmp_path, path)
+
+    def __load(self) -> None:
+        """ Load index from existing segments & open a new active segment
+
+        Returns:
+            None
+        """
+        seg_ids: List[int] = list()
+        for name in os.listdir(self._db_path):
+            if name.endswith('.tmp'):
+                os.remove(os.path.join(self._db_path, name))
+            elif name.endswith('.log'):
+                seg_ids.append(int(name[:-4]))
+        seg_ids.sort()
+
+        # Remove segments covered by a compacted segment (compaction interrupted before cleanup)
+        covered = set()
+        for seg_id in seg_ids:
+            with open(self.__segment_path(seg_id), 'rb') as segment_file:
+                header = segment_file.read(_SEGMENT_HEADER.size)
+            if len(header) < _SEGMENT_HEADER.size or header[:4] != _SEGMENT_MAGIC:
+                self._logger.warning('Ignore invalid segment %s', seg_id)
+                covered.add(seg_id)
+                continue
+            _, first_id = _SEGMENT_HEADER.unpack(header)
+            covered.update(i for i in seg_ids if first_id <= i < seg_id)
+        for seg_id in covered:
+            self.__remove_segment(seg_id)
+        seg_ids = [seg_id for seg_id in seg_ids if seg_id not in covered]
+        # Remove empty segments (active segment of a previous run without writes)
+        for seg_id in [seg_id for seg_id in seg_ids if os.path.getsize(self.__segment_path(seg_id)) <=
+                       _SEGMENT_HEADER.size]:
+            self.__remove_segment(seg_id)
+            seg_ids.remove(seg_id)
+
+        with self._lock:
+            for seg_id in seg_ids:
+                self._live[seg_id] = 0
+                size = os.path.getsize(self.__segment_path(seg_id))
+                if not self.__load_hint(seg_id, size):
+                    hints = self.__scan_segment(seg_id)
+                    size = os.path.getsize(self.__segment_path(seg_id))
+                    self.__write_hint(seg_id, size, hints)
+                self._sizes[seg_id] = size
+                self._maps[seg_id] = self.__map(seg_id)
+            self.__open_active(seg_ids[-1] + 1 if seg_ids else 1)
+        self._logger.info('AppendLog loaded %s keys from %s segments', len(self._index), len(seg_ids))
+
+    def __load_hint(self, seg_id: int, size: int) -> bool:
+        """ Load index entries of a segment from its hint file (lock must be held)
+
+        Args:
+            seg_id (int): Segment id
+            size (int): Segment size
+
+        Returns:
+            bool: False if hint file is missing or doesn't match segment
+        """
+        try:
+            with open(self.__hint_path(seg_id), 'rb') as hint_file:
+                data = hint_file.read()
+        except FileNotFoundError:
+            return False
+        if len(data) < _HINT_HEADER.size:
+            return False
+        magic, segment_size = _HINT_HEADER.unpack_from(data, 0)
+        if magic != _HINT_MAGIC or segment_size != size:
+            return False
+        pos = _HINT_HEADER.size
+        metadata_locations: List[Tuple[str, int, int]] = list()
+        while pos < len(data):
+            operation, key_length, offset, length = _HINT_ENTRY.unpack_from(data, pos)
+            pos += _HINT_ENTRY.size
+            key = data[pos:pos + key_length].decode('utf-8')
+            pos += key_length
+            if operation == _OP_SET:
+                self.__index_set(key, (seg_id, offset, length))
+            elif operation == _OP_DEL:
+                self.__index_delete(key)
+            else:
+                metadata_locations.append((key, offset, length))
+        if metadata_locations:
+            with open(self.__segment_path(seg_id), 'rb') as segment_file:
+                for name, offset, length in metadata_locations:
+                    self._metadata[name] = os.pread(segment_file.fileno(), length, offset)
+        return True
+
+    def __scan_segment(self, seg_id: int) -> List[Tuple[int, str, int, int]]:
+        """ Load index entries of a segment by reading all its frames, torn tail is truncated (lock must be held)
+
+        Args:
+            seg_id (int): Segment id
+
+        Returns:
+            List[Tuple[int, str, int, int]]: Hint entries of segment
+        """
+        hints: List[Tuple[int, str, int, int]] = list()
+        path = self.__segment_path(seg_id)
+        with open(path, 'rb') as segment_file:
+            data = segment_file.read()
+        pos = _SEGMENT_HEADER.size
+        while pos + _FRAME_HEADER.size <= len(data):
+            crc, length = _FRAME_HEADER.unpack_from(data, pos)
+            payload_start = pos + _FRAME_HEADER.size
+            payload_end = payload_start + length
+            if payload_end > len(data) or zlib.crc32(data[payload_start:payload_end]) != crc:
+                break
+            entry_pos = payload_start
+            while entry_pos < payload_end:
+                operation, key_length, value_length = _ENTRY_HEADER.unpack_from(data, entry_pos)
+                entry_pos += _ENTRY_HEADER.size
+                key = data[entry_pos:entry_pos + key_length].decode('utf-8')
+                entry_pos += key_length
+                hints.append((operation, key, entry_pos, value_length))
+                if operation == _OP_SET:
+                    self.__index_set(key, (seg_id, entry_pos, value_length))
+                elif operation == _OP_DEL:
+                    self.__index_delete(key)
+                else:
+                    self._metadata[key] = data[entry_pos:entry_pos + value_length]
+                entry_pos += value_length
+            pos = payload_end
+        if pos < len(data):
+            self._logger.warning('Truncate torn segment %s tail (%s bytes)', seg_id, len(data) - pos)
+            os.truncate(path, pos)
+        return hints
+
+    def __remove_segment(self, seg_id: int) -> None:
+        """ Remove segment & hint files
+
+        Args:
+            seg_id (int): Segment id
+
+        Returns:
+            None
+        """
+        for path in (self.__segment_path(seg_id), self.__hint_path(seg_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __compact(self) -> None:
+        """ Blocking compaction, run in compaction executor
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.__roll()
+            seg_ids = sorted(self._maps)
+            if not seg_ids:
+                return
+            maps = {seg_id: self._maps[seg_id] for seg_id in seg_ids}
+            snapshot = [(key, location) for key, location in self._index.items() if location[0] in maps]
+            # Active segment is empty after roll, all metadata are in sealed segments
+            metadata = dict(self._metadata)
+
+        # Sealed segments are immutable, live entries are copied without lock
+        target_id = seg_ids[-1]
+        tmp_path = self.__segment_path(target_id) + '.compact.tmp'
+        new_locations: List[_Location] = list()
+        hints: List[Tuple[int, str, int, int]] = list()
+        with open(tmp_path, 'wb') as segment_file:
+            segment_file.write(_SEGMENT_HEADER.pack(_SEGMENT_MAGIC, seg_ids[0]))
+            size = _SEGMENT_HEADER.size
+            payload = bytearray()
+            for key, (seg_id, offset, length) in snapshot:
+                key_bytes = key.encode('utf-8')
+                payload += _ENTRY_HEADER.pack(_OP_SET, len(key_bytes), length)
+                payload += key_bytes
+                value_offset = size + _FRAME_HEADER.size + len(payload)
+                new_locations.append((target_id, value_offset, length))
+                hints.append((_OP_SET, key, value_offset, length))
+                payload += maps[seg_id][offset:offset + length]
+                if len(payload) >= _COMPACTION_FRAME_SIZE:
+                    segment_file.write(_FRAME_HEADER.pack(zlib.crc32(payload), len(payload)) + payload)
+                    size += _FRAME_HEADER.size + len(payload)
+                    payload = bytearray()
+            for name, value in metadata.items():
+                name_bytes = name.encode('utf-8')
+                payload += _ENTRY_HEADER.pack(_OP_META, len(name_bytes), len(value))
+                payload += name_bytes
+                hints.append((_OP_META, name, size + _FRAME_HEADER.size + len(payload), len(value)))
+                payload += value
+            if payload:
+                segment_file.write(_FRAME_HEADER.pack(zlib.crc32(payload), len(payload)) + payload)
+                size += _FRAME_HEADER.size + len(payload)
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+        hint_tmp_path = self.__hint_path(target_id) + '.compact.tmp'
+        self.__write_hint(target_id, size, hints, hint_tmp_path)
+
+        with self._lock:
+            # Atomic switch, on crash after this point covered segments are removed on load
+            os.replace(tmp_path, self.__segment_path(target_id))
+            os.replace(hint_tmp_path, self.__hint_path(target_id))
+            for seg_id in seg_ids:
+                # Maps are not closed, memoryview returned by get_view may still use them
+                del self._maps[seg_id]
+                del self._sizes[seg_id]
+                del self._live[seg_id]
+                if seg_id != target_id:
+                    self.__remove_segment(seg_id)
+            self._maps[target_id] = self.__map(target_id)
+            self._sizes[target_id] = size
+            live = 0
+            for (key, old_location), new_location in zip(snapshot, new_locations):
+                # Entries written during compaction are newer, they're kept
+                if self._index.get(key) == old_location:
+                    self._index[key] = new_location
+                    live += _ENTRY_HEADER.size + len(key) + new_location[2]
+            self._live[target_id] = live
+        self._logger.info('AppendLog compacted %s segments in segment %s (%s bytes)', len(seg_ids), target_id, size)
+
+    def __del__(self):
+        self._logger.info('Closed AppendLog')
+        if hasattr(self, '_active_file'):
+            self._active_file.close()
@@ -4,14 +4,39 @@
 
 from logging import Logger
 from abc import ABCMeta, abstractmethod
+from typing import Dict, List, Tuple, Optional
 
 from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import StoreKeyNotFound
+from tonga.stores.manager.errors import UninitializedStore
 
 __all__ = [
-    'BasePersistency'
+    'BasePersistency',
+    'prefix_upper_bound',
 ]
 
 
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """ Return the smallest key greater than all keys starting with prefix
+
+    Keys are ordered by code point (same order as UTF-8 bytes in RocksDB)
+
+    Args:
+        prefix (str): Keys prefix
+
+    Returns:
+        Optional[str]: Exclusive upper bound, None if prefix has no upper bound
+    """
+    prefix = prefix.rstrip(chr(0x10ffff))
+    if not prefix:
+        return None
+    next_code = ord(prefix[-1]) + 1
+    if 0xd800 <= next_code <= 0xdfff:
+        # Surrogates can't be encoded in UTF-8, next encodable code point
+        next_code = 0xe000
+    return prefix[:-1] + chr(next_code)
+
+
 class BasePersistency(metaclass=ABCMeta):
     _initialize: bool = False
     _logger: Logger
@@ -82,3 +107,267 @@ class BasePersistency(metaclass=ABCMeta):
             None
         """
         raise NotImplementedError
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key
+
+        Missing keys are not in returned dict. Persistency override this method when backend can read many
+        keys in one call
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        values: Dict[str, bytes] = dict()
+        for key in keys:
+            try:
+                values[key] = await self.get(key)
+            except StoreKeyNotFound:
+                pass
+        return values
+
+    async def build_get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key while store is built (persistency is not initialized)
+
+        Used for read current values of built keys (ex: store indexes)
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._get_many(keys)
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, without initialize check
+
+        Persistency override this method with a direct read, default implementation reads each key as a one entry
+        range
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        values: Dict[str, bytes] = dict()
+        for key in keys:
+            values.update(await self._range(key, key + '\x00', False, 1))
+        return values
+
+    async def get_or_none(self, key: str) -> Optional[bytes]:
+        """ Get value by key, without raising StoreKeyNotFound on missing key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            Optional[bytes]: Value as bytes, None if key is missing
+        """
+        return (await self.get_many([key])).get(key)
+
+    async def exists(self, key: str) -> bool:
+        """ Return true if key exists, false otherwise
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bool
+        """
+        return await self.get_or_none(key) is not None
+
+    async def set_many(self, entries: Dict[str, bytes]) -> None:
+        """ Set many values & keys, in one write batch
+
+        Args:
+            entries (Dict[str, bytes]): Values as bytes by key
+
+        Returns:
+            None
+        """
+        await self.write_batch([(key, value, StoreRecordType.SET) for key, value in entries.items()])
+
+    async def delete_many(self, keys: List[str]) -> None:
+        """ Delete many values by key, in one write batch
+
+        Missing keys are ignored
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            None
+        """
+        await self.write_batch([(key, b'', StoreRecordType.DEL) for key in keys])
+
+    async def write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                          metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata atomically, in order
+
+        Delete operations on missing keys are ignored
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name (ex: changelog positioning), committed
+                                                   with operations
+
+        Returns:
+            None
+        """
+        if not self.is_initialize():
+            raise UninitializedStore
+        await self._write_batch(operations, metadata)
+
+    async def build_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                          metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of build operations & metadata while store is built (persistency is not initialized)
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        await self._build_batch_operations(operations, metadata)
+
+    async def _build_batch_operations(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                                      metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ This function is used for build DB by batch when store is not initialize
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        await self._write_batch(operations, metadata)
+
+    @abstractmethod
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata atomically, without initialize check
+
+        Abstract method
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name, available before persistency is initialized
+
+        Abstract method
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        raise NotImplementedError
+
+    async def set_metadata(self, name: str, value: bytes) -> None:
+        """ Set metadata value
+
+        While persistency is not initialized, metadata is written as a build operation
+
+        Args:
+            name (str): Metadata name
+            value (bytes): Metadata value
+
+        Returns:
+            None
+        """
+        if self.is_initialize():
+            await self._write_batch(list(), {name: value})
+        else:
+            await self._build_batch_operations(list(), {name: value})
+
+    async def scan(self, prefix: str = '', reverse: bool = False,
+                   limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key starts with prefix, ordered by key
+
+        Args:
+            prefix (str): Keys prefix, empty prefix returns all entries
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self.range(prefix or None, prefix_upper_bound(prefix), reverse, limit)
+
+    async def range(self, start: Optional[str] = None, end: Optional[str] = None, reverse: bool = False,
+                    limit: Optional[int] = None) -> List[Tuple[str, bytes]]:
+        """ Return entries whose key is in [start, end), ordered by key
+
+        Returned entries are a consistent snapshot of persistency when range was read
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        if not self.is_initialize():
+            raise UninitializedStore
+        if limit is not None and limit <= 0:
+            return list()
+        return await self._range(start, end, reverse, limit)
+
+    async def all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, in one full scan
+
+        Used when all keys are needed without their order (ex: Bloom filter load), this avoids a sort of all keys
+        on persistency without key order
+
+        Returns:
+            List[str]: Keys
+        """
+        if not self.is_initialize():
+            raise UninitializedStore
+        return await self._all_keys()
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, without initialize check
+
+        Persistency override this method with a keys only scan, default implementation reads all entries in one
+        range
+
+        Returns:
+            List[str]: Keys
+        """
+        return [key for key, _ in await self._range(None, None, False, None)]
+
+    @abstractmethod
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end), without initialize check
+
+        Abstract method
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        raise NotImplementedError
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" BloomFilterPersistency class
+
+In process Bloom filter in front of any persistency, reads of missing keys are answered from memory without
+reading wrapped persistency (mainly for disk backed persistency, RocksDB & shelve).
+"""
+
+import math
+from hashlib import blake2b
+from logging import getLogger
+from typing import Dict, List, Tuple, Optional
+
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import StoreKeyNotFound
+from tonga.stores.persistency.base import BasePersistency
+
+__all__ = [
+    'BloomFilter',
+    'BloomFilterPersistency',
+]
+
+
+class BloomFilter:
+    """ BloomFilter class
+
+    Probabilistic set of keys: a key never added is reported as missing, except with *false_positive_rate*
+    probability (while filter holds less than *expected_entries* keys). Keys can't be removed.
+
+    Attributes:
+        _nb_bits (int): Filter size in bits
+        _nb_hashes (int): Number of bits set by key
+        _bits (bytearray): Filter bits
+    """
+    _nb_bits: int
+    _nb_hashes: int
+    _bits: bytearray
+
+    def __init__(self, expected_entries: int, false_positive_rate: float = 0.01) -> None:
+        """ BloomFilter constructor
+
+        Args:
+            expected_entries (int): Number of keys filter is sized for
+            false_positive_rate (float): False positive probability once filter holds expected entries
+
+        Returns:
+            None
+        """
+        self._nb_bits = max(8, int(-expected_entries * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self._nb_hashes = max(1, round(self._nb_bits / max(1, expected_entries) * math.log(2)))
+        self._bits = bytearray((self._nb_bits + 7) // 8)
+
+    def __positions(self, key: str) -> List[int]:
+        """ Return filter bits of a key (double hashing)
+
+        Args:
+            key (str): Key
+
+        Returns:
+            List[int]: Bit positions
+        """
+        digest = blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], 'little')
+        second_hash = int.from_bytes(digest[8:], 'little') | 1
+        return [(first_hash + i * second_hash) % self._nb_bits for i in range(self._nb_hashes)]
+
+    def add(self, key: str) -> None:
+        """ Add a key in filter
+
+        Args:
+            key (str): Key
+
+        Returns:
+            None
+        """
+        for position in self.__positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(key))
+
+    def clear(self) -> None:
+        """ Remove all keys from filter
+
+        Returns:
+            None
+        """
+        self._bits = bytearray(len(self._bits))
+
+    def get_size(self) -> Tuple[int, int]:
+        """ Return filter size
+
+        Returns:
+            Tuple[int, int]: Number of bits & number of hashes by key
+        """
+        return self._nb_bits, self._nb_hashes
+
+
+class BloomFilterPersistency(BasePersistency):
+    """ BloomFilterPersistency class
+
+    Keys are added in filter on each write & on store build, deleted keys stay in filter (a deleted key costs
+    a wrapped persistency read, like a false positive). A persistency that already contains entries on startup
+    (disk backed persistency resumed from its stored positioning) has its keys loaded in filter on first read,
+    filter is bypassed until keys are loaded.
+
+    Attributes:
+        _persistency (BasePersistency): Wrapped persistency
+        _filter (BloomFilter): Keys filter
+        _loaded (bool): True once wrapped persistency keys are in filter
+        _loading (bool): True while wrapped persistency keys are loaded
+        _stats (Dict[str, int]): Negative (answered by filter) / false positive counters
+    """
+    _persistency: BasePersistency
+    _filter: BloomFilter
+    _loaded: bool
+    _loading: bool
+    _stats: Dict[str, int]
+
+    def __init__(self, persistency: BasePersistency, expected_entries: int,
+                 false_positive_rate: float = 0.01) -> None:
+        """ BloomFilterPersistency constructor
+
+        Args:
+            persistency (BasePersistency): Wrapped persistency
+            expected_entries (int): Number of keys filter is sized for
+            false_positive_rate (float): False positive probability once filter holds expected entries
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._persistency = persistency
+        self._filter = BloomFilter(expected_entries, false_positive_rate)
+        self._loaded = False
+        self._loading = False
+        self._stats = dict()
+        self.reset_stats()
+
+    def get_persistency(self) -> BasePersistency:
+        """ Return wrapped persistency
+
+        Returns:
+            BasePersistency: Wrapped persistency
+        """
+        return self._persistency
+
+    def is_initialize(self) -> bool:
+        """ Return true if wrapped persistency is initialized, false otherwise
+
+        Returns:
+            bool
+        """
+        return self._persistency.is_initialize()
+
+    def _set_initialize(self) -> None:
+        """ Set wrapped persistency initialize flag to true
+
+        Returns:
+            None
+        """
+        self._persistency.__getattribute__('_set_initialize').__call__()
+
+    async def __load(self) -> None:
+        """ Add all wrapped persistency keys in filter, read in one keys only scan
+
+        Returns:
+            None
+        """
+        keys = await self._persistency.all_keys()
+        for key in keys:
+            self._filter.add(key)
+        self._loaded = True
+        self._logger.info('Bloom filter loaded %s keys', len(keys))
+
+    async def __may_contain(self, key: str) -> bool:
+        """ Return false if key is surely missing in wrapped persistency
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bool
+        """
+        if not self._loaded:
+            if self._loading or not self._persistency.is_initialize():
+                return True
+            self._loading = True
+            try:
+                await self.__load()
+            finally:
+                self._loading = False
+        if key in self._filter:
+            return True
+        self._stats['negatives'] += 1
+        return False
+
+    async def get(self, key: str) -> bytes:
+        """ Get value by key, missing keys are answered by filter when possible
+
+        Args:
+            key (str): Key entry as string
+
+        Raises:
+            StoreKeyNotFound: Key is missing
+
+        Returns:
+            bytes: return value as bytes
+        """
+        if not await self.__may_contain(key):
+            raise StoreKeyNotFound
+        try:
+            return await self._persistency.get(key)
+        except StoreKeyNotFound:
+            self._stats['false_positives'] += 1
+            raise
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, keys missing in filter are not read in wrapped persistency
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        maybe_keys = [key for key in keys if await self.__may_contain(key)]
+        if not maybe_keys:
+            return dict()
+        values = await self._persistency.get_many(maybe_keys)
+        self._stats['false_positives'] += len(maybe_keys) - len(values)
+        return values
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in wrapped persistency, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        maybe_keys = [key for key in keys if await self.__may_contain(key)]
+        if not maybe_keys:
+            return dict()
+        return await self._persistency.build_get_many(maybe_keys)
+
+    async def set(self, key: str, value: bytes) -> None:
+        """ Add key in filter, then set value & key in wrapped persistency
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        self._filter.add(key)
+        await self._persistency.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        """ Delete value by key in wrapped persistency (key stays in filter)
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        await self._persistency.delete(key)
+
+    async def _build_operations(self, key: str, value: bytes, operation_type: StoreRecordType) -> None:
+        """ This function is used for build DB when store is not initialize
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+            operation_type (StoreRecordType): Operation type (SET or DEL)
+
+        Returns:
+            None
+        """
+        if operation_type == StoreRecordType.SET:
+            self._filter.add(key)
+        await self._persistency.__getattribute__('_build_operations').__call__(key, value, operation_type)
+
+    async def _build_batch_operations(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                                      metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Add set keys in filter, then build DB by batch in wrapped persistency
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        self.__add_set_keys(operations)
+        await self._persistency.__getattribute__('_build_batch_operations').__call__(operations, metadata)
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Add set keys in filter, then apply a batch of operations & metadata in wrapped persistency
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        self.__add_set_keys(operations)
+        await self._persistency.__getattribute__('_write_batch').__call__(operations, metadata)
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name in wrapped persistency
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return await self._persistency.get_metadata(name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end) in wrapped persistency
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self._persistency.__getattribute__('_range').__call__(start, end, reverse, limit)
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, from wrapped persistency
+
+        Returns:
+            List[str]: Keys
+        """
+        return await self._persistency.all_keys()
+
+    def get_stats(self) -> Dict[str, int]:
+        """ Return filter counters
+
+        Returns:
+            Dict[str, int]: negatives, false_positives, bits, hashes
+        """
+        stats = self._stats.copy()
+        stats['bits'], stats['hashes'] = self._filter.get_size()
+        return stats
+
+    def reset_stats(self) -> None:
+        """ Reset negative / false positive counters
+
+        Returns:
+            None
+        """
+        self._stats = {
+            'negatives': 0,
+            'false_positives': 0,
+        }
+
+    def __add_set_keys(self, operations: List[Tuple[str, bytes, StoreRecordType]]) -> None:
+        """ Add keys of set operations in filter
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+
+        Returns:
+            None
+        """
+        for key, _, operation_type in operations:
+            if operation_type == StoreRecordType.SET:
+                self._filter.add(key)
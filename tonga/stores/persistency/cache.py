@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" CachedPersistency class
+
+In process LRU read cache in front of any persistency (mainly for disk backed persistency, RocksDB & shelve).
+Cache is bounded by bytes (keys & values size), entries are invalidated on each write.
+"""
+
+from collections import OrderedDict
+from logging import getLogger
+from typing import Dict, List, Tuple, Optional
+
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.persistency.base import BasePersistency
+
+__all__ = [
+    'CachedPersistency'
+]
+
+
+class CachedPersistency(BasePersistency):
+    """ CachedPersistency class
+
+    Reads are served from cache when possible, misses are read in wrapped persistency & cached. Writes go to wrapped
+    persistency & invalidate cached entries (no write through). Range reads are not cached.
+
+    Attributes:
+        _persistency (BasePersistency): Wrapped persistency
+        _max_bytes (int): Max cache size in bytes (sum of keys & values size)
+        _cache (OrderedDict[str, bytes]): Cached entries, least recently used first
+        _size (int): Current cache size in bytes
+        _invalidations (int): Invalidations counter, a read started before an invalidation is not cached
+        _stats (Dict[str, int]): Hit / miss / eviction counters
+    """
+    _persistency: BasePersistency
+    _max_bytes: int
+    _cache: 'OrderedDict[str, bytes]'
+    _size: int
+    _invalidations: int
+    _stats: Dict[str, int]
+
+    def __init__(self, persistency: BasePersistency, max_bytes: int) -> None:
+        """ CachedPersistency constructor
+
+        Args:
+            persistency (BasePersistency): Wrapped persistency
+            max_bytes (int): Max cache size in bytes
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._persistency = persistency
+        self._max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._size = 0
+        self._invalidations = 0
+        self._stats = dict()
+        self.reset_stats()
+
+    def get_persistency(self) -> BasePersistency:
+        """ Return wrapped persistency
+
+        Returns:
+            BasePersistency: Wrapped persistency
+        """
+        return self._persistency
+
+    def is_initialize(self) -> bool:
+        """ Return true if wrapped persistency is initialized, false otherwise
+
+        Returns:
+            bool
+        """
+        return self._persistency.is_initialize()
+
+    def _set_initialize(self) -> None:
+        """ Set wrapped persistency initialize flag to true
+
+        Returns:
+            None
+        """
+        self._persistency.__getattribute__('_set_initialize').__call__()
+
+    async def get(self, key: str) -> bytes:
+        """ Get value by key, from cache if possible
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self._stats['misses'] += 1
+        else:
+            self._cache.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+        invalidations = self._invalidations
+        value = await self._persistency.get(key)
+        if invalidations == self._invalidations:
+            self.__put(key, value)
+        return value
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, cache misses are read in one wrapped persistency call
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        values: Dict[str, bytes] = dict()
+        missing: List[str] = list()
+        for key in keys:
+            try:
+                values[key] = self._cache[key]
+            except KeyError:
+                missing.append(key)
+            else:
+                self._cache.move_to_end(key)
+        self._stats['hits'] += len(values)
+        self._stats['misses'] += len(missing)
+
+        if missing:
+            invalidations = self._invalidations
+            read_values = await self._persistency.get_many(missing)
+            if invalidations == self._invalidations:
+                for key, value in read_values.items():
+                    self.__put(key, value)
+            values.update(read_values)
+        return values
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in wrapped persistency, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._persistency.build_get_many(keys)
+
+    async def set(self, key: str, value: bytes) -> None:
+        """ Set value & key in wrapped persistency, invalidate cached entry
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        self.__invalidate(key)
+        try:
+            await self._persistency.set(key, value)
+        finally:
+            self.__invalidate(key)
+
+    async def delete(self, key: str) -> None:
+        """ Delete value by key in wrapped persistency, invalidate cached entry
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        self.__invalidate(key)
+        try:
+            await self._persistency.delete(key)
+        finally:
+            self.__invalidate(key)
+
+    async def _build_operations(self, key: str, value: bytes, operation_type: StoreRecordType) -> None:
+        """ This function is used for build DB when store is not initialize
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+            operation_type (StoreRecordType): Operation type (SET or DEL)
+
+        Returns:
+            None
+        """
+        self.__invalidate(key)
+        try:
+            await self._persistency.__getattribute__('_build_operations').__call__(key, value, operation_type)
+        finally:
+            self.__invalidate(key)
+
+    async def _build_batch_operations(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                                      metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Build DB by batch in wrapped persistency, invalidate cached entries
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        for key, _, _ in operations:
+            self.__invalidate(key)
+        try:
+            await self._persistency.__getattribute__('_build_batch_operations').__call__(operations, metadata)
+        finally:
+            for key, _, _ in operations:
+                self.__invalidate(key)
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata in wrapped persistency, invalidate cached entries
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        for key, _, _ in operations:
+            self.__invalidate(key)
+        try:
+            await self._persistency.__getattribute__('_write_batch').__call__(operations, metadata)
+        finally:
+            for key, _, _ in operations:
+                self.__invalidate(key)
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name in wrapped persistency (not cached)
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return await self._persistency.get_metadata(name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end) in wrapped persistency (not cached)
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self._persistency.__getattribute__('_range').__call__(start, end, reverse, limit)
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, from wrapped persistency
+
+        Returns:
+            List[str]: Keys
+        """
+        return await self._persistency.all_keys()
+
+    def get_stats(self) -> Dict[str, int]:
+        """ Return cache counters
+
+        Returns:
+            Dict[str, int]: hits, misses, evictions, entries, bytes
+        """
+        stats = self._stats.copy()
+        stats['entries'] = len(self._cache)
+        stats['bytes'] = self._size
+        return stats
+
+    def reset_stats(self) -> None:
+        """ Reset hit / miss / eviction counters
+
+        Returns:
+            None
+        """
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def clear(self) -> None:
+        """ Remove all cached entries
+
+        Returns:
+            None
+        """
+        self._invalidations += 1
+        self._cache.clear()
+        self._size = 0
+
+    def __put(self, key: str, value: bytes) -> None:
+        """ Cache an entry, evict least recently used entries while cache is too large
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        entry_size = len(key) + len(value)
+        if entry_size > self._max_bytes:
+            return
+        old_value = self._cache.pop(key, None)
+        if old_value is not None:
+            self._size -= len(key) + len(old_value)
+        self._cache[key] = value
+        self._size += entry_size
+        while self._size > self._max_bytes:
+            evicted_key, evicted_value = self._cache.popitem(last=False)
+            self._size -= len(evicted_key) + len(evicted_value)
+            self._stats['evictions'] += 1
+
+    def __invalidate(self, key: str) -> None:
+        """ Remove a cached entry
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        self._invalidations += 1
+        value = self._cache.pop(key, None)
+        if value is not None:
+            self._size -= len(key) + len(value)
@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" CompactMemoryPersistency class
+
+Memory persistency for large stores (ex: global stores with tens of millions of small entries), without one Python
+object per key & per value.
+
+Keys & values are packed in an arena made of fixed size chunks (bytearray never resized, so memoryview returned by
+get_view stay valid). Entries are described by parallel arrays (key offset / length, value offset / length, hash),
+an open addressing table (linear probing) maps a key hash to its entry. Arena is append only: a key is stored once
+& reused by following sets, a new value is appended & the previous one becomes garbage. The arena is compacted when
+garbage is larger than live data.
+"""
+
+from array import array
+from logging import getLogger
+from typing import Dict, List, Tuple, Optional
+
+from tonga.stores.errors import StoreKeyNotFound
+from tonga.stores.manager.errors import UninitializedStore
+from tonga.stores.persistency.errors import UnknownOperationType
+from tonga.stores.persistency.base import BasePersistency
+from tonga.models.structs.store_record_type import StoreRecordType
+
+__all__ = [
+    'CompactMemoryPersistency'
+]
+
+_EMPTY = 0
+_DELETED = -1
+_MAX_LOAD = 0.7
+
+
+class CompactMemoryPersistency(BasePersistency):
+    """ Compact memory persistency
+
+    Attributes:
+        _chunk_size (int): Arena chunk size in bytes (bigger entries get their own chunk)
+        _chunks (List[bytearray]): Arena chunks
+        _tail (int): Write position in last chunk
+        _key_offsets (array): Key arena offset by entry id
+        _key_lengths (array): Key length by entry id
+        _value_offsets (array): Value arena offset by entry id
+        _value_lengths (array): Value length by entry id
+        _hashes (array): Key hash by entry id
+        _slots (array): Open addressing table (entry id + 1, 0 for empty, -1 for deleted)
+        _free (array): Free entry ids
+        _order (Optional[List[int]]): Entry ids sorted by key, rebuilt on first range read after a key was added or
+                                      removed
+        _metadata (Dict[str, bytes]): Metadata values by name
+    """
+    _chunk_size: int
+    _chunks: List[bytearray]
+    _tail: int
+    _key_offsets: array
+    _key_lengths: array
+    _value_offsets: array
+    _value_lengths: array
+    _hashes: array
+    _slots: array
+    _free: array
+    _count: int
+    _used_slots: int
+    _live_bytes: int
+    _garbage_bytes: int
+    _order: Optional[List[int]]
+    _metadata: Dict[str, bytes]
+
+    def __init__(self, chunk_size: int = 1024 * 1024, initial_capacity: int = 1024):
+        """ CompactMemoryPersistency constructor
+
+        Args:
+            chunk_size (int): Arena chunk size in bytes
+            initial_capacity (int): Initial size of open addressing table (rounded up to a power of two)
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._chunk_size = chunk_size
+        self._chunks = list()
+        self._tail = chunk_size
+
+        self._key_offsets = array('q')
+        self._key_lengths = array('I')
+        self._value_offsets = array('q')
+        self._value_lengths = array('I')
+        self._hashes = array('q')
+        self._free = array('q')
+
+        capacity = 8
+        while capacity < initial_capacity:
+            capacity *= 2
+        self._slots = array('i', bytes(4 * capacity))
+        self._count = 0
+        self._used_slots = 0
+        self._live_bytes = 0
+        self._garbage_bytes = 0
+        self._order = None
+        self._metadata = dict()
+
+        self._initialize = False
+
+    async def get(self, key: str) -> bytes:
+        """ Get value by key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        if self._initialize:
+            return bytes(self.__get_view(key))
+        raise UninitializedStore
+
+    async def get_view(self, key: str) -> memoryview:
+        """ Get value by key without copy, value is a view on arena (must not be modified)
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            memoryview: value view
+        """
+        if self._initialize:
+            return self.__get_view(key)
+        raise UninitializedStore
+
+    async def set(self, key: str, value: bytes) -> None:
+        """ Set value & key
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        if self._initialize:
+            self.__set(key, value)
+        else:
+            raise UninitializedStore
+
+    async def delete(self, key: str) -> None:
+        """ Delete value by key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        if self._initialize:
+            if not self.__delete(key):
+                self._logger.debug('Fail to delete %s, key not found', key)
+                raise StoreKeyNotFound
+        else:
+            raise UninitializedStore
+
+    async def _build_operations(self, key: str, value: bytes, operation_type: StoreRecordType) -> None:
+        """ This function is used for build DB when store is not initialize
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+            operation_type (StoreRecordType): Operation type (SET or DEL)
+
+        Returns:
+            None
+        """
+        if operation_type == StoreRecordType.SET:
+            self.__set(key, value)
+        elif operation_type == StoreRecordType.DEL:
+            if not self.__delete(key):
+                self._logger.debug('Fail build operation delete %s, key not found', key)
+                raise StoreKeyNotFound
+        else:
+            raise UnknownOperationType
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._initialize:
+            return await self._get_many(keys)
+        raise UninitializedStore
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        values: Dict[str, bytes] = dict()
+        for key in keys:
+            entry = self.__find(key.encode('utf-8'))[0]
+            if entry >= 0:
+                values[key] = bytes(self.__view(self._value_offsets[entry], self._value_lengths[entry]))
+        return values
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata, without initialize check
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+                raise UnknownOperationType
+        for key, value, operation_type in operations:
+            if operation_type == StoreRecordType.SET:
+                self.__set(key, value)
+            else:
+                self.__delete(key)
+        if metadata:
+            self._metadata.update(metadata)
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return self._metadata.get(name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end), without initialize check
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        if self._order is None:
+            self._order = sorted((value - 1 for value in self._slots if value > 0), key=self.__key_bytes)
+        order = self._order
+        low = 0 if start is None else self.__bisect(order, start.encode('utf-8'))
+        high = len(order) if end is None else self.__bisect(order, end.encode('utf-8'))
+        if limit is not None:
+            if reverse:
+                low = max(low, high - limit)
+            else:
+                high = min(high, low + limit)
+        entries = order[low:high]
+        if reverse:
+            entries.reverse()
+        return [(self.__key_bytes(entry).decode('utf-8'),
+                 bytes(self.__view(self._value_offsets[entry], self._value_lengths[entry]))) for entry in entries]
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        """ Return memory footprint (in bytes)
+
+        Returns:
+            Dict[str, int]: entries, arena_allocated, arena_live, arena_garbage, index, total
+        """
+        arena_allocated = sum(len(chunk) for chunk in self._chunks)
+        index = sum(column.buffer_info()[1] * column.itemsize for column in
+                    (self._key_offsets, self._key_lengths, self._value_offsets, self._value_lengths, self._hashes,
+                     self._slots, self._free))
+        return {
+            'entries': self._count,
+            'arena_allocated': arena_allocated,
+            'arena_live': self._live_bytes,
+            'arena_garbage': self._garbage_bytes,
+            'index': index,
+            'total': arena_allocated + index,
+        }
+
+    def __get_view(self, key: str) -> memoryview:
+        """ Return value view by key
+
+        Args:
+            key (str): Key entry as string
+
+        Raises:
+            StoreKeyNotFound: raised when key doesn't exist
+
+        Returns:
+            memoryview: value view
+        """
+        entry = self.__find(key.encode('utf-8'))[0]
+        if entry < 0:
+            self._logger.debug('Fail to get %s, key not found', key)
+            raise StoreKeyNotFound
+        return self.__view(self._value_offsets[entry], self._value_lengths[entry])
+
+    def __set(self, key: str, value: bytes) -> None:
+        """ Set value & key
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        key_bytes = key.encode('utf-8')
+        entry, slot, key_hash = self.__find(key_bytes)
+        if entry >= 0:
+            # Key is reused, only value is appended
+            self._garbage_bytes += self._value_lengths[entry]
+            self._live_bytes += len(value) - self._value_lengths[entry]
+            self._value_offsets[entry] = self.__append(value)
+            self._value_lengths[entry] = len(value)
+            self.__maybe_compact()
+            return
+
+        if self._free:
+            entry = self._free.pop()
+            self._key_offsets[entry] = self.__append(key_bytes)
+            self._key_lengths[entry] = len(key_bytes)
+            self._value_offsets[entry] = self.__append(value)
+            self._value_lengths[entry] = len(value)
+            self._hashes[entry] = key_hash
+        else:
+            entry = len(self._hashes)
+            self._key_offsets.append(self.__append(key_bytes))
+            self._key_lengths.append(len(key_bytes))
+            self._value_offsets.append(self.__append(value))
+            self._value_lengths.append(len(value))
+            self._hashes.append(key_hash)
+        if self._slots[slot] == _EMPTY:
+            self._used_slots += 1
+        self._slots[slot] = entry + 1
+        self._count += 1
+        self._live_bytes += len(key_bytes) + len(value)
+        self._order = None
+        if self._used_slots > len(self._slots) * _MAX_LOAD:
+            self.__resize()
+
+    def __delete(self, key: str) -> bool:
+        """ Delete value by key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bool: False if key doesn't exist
+        """
+        entry, slot, _ = self.__find(key.encode('utf-8'))
+        if entry < 0:
+            return False
+        self._slots[slot] = _DELETED
+        size = self._key_lengths[entry] + self._value_lengths[entry]
+        self._live_bytes -= size
+        self._garbage_bytes += size
+        self._key_lengths[entry] = 0
+        self._value_lengths[entry] = 0
+        self._hashes[entry] = 0
+        self._free.append(entry)
+        self._count -= 1
+        self._order = None
+        self.__maybe_compact()
+        return True
+
+    def __find(self, key_bytes: bytes) -> Tuple[int, int, int]:
+        """ Find key in open addressing table
+
+        Args:
+            key_bytes (bytes): Key as bytes
+
+        Returns:
+            Tuple[int, int, int]: (entry id or -1, slot of entry or slot where key can be inserted, key hash)
+        """
+        key_hash = hash(key_bytes)
+        slots = self._slots
+        mask = len(slots) - 1
+        slot = key_hash & mask
+        insert_slot = -1
+        while True:
+            value = slots[slot]
+            if value == _EMPTY:
+                return -1, slot if insert_slot < 0 else insert_slot, key_hash
+            if value == _DELETED:
+                if insert_slot < 0:
+                    insert_slot = slot
+            else:
+                entry = value - 1
+                if (self._hashes[entry] == key_hash and self._key_lengths[entry] == len(key_bytes) and
+                        self.__view(self._key_offsets[entry], len(key_bytes)) == key_bytes):
+                    return entry, slot, key_hash
+            slot = (slot + 1) & mask
+
+    def __resize(self) -> None:
+        """ Rebuild open addressing table (drops deleted slots, doubles capacity when needed)
+
+        Returns:
+            None
+        """
+        capacity = len(self._slots)
+        while self._count > capacity / 2:
+            capacity *= 2
+        slots = array('i', bytes(4 * capacity))
+        mask = capacity - 1
+        for value in self._slots:
+            if value > 0:
+                slot = self._hashes[value - 1] & mask
+                while slots[slot] != _EMPTY:
+                    slot = (slot + 1) & mask
+                slots[slot] = value
+        self._slots = slots
+        self._used_slots = self._count
+
+    def __append(self, data: bytes) -> int:
+        """ Append data in arena
+
+        Args:
+            data (bytes): Data to append
+
+        Returns:
+            int: Data offset in arena
+        """
+        size = len(data)
+        chunk_size = self._chunk_size
+        if size > chunk_size:
+            # Big entry gets its own chunk, next data starts a new chunk
+            self._chunks.append(bytearray(data))
+            self._tail = chunk_size
+            return (len(self._chunks) - 1) * chunk_size
+        if self._tail + size > chunk_size:
+            self._chunks.append(bytearray(chunk_size))
+            self._tail = 0
+        offset = self._tail
+        self._chunks[-1][offset:offset + size] = data
+        self._tail = offset + size
+        return (len(self._chunks) - 1) * chunk_size + offset
+
+    def __view(self, offset: int, length: int) -> memoryview:
+        """ Return view on arena
+
+        Args:
+            offset (int): Data offset in arena
+            length (int): Data length
+
+        Returns:
+            memoryview: data view
+        """
+        chunk_id, position = divmod(offset, self._chunk_size)
+        return memoryview(self._chunks[chunk_id])[position:position + length]
+
+    def __key_bytes(self, entry: int) -> bytes:
+        """ Return entry key as bytes
+
+        Args:
+            entry (int): Entry id
+
+        Returns:
+            bytes: Key as bytes
+        """
+        return bytes(self.__view(self._key_offsets[entry], self._key_lengths[entry]))
+
+    def __bisect(self, order: List[int], key_bytes: bytes) -> int:
+        """ Return position of first entry whose key is >= key_bytes in sorted entries
+
+        Args:
+            order (List[int]): Entry ids sorted by key
+            key_bytes (bytes): Key as bytes
+
+        Returns:
+            int: Position in order
+        """
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.__key_bytes(order[middle]) < key_bytes:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __maybe_compact(self) -> None:
+        """ Rewrite live keys & values in new chunks when garbage is larger than live data
+
+        Old chunks are released when no view uses them anymore
+
+        Returns:
+            None
+        """
+        if self._garbage_bytes < self._chunk_size or self._garbage_bytes < self._live_bytes:
+            return
+        chunks, self._chunks, self._tail = self._chunks, list(), self._chunk_size
+        chunk_size = self._chunk_size
+        for value in self._slots:
+            if value > 0:
+                entry = value - 1
+                for offsets, lengths in ((self._key_offsets, self._key_lengths),
+                                         (self._value_offsets, self._value_lengths)):
+                    chunk_id, position = divmod(offsets[entry], chunk_size)
+                    offsets[entry] = self.__append(chunks[chunk_id][position:position + lengths[entry]])
+        self._garbage_bytes = 0
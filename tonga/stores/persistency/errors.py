@@ -7,7 +7,8 @@
 
 __all__ = [
     'UnknownOperationType',
-    'RocksDBErrors'
+    'RocksDBErrors',
+    'SQLiteErrors',
 ]
 
 
@@ -23,3 +24,10 @@ class RocksDBErrors(Exception):
 
     This error was raised when operation type was unknown
     """
+
+
+class SQLiteErrors(Exception):
+    """SQLiteErrors
+
+    This error was raised when SQLite fails to open database or to write
+    """
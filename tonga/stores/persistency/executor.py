@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" PersistencyExecutor class
+
+Runs blocking persistency calls (RocksDB, shelve) out of event loop thread, in a dedicated & bounded thread pool.
+Each persistency has its own PersistencyExecutor, which limits its number of concurrent calls.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+__all__ = [
+    'PersistencyExecutor',
+    'get_persistency_thread_pool',
+]
+
+_PERSISTENCY_THREAD_POOL_MAX_WORKERS = 8
+
+_persistency_thread_pool: ThreadPoolExecutor = None
+
+
+def get_persistency_thread_pool() -> ThreadPoolExecutor:
+    """ Return thread pool shared by all persistency (created on first call)
+
+    Returns:
+        ThreadPoolExecutor: Persistency thread pool
+    """
+    global _persistency_thread_pool  # pylint: disable=global-statement
+    if _persistency_thread_pool is None:
+        _persistency_thread_pool = ThreadPoolExecutor(max_workers=_PERSISTENCY_THREAD_POOL_MAX_WORKERS,
+                                                      thread_name_prefix='tonga-persistency')
+    return _persistency_thread_pool
+
+
+class PersistencyExecutor:
+    """ PersistencyExecutor class
+
+    Attributes:
+        _thread_pool (ThreadPoolExecutor): Thread pool where blocking calls are run
+        _max_concurrency (int): Max number of concurrent calls for this persistency
+        _semaphore (asyncio.Semaphore): Concurrency limiter (created on first call, in running loop)
+        _stats (Dict[str, float]): Queue wait & execution time counters
+    """
+    _thread_pool: ThreadPoolExecutor
+    _max_concurrency: int
+    _semaphore: asyncio.Semaphore
+    _stats: Dict[str, float]
+    _stats_lock: threading.Lock
+
+    def __init__(self, max_concurrency: int = 1, thread_pool: ThreadPoolExecutor = None) -> None:
+        """ PersistencyExecutor constructor
+
+        Args:
+            max_concurrency (int): Max number of concurrent calls for this persistency
+            thread_pool (ThreadPoolExecutor): Thread pool, if None the shared persistency thread pool is used
+
+        Returns:
+            None
+        """
+        if thread_pool is None:
+            self._thread_pool = get_persistency_thread_pool()
+        else:
+            self._thread_pool = thread_pool
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._stats_lock = threading.Lock()
+        self._stats = dict()
+        self.reset_stats()
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """ Run blocking function in thread pool & return its result
+
+        Args:
+            func (Callable[..., Any]): Blocking function
+            *args (Any): Function arguments
+
+        Returns:
+            Any: Function result (exception raised by function is raised again)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        submitted_at = time.monotonic()
+        async with self._semaphore:
+            return await asyncio.get_event_loop().run_in_executor(self._thread_pool, self.__timed_call,
+                                                                  submitted_at, func, args)
+
+    def __timed_call(self, submitted_at: float, func: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+        """ Call function & record its queue wait / execution time (run in thread pool)
+
+        Args:
+            submitted_at (float): Monotonic time when call was submitted
+            func (Callable[..., Any]): Blocking function
+            args (Tuple[Any, ...]): Function arguments
+
+        Returns:
+            Any: Function result
+        """
+        started_at = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            execution_time = time.monotonic() - started_at
+            queue_wait = started_at - submitted_at
+            with self._stats_lock:
+                self._stats['calls'] += 1
+                self._stats['queue_wait_total'] += queue_wait
+                self._stats['queue_wait_max'] = max(self._stats['queue_wait_max'], queue_wait)
+                self._stats['execution_total'] += execution_time
+                self._stats['execution_max'] = max(self._stats['execution_max'], execution_time)
+
+    def get_stats(self) -> Dict[str, float]:
+        """ Return queue wait & execution time counters (in seconds)
+
+        Returns:
+            Dict[str, float]: calls, queue_wait_total, queue_wait_max, execution_total, execution_max
+        """
+        with self._stats_lock:
+            return self._stats.copy()
+
+    def reset_stats(self) -> None:
+        """ Reset queue wait & execution time counters
+
+        Returns:
+            None
+        """
+        with self._stats_lock:
+            self._stats = {
+                'calls': 0,
+                'queue_wait_total': 0.0,
+                'queue_wait_max': 0.0,
+                'execution_total': 0.0,
+                'execution_max': 0.0,
+            }
@@ -2,14 +2,16 @@
 # coding: utf-8
 # Copyright (c) Qotto, 2019
 
+from itertools import islice
 from logging import getLogger
 
-from typing import Dict
+from typing import Dict, List, Tuple, Optional
 
 from tonga.stores.errors import StoreKeyNotFound
 from tonga.stores.manager.errors import UninitializedStore
 from tonga.stores.persistency.errors import UnknownOperationType
 from tonga.stores.persistency.base import BasePersistency
+from tonga.stores.persistency.sorted_keys import SortedKeys
 from tonga.models.structs.store_record_type import StoreRecordType
 
 
@@ -19,10 +21,19 @@ __all__ = [
 
 
 class MemoryPersistency(BasePersistency):
+    """ Memory persistency
+
+    Values are kept in a dict, keys are also kept ordered (SortedKeys) & updated when a key is added or removed, so a
+    range read is a binary search plus a walk from the first key, without sorting keys
+    """
     _db: Dict[str, bytes]
+    _keys: SortedKeys
+    _metadata: Dict[str, bytes]
 
     def __init__(self):
         self._db = dict()
+        self._keys = SortedKeys()
+        self._metadata = dict()
         self._initialize = False
         self._logger = getLogger('tonga')
 
@@ -54,7 +65,7 @@ class MemoryPersistency(BasePersistency):
             None
         """
         if self._initialize:
-            self._db[key] = value
+            self.__set(key, value)
         else:
             raise UninitializedStore
 
@@ -69,7 +80,7 @@ class MemoryPersistency(BasePersistency):
         """
         if self._initialize:
             try:
-                del self._db[key]
+                self.__delete(key)
             except (ValueError, KeyError, AttributeError) as err:
                 self._logger.exception('Fail to delete %s | Err: %s', key, err)
                 raise StoreKeyNotFound
@@ -88,12 +99,121 @@ class MemoryPersistency(BasePersistency):
             None
         """
         if operation_type == StoreRecordType.SET:
-            self._db[key] = value
+            self.__set(key, value)
         elif operation_type == StoreRecordType.DEL:
             try:
-                del self._db[key]
+                self.__delete(key)
             except (ValueError, KeyError, AttributeError) as err:
                 self._logger.exception('Fail build operation delete %s | Err: %s', key, err)
                 raise StoreKeyNotFound
         else:
             raise UnknownOperationType
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._initialize:
+            return await self._get_many(keys)
+        raise UninitializedStore
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return {key: self._db[key] for key in keys if key in self._db}
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata, without initialize check
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+                raise UnknownOperationType
+        for key, value, operation_type in operations:
+            if operation_type == StoreRecordType.SET:
+                self.__set(key, value)
+            elif key in self._db:
+                self.__delete(key)
+        if metadata:
+            self._metadata.update(metadata)
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return self._metadata.get(name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end), without initialize check
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return [(key, self._db[key]) for key in islice(self._keys.irange(start, end, reverse), limit)]
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, without initialize check
+
+        Returns:
+            List[str]: Keys
+        """
+        return list(self._db)
+
+    def __set(self, key: str, value: bytes) -> None:
+        """ Set value & key, add key in sorted keys if it's a new one
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        if key not in self._db:
+            self._keys.add(key)
+        self._db[key] = value
+
+    def __delete(self, key: str) -> None:
+        """ Delete value by key & remove key from sorted keys
+
+        Args:
+            key (str): Key entry as string
+
+        Raises:
+            KeyError: raised when key doesn't exist
+
+        Returns:
+            None
+        """
+        del self._db[key]
+        self._keys.discard(key)
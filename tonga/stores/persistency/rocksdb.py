@@ -3,10 +3,12 @@
 # Copyright (c) Qotto, 2019
 
 from logging import getLogger
+from typing import Dict, List, Tuple, Optional
 
 import pyrocksdb
 
 from tonga.stores.persistency.base import BasePersistency
+from tonga.stores.persistency.executor import PersistencyExecutor
 from tonga.models.structs.store_record_type import StoreRecordType
 from tonga.stores.errors import StoreKeyNotFound
 from tonga.stores.manager.errors import UninitializedStore
@@ -16,14 +18,22 @@ __all__ = [
     'RocksDBPersistency'
 ]
 
+# Metadata keys are prefixed by a byte never used in UTF-8, they're sorted after all entries & hidden from range reads
+_METADATA_PREFIX = b'\xff'
+
 
 class RocksDBPersistency(BasePersistency):
+    """ RocksDB persistency
+
+    All RocksDB calls are blocking, they are run in persistency thread pool (see PersistencyExecutor)
+    """
     _db: pyrocksdb.DB
     _opts: pyrocksdb.Options
     _wopts: pyrocksdb.WriteOptions
     _ropts: pyrocksdb.ReadOptions
+    _executor: PersistencyExecutor
 
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, max_concurrency: int = 4):
         self._logger = getLogger('tonga')
         self._db = pyrocksdb.DB()
 
@@ -40,8 +50,18 @@ class RocksDBPersistency(BasePersistency):
         self._wopts = pyrocksdb.WriteOptions()
         self._ropts = pyrocksdb.ReadOptions()
 
+        self._executor = PersistencyExecutor(max_concurrency=max_concurrency)
+
         self._initialize = False
 
+    def get_executor(self) -> PersistencyExecutor:
+        """ Return persistency executor (queue wait & execution time are available in executor stats)
+
+        Returns:
+            PersistencyExecutor: persistency executor
+        """
+        return self._executor
+
     async def get(self, key: str) -> bytes:
         """ Get value by key
 
@@ -52,15 +72,7 @@ class RocksDBPersistency(BasePersistency):
             bytes: return value as bytes
         """
         if self._initialize:
-            try:
-                print(key)
-                blob: pyrocksdb.Blob = self._db.get(self._ropts, key.encode('utf-8'))
-                if not blob.status.ok():
-                    self._logger.error('Fail to get %s, info -> %s', key, blob.status.to_string())
-                    raise StoreKeyNotFound
-                return blob.data
-            except (ValueError, KeyError, AttributeError):
-                raise StoreKeyNotFound
+            return await self._executor.run(self.__get, key)
         raise UninitializedStore
 
     async def set(self, key: str, value: bytes) -> None:
@@ -74,10 +86,7 @@ class RocksDBPersistency(BasePersistency):
             None
         """
         if self._initialize:
-            s = self._db.put(self._wopts, key.encode('utf-8'), value)
-            if not s.ok():
-                self._logger.error('Fail to set %s, info -> %s', key, s.to_string())
-                raise RocksDBErrors
+            await self._executor.run(self.__put, key, value)
         else:
             raise UninitializedStore
 
@@ -91,14 +100,7 @@ class RocksDBPersistency(BasePersistency):
             None
         """
         if self._initialize:
-            try:
-                s = self._db.delete(self._wopts, key.encode('utf-8'))
-                print(s.to_string())
-                if not s.ok():
-                    self._logger.error('Fail to delete %s, info -> %s', key, s.to_string())
-                    raise RocksDBErrors
-            except (ValueError, KeyError, AttributeError):
-                raise StoreKeyNotFound
+            await self._executor.run(self.__delete, key)
         else:
             raise UninitializedStore
 
@@ -114,18 +116,247 @@ class RocksDBPersistency(BasePersistency):
             None
         """
         if operation_type == StoreRecordType.SET:
-            s = self._db.put(self._wopts, key.encode('utf-8'), value)
-            if not s.ok():
-                self._logger.error('Fail build operations set %s, info -> %s', key, s.to_string())
-                raise RocksDBErrors
+            await self._executor.run(self.__put, key, value)
         elif operation_type == StoreRecordType.DEL:
-            s = self._db.delete(self._wopts, key.encode('utf-8'))
-            if not s.ok():
-                self._logger.error('Fail build operations delete %s, info -> %s', key, s.to_string())
-                raise RocksDBErrors
+            await self._executor.run(self.__delete, key)
         else:
             raise UnknownOperationType
 
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._initialize:
+            return await self._get_many(keys)
+        raise UninitializedStore
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._executor.run(self.__get_many, keys)
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata atomically (RocksDB WriteBatch), without initialize check
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, written in the same WriteBatch
+
+        Returns:
+            None
+        """
+        batch = pyrocksdb.WriteBatch()
+        for key, value, operation_type in operations:
+            if operation_type == StoreRecordType.SET:
+                batch.put(key.encode('utf-8'), value)
+            elif operation_type == StoreRecordType.DEL:
+                batch.delete(key.encode('utf-8'))
+            else:
+                raise UnknownOperationType
+        if metadata:
+            for name, value in metadata.items():
+                batch.put(_METADATA_PREFIX + name.encode('utf-8'), value)
+        await self._executor.run(self.__write, batch)
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return await self._executor.run(self.__get_metadata, name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end) in one blocking call, without initialize check
+
+        Uses a RocksDB iterator, entries are read from the iterator implicit snapshot
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self._executor.run(self.__range, start, end, reverse, limit)
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, without initialize check
+
+        Returns:
+            List[str]: Keys
+        """
+        return await self._executor.run(self.__all_keys)
+
+    def __get(self, key: str) -> bytes:
+        """ Blocking get, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        try:
+            blob: pyrocksdb.Blob = self._db.get(self._ropts, key.encode('utf-8'))
+        except (ValueError, KeyError, AttributeError):
+            raise StoreKeyNotFound
+        if not blob.status.ok():
+            self._logger.debug('Fail to get %s, info -> %s', key, blob.status.to_string())
+            raise StoreKeyNotFound
+        return blob.data
+
+    def __put(self, key: str, value: bytes) -> None:
+        """ Blocking put, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        s = self._db.put(self._wopts, key.encode('utf-8'), value)
+        if not s.ok():
+            self._logger.error('Fail to set %s, info -> %s', key, s.to_string())
+            raise RocksDBErrors
+
+    def __delete(self, key: str) -> None:
+        """ Blocking delete, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        try:
+            s = self._db.delete(self._wopts, key.encode('utf-8'))
+        except (ValueError, KeyError, AttributeError):
+            raise StoreKeyNotFound
+        if not s.ok():
+            self._logger.error('Fail to delete %s, info -> %s', key, s.to_string())
+            raise RocksDBErrors
+
+    def __get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Blocking get many, run in persistency thread pool
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        values: Dict[str, bytes] = dict()
+        for key in keys:
+            blob: pyrocksdb.Blob = self._db.get(self._ropts, key.encode('utf-8'))
+            if blob.status.ok():
+                values[key] = blob.data
+        return values
+
+    def __write(self, batch: pyrocksdb.WriteBatch) -> None:
+        """ Blocking write batch, run in persistency thread pool
+
+        Args:
+            batch (pyrocksdb.WriteBatch): RocksDB write batch
+
+        Returns:
+            None
+        """
+        s = self._db.write(self._wopts, batch)
+        if not s.ok():
+            self._logger.error('Fail to write batch, info -> %s', s.to_string())
+            raise RocksDBErrors
+
+    def __get_metadata(self, name: str) -> Optional[bytes]:
+        """ Blocking get metadata, run in persistency thread pool
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        blob: pyrocksdb.Blob = self._db.get(self._ropts, _METADATA_PREFIX + name.encode('utf-8'))
+        if not blob.status.ok():
+            return None
+        return blob.data
+
+    def __range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Blocking range read, run in persistency thread pool
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        entries: List[Tuple[str, bytes]] = list()
+        it = self._db.iterator(self._ropts)
+        if not reverse:
+            if start is None:
+                it.seek_to_first()
+            else:
+                it.seek(start.encode('utf-8'))
+            while it.valid() and (limit is None or len(entries) < limit):
+                if it.key().startswith(_METADATA_PREFIX):
+                    break
+                key = it.key().decode('utf-8')
+                if end is not None and key >= end:
+                    break
+                entries.append((key, it.value()))
+                it.next()
+        else:
+            # Seek on first key >= end (or first metadata key), previous one is the last key of range
+            it.seek(_METADATA_PREFIX if end is None else end.encode('utf-8'))
+            if it.valid():
+                it.prev()
+            else:
+                it.seek_to_last()
+            while it.valid() and (limit is None or len(entries) < limit):
+                key = it.key().decode('utf-8')
+                if start is not None and key < start:
+                    break
+                entries.append((key, it.value()))
+                it.prev()
+        return entries
+
+    def __all_keys(self) -> List[str]:
+        """ Blocking keys only scan, run in persistency thread pool
+
+        Returns:
+            List[str]: Keys
+        """
+        keys: List[str] = list()
+        it = self._db.iterator(self._ropts)
+        it.seek_to_first()
+        while it.valid() and not it.key().startswith(_METADATA_PREFIX):
+            keys.append(it.key().decode('utf-8'))
+            it.next()
+        return keys
+
     def __del__(self):
         self._logger.info('Closed RocksDB')
         self._db.close()
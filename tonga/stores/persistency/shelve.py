@@ -4,8 +4,10 @@
 
 from logging import getLogger
 import shelve
+from typing import Dict, List, Tuple, Optional
 
 from tonga.stores.persistency.base import BasePersistency
+from tonga.stores.persistency.executor import PersistencyExecutor
 from tonga.models.structs.store_record_type import StoreRecordType
 from tonga.stores.errors import StoreKeyNotFound
 from tonga.stores.manager.errors import UninitializedStore
@@ -15,16 +17,36 @@ __all__ = [
     'ShelvePersistency'
 ]
 
+# Metadata values are kept in one reserved shelf entry (dict by name), hidden from range reads
+_METADATA_KEY = '\x00tonga.metadata'
+
 
 class ShelvePersistency(BasePersistency):
+    """ Shelve persistency
+
+    All shelve calls are blocking, they are run in persistency thread pool (see PersistencyExecutor). Shelve is not
+    thread safe, calls are never run concurrently. Write batch & metadata are written before one sync, dbm has no
+    transaction so a crash during sync may leave a partial batch.
+    """
     _db: shelve.DbfilenameShelf
+    _executor: PersistencyExecutor
 
     def __init__(self, db_path: str):
         self._logger = getLogger('tonga')
         self._db = shelve.open(db_path, writeback=True)
 
+        self._executor = PersistencyExecutor(max_concurrency=1)
+
         self._initialize = False
 
+    def get_executor(self) -> PersistencyExecutor:
+        """ Return persistency executor (queue wait & execution time are available in executor stats)
+
+        Returns:
+            PersistencyExecutor: persistency executor
+        """
+        return self._executor
+
     async def get(self, key: str) -> bytes:
         """ Get value by key
 
@@ -35,11 +57,7 @@ class ShelvePersistency(BasePersistency):
             bytes: return value as bytes
         """
         if self._initialize:
-            try:
-                return self._db[key]
-            except (ValueError, KeyError, AttributeError) as err:
-                self._logger.exception('Fail to get %s | Err: %s', key, err)
-                raise StoreKeyNotFound
+            return await self._executor.run(self.__get, key)
         raise UninitializedStore
 
     async def set(self, key: str, value: bytes) -> None:
@@ -53,7 +71,7 @@ class ShelvePersistency(BasePersistency):
             None
         """
         if self._initialize:
-            self._db[key] = value
+            await self._executor.run(self.__set, key, value)
         else:
             raise UninitializedStore
 
@@ -67,12 +85,7 @@ class ShelvePersistency(BasePersistency):
             None
         """
         if self._initialize:
-            try:
-                del self._db[key]
-            except (ValueError, KeyError, AttributeError) as err:
-
-                self._logger.exception('Fail to delete %s | Err: %s', key, err)
-                raise StoreKeyNotFound
+            await self._executor.run(self.__delete, key)
         else:
             raise UninitializedStore
 
@@ -88,16 +101,207 @@ class ShelvePersistency(BasePersistency):
             None
         """
         if operation_type == StoreRecordType.SET:
-            self._db[key] = value
+            await self._executor.run(self.__set, key, value)
         elif operation_type == StoreRecordType.DEL:
-            try:
-                del self._db[key]
-            except (ValueError, KeyError, AttributeError) as err:
-                self._logger.exception('Fail build operation delete %s | Err: %s', key, err)
-                raise StoreKeyNotFound
+            await self._executor.run(self.__delete, key)
         else:
             raise UnknownOperationType
 
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._initialize:
+            return await self._get_many(keys)
+        raise UninitializedStore
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._executor.run(self.__get_many, keys)
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata in one blocking call, without initialize check
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, synced with operations
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+                raise UnknownOperationType
+        await self._executor.run(self.__write_batch, operations, metadata)
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return await self._executor.run(self.__get_metadata, name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end) in one blocking call, without initialize check
+
+        Shelve (dbm) keys are not ordered, keys are sorted on each call
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self._executor.run(self.__range, start, end, reverse, limit)
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, without initialize check
+
+        Returns:
+            List[str]: Keys
+        """
+        return await self._executor.run(self.__all_keys)
+
+    def __get(self, key: str) -> bytes:
+        """ Blocking get, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        try:
+            return self._db[key]
+        except (ValueError, KeyError, AttributeError) as err:
+            self._logger.debug('Fail to get %s | Err: %s', key, err)
+            raise StoreKeyNotFound
+
+    def __set(self, key: str, value: bytes) -> None:
+        """ Blocking set, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        self._db[key] = value
+
+    def __delete(self, key: str) -> None:
+        """ Blocking delete, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        try:
+            del self._db[key]
+        except (ValueError, KeyError, AttributeError) as err:
+            self._logger.debug('Fail to delete %s | Err: %s', key, err)
+            raise StoreKeyNotFound
+
+    def __get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Blocking get many, run in persistency thread pool
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        values: Dict[str, bytes] = dict()
+        for key in keys:
+            value = self._db.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def __write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                      metadata: Optional[Dict[str, bytes]]) -> None:
+        """ Blocking write batch, run in persistency thread pool
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if operation_type == StoreRecordType.SET:
+                self._db[key] = value
+            else:
+                self._db.pop(key, None)
+        if metadata:
+            stored_metadata = dict(self._db.get(_METADATA_KEY, dict()))
+            stored_metadata.update(metadata)
+            self._db[_METADATA_KEY] = stored_metadata
+        self._db.sync()
+
+    def __get_metadata(self, name: str) -> Optional[bytes]:
+        """ Blocking get metadata, run in persistency thread pool
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        stored_metadata: Dict[str, bytes] = self._db.get(_METADATA_KEY, dict())
+        return stored_metadata.get(name)
+
+    def __range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Blocking range read, run in persistency thread pool
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        keys = sorted((key for key in self._db.keys() if (start is None or key >= start) and
+                       (end is None or key < end) and key != _METADATA_KEY), reverse=reverse)
+        if limit is not None:
+            keys = keys[:limit]
+        return [(key, self._db[key]) for key in keys]
+
+    def __all_keys(self) -> List[str]:
+        """ Blocking keys only scan, run in persistency thread pool
+
+        Returns:
+            List[str]: Keys
+        """
+        return [key for key in self._db.keys() if key != _METADATA_KEY]
+
     def __del__(self):
         self._logger.info('Closed ShelveDB')
         self._db.close()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" SortedKeys class
+
+Ordered set of keys kept sorted on each insert / remove, used by memory persistency range reads.
+
+Keys are stored in a list of sorted chunks (bounded size) & the max key of each chunk. An insert or a remove is a
+binary search on chunk max keys plus an insort in one chunk (O(log N + chunk size)), a range read is a binary search
+plus a walk from the first key, without sorting all keys.
+"""
+
+from bisect import bisect_left
+from typing import Iterator, List, Optional
+
+__all__ = [
+    'SortedKeys',
+]
+
+
+class SortedKeys:
+    """ SortedKeys class
+
+    Attributes:
+        _load (int): Chunk size, chunks are split at twice this size & merged with a neighbour under half this size
+        _chunks (List[List[str]]): Sorted chunks, all keys of a chunk are lower than keys of next chunk
+        _maxes (List[str]): Max key of each chunk
+        _len (int): Number of keys
+    """
+    _load: int
+    _chunks: List[List[str]]
+    _maxes: List[str]
+    _len: int
+
+    def __init__(self, load: int = 512) -> None:
+        """ SortedKeys constructor
+
+        Args:
+            load (int): Chunk size
+
+        Returns:
+            None
+        """
+        self._load = load
+        self._chunks = list()
+        self._maxes = list()
+        self._len = 0
+
+    def add(self, key: str) -> None:
+        """ Add a key, nothing is done if key is already in keys
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            index -= 1
+        chunk = self._chunks[index]
+        pos = bisect_left(chunk, key)
+        if pos < len(chunk) and chunk[pos] == key:
+            return
+        chunk.insert(pos, key)
+        self._maxes[index] = chunk[-1]
+        self._len += 1
+        if len(chunk) > 2 * self._load:
+            self._chunks[index:index + 1] = [chunk[:self._load], chunk[self._load:]]
+            self._maxes[index:index + 1] = [chunk[self._load - 1], chunk[-1]]
+
+    def discard(self, key: str) -> None:
+        """ Remove a key, nothing is done if key isn't in keys
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            return
+        chunk = self._chunks[index]
+        pos = bisect_left(chunk, key)
+        if chunk[pos] != key:
+            return
+        del chunk[pos]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[index]
+            del self._maxes[index]
+            return
+        self._maxes[index] = chunk[-1]
+        if len(chunk) < self._load // 2 and len(self._chunks) > 1:
+            # Merge small chunk with its previous chunk (next one for first chunk), then split it again if too big
+            if index == 0:
+                index = 1
+            merged = self._chunks[index - 1] + self._chunks[index]
+            self._chunks[index - 1:index + 1] = [merged]
+            self._maxes[index - 1:index + 1] = [merged[-1]]
+            if len(merged) > 2 * self._load:
+                half = len(merged) // 2
+                self._chunks[index - 1:index] = [merged[:half], merged[half:]]
+                self._maxes[index - 1:index] = [merged[half - 1], merged[-1]]
+
+    def irange(self, start: Optional[str] = None, end: Optional[str] = None,
+               reverse: bool = False) -> Iterator[str]:
+        """ Iterate keys in [start, end), ordered by key
+
+        Keys must not be added or removed while iterating
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true keys are returned in descending order
+
+        Returns:
+            Iterator[str]: Keys
+        """
+        if not self._chunks:
+            return
+        if reverse:
+            index = len(self._chunks) - 1 if end is None else bisect_left(self._maxes, end)
+            if index == len(self._chunks):
+                index -= 1
+            pos = len(self._chunks[index]) if end is None else bisect_left(self._chunks[index], end)
+            while index >= 0:
+                chunk = self._chunks[index]
+                for key in reversed(chunk[:pos]):
+                    if start is not None and key < start:
+                        return
+                    yield key
+                index -= 1
+                pos = len(self._chunks[index]) if index >= 0 else 0
+        else:
+            index = 0 if start is None else bisect_left(self._maxes, start)
+            if index == len(self._chunks):
+                return
+            pos = 0 if start is None else bisect_left(self._chunks[index], start)
+            while index < len(self._chunks):
+                chunk = self._chunks[index]
+                for key in chunk[pos:]:
+                    if end is not None and key >= end:
+                        return
+                    yield key
+                index += 1
+                pos = 0
+
+    def __iter__(self) -> Iterator[str]:
+        return self.irange()
+
+    def __len__(self) -> int:
+        return self._len
@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" SQLitePersistency class
+
+Durable persistency with bounded memory, built on standard library sqlite3. Database is opened in WAL mode,
+entries are stored in a *store* table & store metadata (ex: changelog positioning) in a *metadata* table, so data
+& metadata can be committed in the same transaction.
+"""
+
+import sqlite3
+from logging import getLogger
+from typing import Dict, List, Tuple, Optional
+
+from tonga.stores.persistency.base import BasePersistency
+from tonga.stores.persistency.executor import PersistencyExecutor
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.errors import StoreKeyNotFound
+from tonga.stores.manager.errors import UninitializedStore
+from tonga.stores.persistency.errors import UnknownOperationType, SQLiteErrors
+
+__all__ = [
+    'SQLitePersistency'
+]
+
+# Statements are constant strings, sqlite3 keeps them compiled in connection statement cache
+_SQL_CREATE_STORE = 'CREATE TABLE IF NOT EXISTS store (key TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID'
+_SQL_CREATE_METADATA = 'CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID'
+_SQL_GET = 'SELECT value FROM store WHERE key = ?'
+_SQL_SET = 'INSERT OR REPLACE INTO store (key, value) VALUES (?, ?)'
+_SQL_DELETE = 'DELETE FROM store WHERE key = ?'
+_SQL_GET_METADATA = 'SELECT value FROM metadata WHERE name = ?'
+_SQL_SET_METADATA = 'INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)'
+
+# Max number of bound parameters in one statement (SQLITE_MAX_VARIABLE_NUMBER default is 999)
+_MAX_VARIABLES = 500
+
+
+class SQLitePersistency(BasePersistency):
+    """ SQLite persistency
+
+    All sqlite calls are blocking, they are run in persistency thread pool (see PersistencyExecutor) one at a time.
+    While store is not initialized, build operations are grouped in transactions of *build_batch_size* operations.
+
+    Attributes:
+        _conn (sqlite3.Connection): SQLite connection (autocommit mode, transactions are explicit)
+        _executor (PersistencyExecutor): Persistency executor
+        _build_batch_size (int): Number of build operations per transaction
+        _build_pending (int): Number of build operations in current transaction
+    """
+    _conn: sqlite3.Connection
+    _executor: PersistencyExecutor
+    _build_batch_size: int
+    _build_pending: int
+
+    def __init__(self, db_path: str, build_batch_size: int = 1000, synchronous: str = 'NORMAL'):
+        """ SQLitePersistency constructor
+
+        Args:
+            db_path (str): Database file path
+            build_batch_size (int): Number of build operations per transaction
+            synchronous (str): SQLite synchronous pragma (NORMAL is durable in WAL mode, except on power loss)
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        try:
+            self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(f'PRAGMA synchronous={synchronous}')
+            self._conn.execute(_SQL_CREATE_STORE)
+            self._conn.execute(_SQL_CREATE_METADATA)
+        except sqlite3.Error as err:
+            self._logger.error('SQLite open fail -> %s', err)
+            raise SQLiteErrors
+
+        self._executor = PersistencyExecutor(max_concurrency=1)
+        self._build_batch_size = build_batch_size
+        self._build_pending = 0
+
+        self._initialize = False
+
+    def get_executor(self) -> PersistencyExecutor:
+        """ Return persistency executor (queue wait & execution time are available in executor stats)
+
+        Returns:
+            PersistencyExecutor: persistency executor
+        """
+        return self._executor
+
+    def _set_initialize(self) -> None:
+        """ Commit pending build operations & set persistency initialize flag to true
+
+        Returns:
+            None
+        """
+        self.__commit_build()
+        self._initialize = True
+
+    async def get(self, key: str) -> bytes:
+        """ Get value by key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        if self._initialize:
+            return await self._executor.run(self.__get, key)
+        raise UninitializedStore
+
+    async def set(self, key: str, value: bytes) -> None:
+        """ Set value & key
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+
+        Returns:
+            None
+        """
+        if self._initialize:
+            await self._executor.run(self.__write, [(key, value, StoreRecordType.SET)], None, False)
+        else:
+            raise UninitializedStore
+
+    async def delete(self, key: str) -> None:
+        """ Delete value by key
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            None
+        """
+        if self._initialize:
+            await self._executor.run(self.__write, [(key, b'', StoreRecordType.DEL)], None, True)
+        else:
+            raise UninitializedStore
+
+    async def _build_operations(self, key: str, value: bytes, operation_type: StoreRecordType) -> None:
+        """ This function is used for build DB when store is not initialize
+
+        Operations are grouped in transactions of *build_batch_size* operations
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+            operation_type (StoreRecordType): Operation type (SET or DEL)
+
+        Returns:
+            None
+        """
+        if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+            raise UnknownOperationType
+        await self._executor.run(self.__build, key, value, operation_type)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, missing keys are not in returned dict
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        if self._initialize:
+            return await self._get_many(keys)
+        raise UninitializedStore
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Get many values by key in one blocking call, without initialize check
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key (missing keys are not in returned dict)
+        """
+        return await self._executor.run(self.__get_many, keys)
+
+    async def _build_batch_operations(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                                      metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ This function is used for build DB by batch when store is not initialize
+
+        Operations & metadata are written in current build transaction, so metadata is committed with previous
+        build operations. Once store is initialized (ex: global store updates), batch is committed right away
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+                raise UnknownOperationType
+        if self._initialize:
+            await self._executor.run(self.__write, operations, metadata, False)
+        else:
+            await self._executor.run(self.__build_batch, operations, metadata)
+
+    async def _write_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                           metadata: Optional[Dict[str, bytes]] = None) -> None:
+        """ Apply a batch of operations & metadata in one transaction, without initialize check
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name, committed with operations
+
+        Returns:
+            None
+        """
+        for key, value, operation_type in operations:
+            if operation_type not in (StoreRecordType.SET, StoreRecordType.DEL):
+                raise UnknownOperationType
+        await self._executor.run(self.__write, operations, metadata, False)
+
+    async def get_metadata(self, name: str) -> Optional[bytes]:
+        """ Get metadata value by name
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        return await self._executor.run(self.__get_metadata, name)
+
+    async def _range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                     limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Read entries whose key is in [start, end) in one blocking call, without initialize check
+
+        Keys are TEXT with BINARY collation, they are ordered by UTF-8 bytes (same as code point order)
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        return await self._executor.run(self.__range, start, end, reverse, limit)
+
+    async def _all_keys(self) -> List[str]:
+        """ Return all keys, in no particular order, without initialize check
+
+        Returns:
+            List[str]: Keys
+        """
+        return await self._executor.run(self.__all_keys)
+
+    def __get(self, key: str) -> bytes:
+        """ Blocking get, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            bytes: return value as bytes
+        """
+        row = self._conn.execute(_SQL_GET, (key,)).fetchone()
+        if row is None:
+            self._logger.debug('Fail to get %s, key not found', key)
+            raise StoreKeyNotFound
+        return row[0]
+
+    def __get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Blocking get many, run in persistency thread pool
+
+        Args:
+            keys (List[str]): Keys entry as string
+
+        Returns:
+            Dict[str, bytes]: Values as bytes by key
+        """
+        values: Dict[str, bytes] = dict()
+        for i in range(0, len(keys), _MAX_VARIABLES):
+            chunk = keys[i:i + _MAX_VARIABLES]
+            sql = 'SELECT key, value FROM store WHERE key IN ({})'.format(','.join('?' * len(chunk)))
+            values.update(self._conn.execute(sql, chunk).fetchall())
+        return values
+
+    def __write(self, operations: List[Tuple[str, bytes, StoreRecordType]], metadata: Optional[Dict[str, bytes]],
+                strict_delete: bool) -> None:
+        """ Blocking transactional write, run in persistency thread pool
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name
+            strict_delete (bool): If true, raises StoreKeyNotFound when a deleted key doesn't exist
+
+        Returns:
+            None
+        """
+        self.__commit_build()
+        try:
+            self._conn.execute('BEGIN')
+            for key, value, operation_type in operations:
+                if operation_type == StoreRecordType.SET:
+                    self._conn.execute(_SQL_SET, (key, value))
+                elif self._conn.execute(_SQL_DELETE, (key,)).rowcount == 0 and strict_delete:
+                    raise StoreKeyNotFound
+            if metadata:
+                self._conn.executemany(_SQL_SET_METADATA, metadata.items())
+            self._conn.execute('COMMIT')
+        except StoreKeyNotFound:
+            self._conn.execute('ROLLBACK')
+            self._logger.debug('Fail to delete, key not found')
+            raise
+        except sqlite3.Error as err:
+            if self._conn.in_transaction:
+                self._conn.execute('ROLLBACK')
+            self._logger.error('Fail to write, info -> %s', err)
+            raise SQLiteErrors
+
+    def __build(self, key: str, value: bytes, operation_type: StoreRecordType) -> None:
+        """ Blocking build operation, run in persistency thread pool
+
+        Args:
+            key (str): Key entry as string
+            value (bytes): Value as bytes
+            operation_type (StoreRecordType): Operation type (SET or DEL)
+
+        Returns:
+            None
+        """
+        self.__begin_build()
+        if operation_type == StoreRecordType.SET:
+            self._conn.execute(_SQL_SET, (key, value))
+        elif self._conn.execute(_SQL_DELETE, (key,)).rowcount == 0:
+            self._logger.debug('Fail build operation delete %s, key not found', key)
+            raise StoreKeyNotFound
+        self._build_pending += 1
+        if self._build_pending >= self._build_batch_size:
+            self.__commit_build()
+
+    def __build_batch(self, operations: List[Tuple[str, bytes, StoreRecordType]],
+                      metadata: Optional[Dict[str, bytes]]) -> None:
+        """ Blocking build batch in current build transaction, run in persistency thread pool
+
+        Args:
+            operations (List[Tuple[str, bytes, StoreRecordType]]): Operations as (key, value, operation type)
+            metadata (Optional[Dict[str, bytes]]): Metadata values by name
+
+        Returns:
+            None
+        """
+        self.__begin_build()
+        for key, value, operation_type in operations:
+            if operation_type == StoreRecordType.SET:
+                self._conn.execute(_SQL_SET, (key, value))
+            else:
+                self._conn.execute(_SQL_DELETE, (key,))
+        if metadata:
+            self._conn.executemany(_SQL_SET_METADATA, metadata.items())
+        self._build_pending += len(operations)
+        if self._build_pending >= self._build_batch_size:
+            self.__commit_build()
+
+    def __begin_build(self) -> None:
+        """ Begin build transaction if there is no one
+
+        Returns:
+            None
+        """
+        if not self._conn.in_transaction:
+            self._conn.execute('BEGIN')
+            self._build_pending = 0
+
+    def __commit_build(self) -> None:
+        """ Commit build transaction if there is one
+
+        Returns:
+            None
+        """
+        if self._conn.in_transaction:
+            self._conn.execute('COMMIT')
+        self._build_pending = 0
+
+    def __get_metadata(self, name: str) -> Optional[bytes]:
+        """ Blocking get metadata, run in persistency thread pool
+
+        Args:
+            name (str): Metadata name
+
+        Returns:
+            Optional[bytes]: Metadata value, None if metadata was never set
+        """
+        row = self._conn.execute(_SQL_GET_METADATA, (name,)).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def __range(self, start: Optional[str], end: Optional[str], reverse: bool,
+                limit: Optional[int]) -> List[Tuple[str, bytes]]:
+        """ Blocking range read, run in persistency thread pool
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+            reverse (bool): If true entries are returned in descending key order
+            limit (Optional[int]): Max number of returned entries, None for no limit
+
+        Returns:
+            List[Tuple[str, bytes]]: Entries as (key, value)
+        """
+        conditions: List[str] = list()
+        params: List[object] = list()
+        if start is not None:
+            conditions.append('key >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('key < ?')
+            params.append(end)
+        sql = 'SELECT key, value FROM store'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY key DESC' if reverse else ' ORDER BY key'
+        sql += ' LIMIT ?'
+        params.append(-1 if limit is None else limit)
+        return self._conn.execute(sql, params).fetchall()
+
+    def __all_keys(self) -> List[str]:
+        """ Blocking keys only scan, run in persistency thread pool
+
+        Returns:
+            List[str]: Keys
+        """
+        return [key for key, in self._conn.execute('SELECT key FROM store').fetchall()]
+
+    def __del__(self):
+        self._logger.info('Closed SQLite')
+        self._conn.close()
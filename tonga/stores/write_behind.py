@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# coding: utf-8
+# Copyright (c) Qotto, 2019
+
+""" WriteBehindBuffer class
+
+Keeps dirty entries in memory in front of a persistency, repeated writes on the same key are coalesced and
+flushed in batches, when the buffer reaches *max_entries* or when the oldest dirty entry reaches *max_age*.
+"""
+
+import asyncio
+from asyncio import AbstractEventLoop, TimerHandle
+from logging import getLogger, Logger
+from typing import Dict, Optional, Tuple, Callable, Awaitable, Any
+
+from tonga.models.structs.store_record_type import StoreRecordType
+from tonga.stores.persistency.base import BasePersistency
+
+__all__ = [
+    'WriteBehindBuffer'
+]
+
+
+class WriteBehindBuffer:
+    """ WriteBehindBuffer class
+
+    A deleted entry is kept in buffer as tombstone (None) until next flush.
+
+    Attributes:
+        _persistency (BasePersistency): Persistency where dirty entries are flushed
+        _loop (AbstractEventLoop): Asyncio loop
+        _max_entries (int): Max number of dirty entries, a write waits the flush when this limit was reached
+        _max_age (float): Max time (in seconds) before a dirty entry was flushed
+        _dirty (Dict[str, Optional[bytes]]): Dirty entries (None for deleted entry)
+        _flushing (Dict[str, Optional[bytes]]): Entries currently written in persistency
+        _metadata (Dict[str, bytes]): Metadata values written with next flush (ex: changelog positioning)
+        _flush_marker (Any): Marker handed to flush callback once all entries written before it was flushed
+        _flush_callback (Callable[[Any], Awaitable[None]]): Coroutine called after each flush with the marker
+    """
+    _persistency: BasePersistency
+    _loop: AbstractEventLoop
+    _max_entries: int
+    _max_age: float
+    _dirty: Dict[str, Optional[bytes]]
+    _flushing: Dict[str, Optional[bytes]]
+    _metadata: Dict[str, bytes]
+    _flush_lock: asyncio.Lock
+    _flush_handle: Optional[TimerHandle]
+    _flush_marker: Any
+    _flush_callback: Optional[Callable[[Any], Awaitable[None]]]
+    _logger: Logger
+
+    def __init__(self, persistency: BasePersistency, loop: AbstractEventLoop, max_entries: int = 1000,
+                 max_age: float = 1.0) -> None:
+        """ WriteBehindBuffer constructor
+
+        Args:
+            persistency (BasePersistency): Persistency where dirty entries are flushed
+            loop (AbstractEventLoop): Asyncio loop
+            max_entries (int): Max number of dirty entries before flush
+            max_age (float): Max time (in seconds) before a dirty entry was flushed
+
+        Returns:
+            None
+        """
+        self._logger = getLogger('tonga')
+        self._persistency = persistency
+        self._loop = loop
+        self._max_entries = max_entries
+        self._max_age = max_age
+
+        self._dirty = dict()
+        self._flushing = dict()
+        self._metadata = dict()
+        self._flush_lock = asyncio.Lock(loop=self._loop)
+        self._flush_handle = None
+        self._flush_marker = None
+        self._flush_callback = None
+
+    def lookup(self, key: str) -> Tuple[bool, Optional[bytes]]:
+        """ Look up an entry in buffer
+
+        Args:
+            key (str): Key entry as string
+
+        Returns:
+            Tuple[bool, Optional[bytes]]: (True, value) if key was buffered (value is None for deleted entry),
+                                          (False, None) otherwise
+        """
+        if key in self._dirty:
+            return True, self._dirty[key]
+        if key in self._flushing:
+            return True, self._flushing[key]
+        return False, None
+
+    def lookup_range(self, start: Optional[str], end: Optional[str]) -> Dict[str, Optional[bytes]]:
+        """ Look up buffered entries whose key is in [start, end)
+
+        Args:
+            start (Optional[str]): First key (inclusive), None for no lower bound
+            end (Optional[str]): Last key (exclusive), None for no upper bound
+
+        Returns:
+            Dict[str, Optional[bytes]]: Buffered entries by key, unordered (value is None for deleted entry)
+        """
+        entries: Dict[str, Optional[bytes]] = dict()
+        for buffer in (self._flushing, self._dirty):
+            for key, value in buffer.items():
+                if (start is None or key >= start) and (end is None or key < end):
+                    entries[key] = value
+        return entries
+
+    async def set(self, key: str, value: Optional[bytes]) -> None:
+        """ Set an entry in buffer, None value marks entry as deleted
+
+        Args:
+            key (str): Key entry as string
+            value (Optional[bytes]): Value as bytes, None for delete
+
+        Returns:
+            None
+        """
+        if key not in self._dirty and len(self._dirty) >= self._max_entries:
+            await self.flush()
+        self._dirty[key] = value
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self._max_age, self.__on_flush_timer)
+
+    def set_metadata(self, metadata: Dict[str, bytes]) -> None:
+        """ Set metadata values written in persistency with next flush, in the same write batch
+
+        Args:
+            metadata (Dict[str, bytes]): Metadata values by name
+
+        Returns:
+            None
+        """
+        self._metadata.update(metadata)
+
+    def set_flush_marker(self, marker: Any) -> None:
+        """ Set marker handed to flush callback when all entries buffered before it was flushed
+
+        Args:
+            marker (Any): Flush marker (ex: changelog positioning)
+
+        Returns:
+            None
+        """
+        self._flush_marker = marker
+
+    def set_flush_callback(self, callback: Callable[[Any], Awaitable[None]]) -> None:
+        """ Set coroutine called after each flush with the last flush marker
+
+        Args:
+            callback (Callable[[Any], Awaitable[None]]): Flush callback
+
+        Returns:
+            None
+        """
+        self._flush_callback = callback
+
+    def dirty_size(self) -> int:
+        """ Return number of entries waiting flush
+
+        Returns:
+            int: Number of dirty entries
+        """
+        return len(self._dirty) + len(self._flushing)
+
+    async def flush(self) -> None:
+        """ Write all dirty entries in persistency
+
+        Returns:
+            None
+        """
+        async with self._flush_lock:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+
+            if not self._dirty and not self._metadata:
+                return
+
+            self._flushing, self._dirty = self._dirty, dict()
+            metadata, self._metadata = self._metadata, dict()
+            marker, self._flush_marker = self._flush_marker, None
+
+            try:
+                await self._persistency.write_batch([(key, b'', StoreRecordType.DEL) if value is None else
+                                                     (key, value, StoreRecordType.SET)
+                                                     for key, value in self._flushing.items()], metadata)
+            except Exception:
+                # Entries written after the failed flush are newer, they take precedence
+                for key, value in self._flushing.items():
+                    self._dirty.setdefault(key, value)
+                for name, value in metadata.items():
+                    self._metadata.setdefault(name, value)
+                if self._flush_marker is None:
+                    self._flush_marker = marker
+                if self._flush_handle is None:
+                    self._flush_handle = self._loop.call_later(self._max_age, self.__on_flush_timer)
+                raise
+            finally:
+                self._flushing = dict()
+
+            self._logger.debug('Write behind flushed')
+            if marker is not None and self._flush_callback is not None:
+                await self._flush_callback(marker)
+
+    def __on_flush_timer(self) -> None:
+        """ Called by loop when oldest dirty entry reaches max age
+
+        Returns:
+            None
+        """
+        self._flush_handle = None
+        asyncio.ensure_future(self.flush(), loop=self._loop)